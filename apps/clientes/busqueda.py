@@ -0,0 +1,94 @@
+"""
+SKYNET - Búsqueda indexada de clientes
+PostgreSQL: índice GIN pg_trgm sobre nombre/contacto/email y ranking por
+word_similarity. SQLite: tabla FTS5 (tokenizer trigram) mantenida por
+triggers y ranking bm25. Ambos índices se actualizan en la misma
+transacción que la fila (expresión indexada / triggers), incluso con
+update() y bulk_create. El DDL está en las migraciones 0003 y 0005; en
+SQLite toda migración que reconstruya la tabla clientes debe restaurar
+la tabla FTS (ver 0004).
+"""
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Los índices de trigramas solo sirven con términos de 3+ caracteres
+MIN_CARACTERES_INDICE = 3
+
+# Documento indexado (debe coincidir con la expresión del índice GIN).
+# El separador (chr(31)) impide que un término abarque dos campos
+SEPARADOR = '\x1f'
+DOCUMENTO_PG = "(nombre || chr(31) || contacto || chr(31) || email)"
+
+_fts_disponible = None
+
+
+def _escapar_like(termino):
+    return (termino.replace('\\', '\\\\')
+                   .replace('%', '\\%')
+                   .replace('_', '\\_'))
+
+
+def _frase_fts(termino):
+    """Frase FTS5: con el tokenizer trigram equivale a un 'contiene'"""
+    return '"' + termino.replace('"', '""') + '"'
+
+
+def fts_disponible():
+    """Indica si la tabla clientes_fts existe (SQLite con FTS5)"""
+    global _fts_disponible
+    if _fts_disponible is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'")
+            _fts_disponible = cursor.fetchone() is not None
+    return _fts_disponible
+
+
+def _busqueda_postgresql(queryset, termino):
+    return queryset.annotate(
+        rango=RawSQL(
+            f'word_similarity(%s, {DOCUMENTO_PG})', (termino,),
+            output_field=FloatField())
+    ).filter(
+        RawSQL(f'{DOCUMENTO_PG} ILIKE %s', (f'%{_escapar_like(termino)}%',),
+               output_field=BooleanField())
+    )
+
+
+def _busqueda_sqlite(queryset, termino):
+    frase = _frase_fts(termino)
+    return queryset.annotate(
+        # bm25 es menor cuanto más relevante: se invierte el signo
+        rango=RawSQL(
+            'SELECT -bm25(clientes_fts) FROM clientes_fts '
+            'WHERE clientes_fts MATCH %s AND rowid = "clientes"."id"',
+            (frase,), output_field=FloatField())
+    ).filter(
+        id__in=RawSQL(
+            'SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH %s', (frase,))
+    )
+
+
+def _busqueda_sin_indice(queryset, termino):
+    return queryset.filter(
+        Q(nombre__icontains=termino) |
+        Q(contacto__icontains=termino) |
+        Q(email__icontains=termino)
+    ).annotate(rango=Value(0.0, output_field=FloatField()))
+
+
+def buscar_clientes(queryset, termino):
+    """
+    Filtra ``queryset`` por ``termino`` en nombre, contacto o email y
+    anota ``rango`` (mayor es más relevante). Términos cortos o motores
+    sin índice usan icontains con rango 0.
+    """
+    termino = termino.replace(SEPARADOR, '').strip()
+    if len(termino) >= MIN_CARACTERES_INDICE:
+        if connection.vendor == 'postgresql':
+            return _busqueda_postgresql(queryset, termino)
+        if connection.vendor == 'sqlite' and fts_disponible():
+            return _busqueda_sqlite(queryset, termino)
+    return _busqueda_sin_indice(queryset, termino)
@@ -0,0 +1,163 @@
+"""
+SKYNET - Consultas geográficas de clientes sin PostGIS
+Cada cliente guarda el geohash de sus coordenadas en una columna indexada.
+Las consultas se prefiltran por celdas (rangos sobre el índice B-tree,
+válidos en PostgreSQL y SQLite) y se ordenan con la distancia haversine
+exacta calculada por lote.
+"""
+
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precisión almacenada (~4.8 m x 4.8 m)
+GEOHASH_PRECISION = 9
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Máximo de celdas para cubrir un bounding box
+MAX_CELDAS_BBOX = 32
+
+
+def _intercalar(x):
+    """Separa los bits de ``x`` (hasta 32) en las posiciones pares"""
+    x &= 0xFFFFFFFF
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    x = (x | (x << 1)) & 0x5555555555555555
+    return x
+
+
+def geohash_encode(latitud, longitud, precision=GEOHASH_PRECISION):
+    """
+    Geohash de un punto (latitud/longitud en grados). Equivale a la
+    bisección clásica, pero cuantiza cada eje a un entero e intercala sus
+    bits con máscaras, sin recorrer bit por bit.
+    """
+    bits = 5 * precision
+    bits_lng = (bits + 1) // 2
+    bits_lat = bits // 2
+    lat = min(int((float(latitud) + 90.0) / 180.0 * (1 << bits_lat)), (1 << bits_lat) - 1)
+    lng = min(int((float(longitud) + 180.0) / 360.0 * (1 << bits_lng)), (1 << bits_lng) - 1)
+
+    # La longitud ocupa el bit más significativo
+    if bits % 2:
+        valor = _intercalar(lng) | (_intercalar(lat) << 1)
+    else:
+        valor = (_intercalar(lng) << 1) | _intercalar(lat)
+
+    return ''.join(
+        BASE32[(valor >> desplazamiento) & 31]
+        for desplazamiento in range(bits - 5, -1, -5)
+    )
+
+
+def geohash_cliente(latitud, longitud):
+    """Geohash a guardar en Cliente ('' si no tiene coordenadas)"""
+    if latitud is None or longitud is None:
+        return ''
+    return geohash_encode(latitud, longitud)
+
+
+def dimensiones_celda(precision):
+    """(alto, ancho) en grados de una celda de la precisión dada"""
+    bits = 5 * precision
+    bits_lng = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (1 << bits_lat), 360.0 / (1 << bits_lng)
+
+
+def _km_por_grado_lng(latitud):
+    return 111.32 * max(math.cos(math.radians(latitud)), 0.01)
+
+
+def precision_para_radio(radio_km, latitud):
+    """
+    Mayor precisión cuyas celdas miden al menos ``radio_km`` en ambos
+    ejes: así el círculo queda dentro de la celda central y sus 8 vecinas.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        alto, ancho = dimensiones_celda(precision)
+        if (alto * 110.57 >= radio_km
+                and ancho * _km_por_grado_lng(latitud) >= radio_km):
+            return precision
+    return 1
+
+
+def _celdas_en_rejilla(lat_min, lat_max, lng_min, lng_max, precision):
+    alto, ancho = dimensiones_celda(precision)
+    celdas = set()
+    latitud = max(lat_min, -90.0)
+    while True:
+        longitud = max(lng_min, -180.0)
+        while True:
+            celdas.add(geohash_encode(
+                min(latitud, 89.999999), min(longitud, 179.999999), precision))
+            if longitud >= lng_max:
+                break
+            longitud = min(longitud + ancho, lng_max)
+        if latitud >= lat_max:
+            break
+        latitud = min(latitud + alto, lat_max)
+    return celdas
+
+
+def celdas_vecindad(latitud, longitud, radio_km):
+    """Celda del punto y sus vecinas, a la precisión adecuada al radio"""
+    precision = precision_para_radio(radio_km, latitud)
+    alto, ancho = dimensiones_celda(precision)
+    return _celdas_en_rejilla(
+        latitud - alto, latitud + alto, longitud - ancho, longitud + ancho,
+        precision)
+
+
+def celdas_bbox(lat_min, lat_max, lng_min, lng_max):
+    """
+    Celdas que cubren el bounding box, con la mayor precisión que no
+    exceda MAX_CELDAS_BBOX
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        alto, ancho = dimensiones_celda(precision)
+        estimadas = ((lat_max - lat_min) / alto + 2) * ((lng_max - lng_min) / ancho + 2)
+        if estimadas <= MAX_CELDAS_BBOX:
+            return _celdas_en_rejilla(lat_min, lat_max, lng_min, lng_max, precision)
+    return {''}
+
+
+def filtro_celdas(celdas, campo='geohash'):
+    """
+    Q con un rango por celda (prefijo): ``campo >= celda AND campo < celda + '{'``.
+    A diferencia de LIKE 'prefijo%', el rango usa el índice en cualquier motor.
+    """
+    condicion = Q()
+    for celda in sorted(celdas):
+        if not celda:
+            return Q(**{f'{campo}__gt': ''})
+        condicion |= Q(**{f'{campo}__gte': celda, f'{campo}__lt': celda + '{'})
+    return condicion
+
+
+def haversine_km(latitud, longitud, puntos):
+    """
+    Distancias en km desde (latitud, longitud) a cada (lat, lng) de
+    ``puntos``, calculadas en un solo recorrido con las constantes del
+    origen precalculadas. Es un bucle escalar, no vectorizado: numpy no es
+    dependencia del proyecto y los candidatos ya vienen acotados por las
+    celdas del geohash
+    """
+    lat0 = math.radians(latitud)
+    lng0 = math.radians(longitud)
+    cos_lat0 = math.cos(lat0)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    distancias = []
+    for lat, lng in puntos:
+        lat1 = radians(lat)
+        dlat = lat1 - lat0
+        dlng = radians(lng) - lng0
+        a = sin(dlat / 2) ** 2 + cos_lat0 * cos(lat1) * sin(dlng / 2) ** 2
+        distancias.append(2 * RADIO_TIERRA_KM * asin(min(1.0, sqrt(a))))
+    return distancias
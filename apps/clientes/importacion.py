@@ -0,0 +1,233 @@
+"""
+SKYNET - Importación masiva de clientes desde CSV
+El archivo se lee fila por fila y se procesa por lotes: una query de
+emails existentes por lote, validación sin ORM y un bulk_create por lote,
+todo en una transacción (un archivo ilegible a la mitad no deja una
+importación parcial). Memoria constante sin importar el tamaño del archivo.
+"""
+
+import csv
+import io
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from apps.utils.validators import (
+    EMAIL_MESSAGE, GUATEMALA_PHONE_MESSAGE, is_guatemala_phone, is_valid_email
+)
+from apps.visitas.cambios import registrar_clientes
+from .geo import geohash_cliente
+from .models import Cliente
+
+# Filas por lote (una query de emails y un INSERT en lote por lote)
+CHUNK_IMPORTACION = 1000
+
+# Errores detallados incluidos en el reporte (el total siempre se cuenta)
+MAX_ERRORES_REPORTE = 1000
+
+# Encabezados aceptados (snake_case o camelCase del frontend)
+ALIAS_COLUMNAS = {
+    'tipocliente': 'tipo_cliente',
+    'tipo_cliente': 'tipo_cliente',
+}
+COLUMNAS = [
+    'nombre', 'contacto', 'telefono', 'email', 'direccion',
+    'latitud', 'longitud', 'tipo_cliente',
+]
+TIPOS_CLIENTE = set(Cliente.TipoClienteChoices.values)
+
+# Coordenadas con la precisión de las columnas (mismos campos que
+# ClienteCreateSerializer: se rechazan los valores con más decimales)
+CAMPO_LATITUD = serializers.DecimalField(max_digits=10, decimal_places=8)
+CAMPO_LONGITUD = serializers.DecimalField(max_digits=11, decimal_places=8)
+
+# Rangos de coordenadas de Guatemala (mismos que ClienteCreateSerializer)
+RANGO_LATITUD = (13.0, 18.0)
+RANGO_LONGITUD = (-93.0, -88.0)
+
+
+class ResumenImportacion:
+    """Resultado acumulado de una importación"""
+
+    def __init__(self):
+        self.total = 0
+        self.creados = 0
+        self.total_errores = 0
+        self.errores = []
+
+    def agregar_error(self, fila, errores):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTE:
+            self.errores.append({'fila': fila, 'errores': errores})
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'creados': self.creados,
+            'con_errores': self.total_errores,
+            'errores': self.errores,
+            'errores_truncados': self.total_errores > len(self.errores),
+        }
+
+
+def _columna(nombre):
+    clave = (nombre or '').strip()
+    return ALIAS_COLUMNAS.get(clave.lower(), clave.lower())
+
+
+def leer_csv(archivo, encoding='utf-8-sig'):
+    """
+    Genera (numero_fila, datos) a partir de un archivo CSV binario o de
+    texto. Acepta ',' o ';' como separador (Excel en español usa ';').
+    La fila 1 es el encabezado.
+    """
+    if not isinstance(archivo, io.TextIOBase):
+        archivo = io.TextIOWrapper(archivo, encoding=encoding, newline='')
+    encabezado = archivo.readline()
+    separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+    columnas = [_columna(c) for c in next(csv.reader([encabezado], delimiter=separador))]
+
+    for numero, valores in enumerate(csv.reader(archivo, delimiter=separador), start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(columnas, valores))
+
+
+def _decimal(valor, campo_serializer, campo, errores):
+    try:
+        return campo_serializer.to_internal_value(valor)
+    except serializers.ValidationError as e:
+        errores.setdefault(campo, []).extend(str(detalle) for detalle in e.detail)
+        return None
+
+
+def validar_fila(datos):
+    """
+    Valida y normaliza una fila con las reglas de ClienteCreateSerializer
+    (sin ORM). Retorna (limpios, errores).
+    """
+    errores = {}
+    texto = {campo: (datos.get(campo) or '').strip() for campo in COLUMNAS}
+
+    def error(campo, mensaje):
+        errores.setdefault(campo, []).append(mensaje)
+
+    for campo, minimo, maximo in (('nombre', 2, 200), ('contacto', 2, 100)):
+        if len(texto[campo]) < minimo:
+            error(campo, f'El {campo} debe tener al menos {minimo} caracteres.')
+        elif len(texto[campo]) > maximo:
+            error(campo, f'Máximo {maximo} caracteres.')
+
+    if len(texto['direccion']) < 10:
+        error('direccion', 'La dirección debe ser más específica (mínimo 10 caracteres).')
+
+    if len(texto['telefono']) > 20 or not is_guatemala_phone(texto['telefono']):
+        error('telefono', GUATEMALA_PHONE_MESSAGE)
+
+    if len(texto['email']) > 254 or not is_valid_email(texto['email']):
+        error('email', EMAIL_MESSAGE)
+
+    tipo_cliente = texto['tipo_cliente'].upper() or Cliente.TipoClienteChoices.INDIVIDUAL
+    if tipo_cliente not in TIPOS_CLIENTE:
+        error('tipo_cliente', f'Tipo de cliente inválido: {texto["tipo_cliente"]}.')
+
+    latitud = longitud = None
+    if texto['latitud'] or texto['longitud']:
+        if not (texto['latitud'] and texto['longitud']):
+            error('coordenadas', 'Debe proporcionar tanto latitud como longitud, o ninguna.')
+        else:
+            latitud = _decimal(texto['latitud'], CAMPO_LATITUD, 'latitud', errores)
+            longitud = _decimal(texto['longitud'], CAMPO_LONGITUD, 'longitud', errores)
+            if latitud is not None and not (
+                    RANGO_LATITUD[0] <= latitud <= RANGO_LATITUD[1]):
+                error('latitud', 'La latitud debe estar en el rango de Guatemala (13.0 - 18.0).')
+            if longitud is not None and not (
+                    RANGO_LONGITUD[0] <= longitud <= RANGO_LONGITUD[1]):
+                error('longitud', 'La longitud debe estar en el rango de Guatemala (-93.0 - -88.0).')
+
+    if errores:
+        return None, errores
+
+    return {
+        'nombre': texto['nombre'].title(),
+        'contacto': texto['contacto'].title(),
+        'telefono': texto['telefono'],
+        'email': texto['email'],
+        'direccion': texto['direccion'],
+        'latitud': latitud,
+        'longitud': longitud,
+        'tipo_cliente': tipo_cliente,
+    }, None
+
+
+def _procesar_lote(lote, resumen, vistos, dry_run):
+    validas = []
+    for numero, datos in lote:
+        limpios, errores = validar_fila(datos)
+        if errores:
+            resumen.agregar_error(numero, errores)
+        else:
+            validas.append((numero, limpios))
+
+    # Unicidad de email: una query por lote + duplicados dentro del archivo
+    existentes = set(Cliente.objects.filter(
+        email__in={limpios['email'] for _, limpios in validas}
+    ).values_list('email', flat=True))
+
+    clientes = []
+    for numero, limpios in validas:
+        email = limpios['email']
+        if email in existentes:
+            resumen.agregar_error(numero, {'email': ['Ya existe un cliente con este email.']})
+            continue
+        if email in vistos:
+            resumen.agregar_error(numero, {
+                'email': [f'Email repetido en el archivo (fila {vistos[email]}).']})
+            continue
+        vistos[email] = numero
+        clientes.append(limpios)
+
+    if clientes and not dry_run:
+        _insertar(clientes)
+    resumen.creados += len(clientes)
+
+
+def _insertar(clientes):
+    """
+    Inserta un lote con bulk_create. Sin save() ni signals: el geohash se
+    calcula aquí (las fechas las pone bulk_create con auto_now) y el índice
+    de búsqueda se mantiene con sus triggers/expresión.
+    """
+    Cliente.objects.bulk_create([
+        Cliente(geohash=geohash_cliente(c['latitud'], c['longitud']), **c)
+        for c in clientes
+    ], batch_size=CHUNK_IMPORTACION)
+    # Sin señales: el feed de cambios se registra con los ids insertados
+    registrar_clientes(Cliente.objects.filter(
+        email__in=[c['email'] for c in clientes]
+    ).values_list('id', flat=True))
+
+
+def importar_clientes(filas, chunk_size=CHUNK_IMPORTACION, dry_run=False):
+    """
+    Importa clientes desde un iterable de (numero_fila, datos).
+
+    Una fila inválida se reporta sin afectar a las demás, pero la
+    importación es atómica: si la lectura falla a la mitad
+    (UnicodeDecodeError, csv.Error) la excepción se propaga y no queda
+    ningún lote creado. Con ``dry_run`` solo se valida (``creados`` indica
+    cuántos se habrían creado). Retorna un ResumenImportacion.
+    """
+    resumen = ResumenImportacion()
+    vistos = {}
+    iterador = iter(filas)
+    with transaction.atomic():
+        while True:
+            lote = list(islice(iterador, chunk_size))
+            if not lote:
+                break
+            resumen.total += len(lote)
+            _procesar_lote(lote, resumen, vistos, dry_run)
+    resumen.errores.sort(key=lambda error: error['fila'])
+    return resumen
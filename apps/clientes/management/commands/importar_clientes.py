@@ -0,0 +1,58 @@
+"""
+SKYNET - Importación masiva de clientes desde un archivo CSV
+
+Uso:
+    python manage.py importar_clientes clientes.csv [--chunk-size 1000]
+        [--dry-run] [--reporte errores.csv]
+"""
+
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clientes.importacion import CHUNK_IMPORTACION, importar_clientes, leer_csv
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes desde un CSV por lotes con reporte de errores por fila'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV (UTF-8, separador , o ;)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_IMPORTACION,
+                            help='Filas por lote')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo validar, sin insertar')
+        parser.add_argument('--reporte',
+                            help='Escribir los errores por fila en este CSV')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resumen = importar_clientes(
+                    leer_csv(archivo),
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'])
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                writer = csv.writer(salida)
+                writer.writerow(['fila', 'errores'])
+                for error in resumen.errores:
+                    writer.writerow([
+                        error['fila'],
+                        json.dumps(error['errores'], ensure_ascii=False)])
+
+        accion = 'válidos' if options['dry_run'] else 'creados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resumen.creados} clientes {accion} de {resumen.total} filas '
+            f'en {time.monotonic() - inicio:.2f}s'))
+        if resumen.total_errores:
+            self.stdout.write(self.style.WARNING(
+                f'{resumen.total_errores} filas con errores'))
+            for error in resumen.errores[:20]:
+                self.stdout.write(f"  fila {error['fila']}: {error['errores']}")
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:21
+
+import apps.utils.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('nombre', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('contacto', models.CharField(max_length=100, verbose_name='Persona de Contacto')),
+                ('telefono', models.CharField(max_length=20, validators=[apps.utils.validators.validate_guatemala_phone], verbose_name='Teléfono')),
+                ('email', models.EmailField(max_length=254, validators=[apps.utils.validators.validate_guatemala_email], verbose_name='Email')),
+                ('direccion', models.TextField(verbose_name='Dirección')),
+                ('latitud', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True, verbose_name='Latitud')),
+                ('longitud', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True, verbose_name='Longitud')),
+                ('tipo_cliente', models.CharField(choices=[('CORPORATIVO', 'Corporativo'), ('INDIVIDUAL', 'Individual'), ('GOBIERNO', 'Gobierno')], default='INDIVIDUAL', max_length=20, verbose_name='Tipo de Cliente')),
+                ('activo', models.BooleanField(default=True, verbose_name='Activo')),
+            ],
+            options={
+                'verbose_name': 'Cliente',
+                'verbose_name_plural': 'Clientes',
+                'db_table': 'clientes',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
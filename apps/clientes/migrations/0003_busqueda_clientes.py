@@ -0,0 +1,87 @@
+# Índices de búsqueda de texto por motor de base de datos
+#
+# El SQL va en la migración (no se importa de apps.clientes.busqueda): la
+# migración debe seguir produciendo el mismo esquema aunque el módulo cambie.
+
+from django.db import migrations
+
+POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS clientes_busqueda_trgm_idx ON clientes "
+    "USING gin ((nombre || ' ' || contacto || ' ' || email) gin_trgm_ops)",
+]
+POSTGRESQL_REVERSA = [
+    'DROP INDEX IF EXISTS clientes_busqueda_trgm_idx',
+]
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5("
+    "nombre, contacto, email, content='clientes', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN "
+    "INSERT INTO clientes_fts(rowid, nombre, contacto, email) "
+    "VALUES (new.id, new.nombre, new.contacto, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN "
+    "INSERT INTO clientes_fts(clientes_fts, rowid, nombre, contacto, email) "
+    "VALUES ('delete', old.id, old.nombre, old.contacto, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_au "
+    "AFTER UPDATE OF nombre, contacto, email ON clientes BEGIN "
+    "INSERT INTO clientes_fts(clientes_fts, rowid, nombre, contacto, email) "
+    "VALUES ('delete', old.id, old.nombre, old.contacto, old.email); "
+    "INSERT INTO clientes_fts(rowid, nombre, contacto, email) "
+    "VALUES (new.id, new.nombre, new.contacto, new.email); END",
+    "INSERT INTO clientes_fts(clientes_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSA = [
+    'DROP TRIGGER IF EXISTS clientes_fts_ai',
+    'DROP TRIGGER IF EXISTS clientes_fts_ad',
+    'DROP TRIGGER IF EXISTS clientes_fts_au',
+    'DROP TABLE IF EXISTS clientes_fts',
+]
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear_fts_sqlite(schema_editor):
+    """
+    Tabla FTS5 y triggers de SQLite (idempotente, reindexa). Los triggers
+    se pierden cuando una migración reconstruye la tabla clientes: esas
+    migraciones deben volver a llamarla.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        opciones = {fila[0] for fila in cursor.fetchall()}
+    # El tokenizer trigram requiere SQLite 3.34; sin él se usa icontains
+    version = schema_editor.connection.Database.sqlite_version_info
+    if 'ENABLE_FTS5' in opciones and version >= (3, 34, 0):
+        _ejecutar(schema_editor, SQLITE)
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRESQL)
+    elif vendor == 'sqlite':
+        crear_fts_sqlite(schema_editor)
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRESQL_REVERSA)
+    elif vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_REVERSA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_indices_clientes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:38
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# El codificador va en la migración (no se importa de apps.clientes.geo):
+# los geohash calculados aquí no deben cambiar aunque el módulo cambie.
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+_busqueda = import_module('apps.clientes.migrations.0003_busqueda_clientes')
+
+
+def restaurar_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        _busqueda.crear_fts_sqlite(schema_editor)
+
+
+def geohash_encode(latitud, longitud, precision=GEOHASH_PRECISION):
+    """Geohash clásico por bisección (la longitud primero)"""
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    latitud, longitud = float(latitud), float(longitud)
+    caracteres = []
+    valor = bits = 0
+    es_longitud = True
+    while len(caracteres) < precision:
+        if es_longitud:
+            medio = (lng_min + lng_max) / 2
+            bit = longitud >= medio
+            lng_min, lng_max = (medio, lng_max) if bit else (lng_min, medio)
+        else:
+            medio = (lat_min + lat_max) / 2
+            bit = latitud >= medio
+            lat_min, lat_max = (medio, lat_max) if bit else (lat_min, medio)
+        valor = (valor << 1) | bit
+        bits += 1
+        es_longitud = not es_longitud
+        if bits == 5:
+            caracteres.append(BASE32[valor])
+            valor = bits = 0
+    return ''.join(caracteres)
+
+
+def calcular_geohash(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+    clientes = list(Cliente.objects.filter(
+        latitud__isnull=False, longitud__isnull=False
+    ).only('id', 'latitud', 'longitud'))
+    for cliente in clientes:
+        cliente.geohash = geohash_encode(cliente.latitud, cliente.longitud)
+    Cliente.objects.bulk_update(clientes, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_busqueda_clientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['geohash'], name='clientes_geohash_idx'),
+        ),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+        # SQLite reconstruye la tabla al agregar la columna: restaurar FTS
+        migrations.RunPython(restaurar_fts, migrations.RunPython.noop),
+    ]
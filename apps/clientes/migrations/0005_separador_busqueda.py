@@ -0,0 +1,34 @@
+# Documento de búsqueda de PostgreSQL con separador entre campos: un
+# término ya no coincide con el final de un campo y el inicio del siguiente.
+# (SQLite indexa cada campo como columna FTS5 separada: sin cambios.)
+
+from django.db import migrations
+
+SEPARADO = (
+    "CREATE INDEX clientes_busqueda_trgm_idx ON clientes USING gin "
+    "((nombre || chr(31) || contacto || chr(31) || email) gin_trgm_ops)"
+)
+ANTERIOR = (
+    "CREATE INDEX clientes_busqueda_trgm_idx ON clientes USING gin "
+    "((nombre || ' ' || contacto || ' ' || email) gin_trgm_ops)"
+)
+
+
+def _reemplazar_indice(crear):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute('DROP INDEX IF EXISTS clientes_busqueda_trgm_idx')
+        schema_editor.execute(crear)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_geohash_clientes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_reemplazar_indice(SEPARADO), _reemplazar_indice(ANTERIOR)),
+    ]
@@ -2,9 +2,10 @@
 SKYNET - Modelos del módulo de clientes
 """
 
-from django.db import models
+from django.db import models, transaction
 from apps.utils.models import TimestampedModel
 from apps.utils.validators import validate_guatemala_phone, validate_guatemala_email
+from .geo import geohash_cliente
 
 
 class Cliente(TimestampedModel):
@@ -54,6 +55,14 @@ class Cliente(TimestampedModel):
         blank=True,
         verbose_name="Longitud"
     )
+    # Geohash de las coordenadas para consultas por cercanía (se calcula en save)
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Geohash"
+    )
 
     # Tipo y estado
     tipo_cliente = models.CharField(
@@ -72,10 +81,31 @@ class Cliente(TimestampedModel):
         verbose_name_plural = "Clientes"
         db_table = "clientes"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre'], name='clientes_nombre_idx'),
+            models.Index(
+                fields=['activo', 'nombre'],
+                name='clientes_activo_nombre_idx'
+            ),
+            # Validación de email único en creación/actualización
+            models.Index(fields=['email'], name='clientes_email_idx'),
+            # Prefiltro por celda de /cercanos/ y /bbox/
+            models.Index(fields=['geohash'], name='clientes_geohash_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - {self.contacto}"
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_cliente(self.latitud, self.longitud)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and (
+                {'latitud', 'longitud'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        # post_save (feed de cambios) en la misma transacción que la fila
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     @property
     def tiene_coordenadas(self):
         """Verifica si el cliente tiene coordenadas GPS"""
@@ -2,7 +2,11 @@
 SKYNET - Serializers del módulo de clientes
 """
 
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import Now
 from rest_framework import serializers
+from apps.utils.projection import Proyeccion
+from apps.visitas.models import ESTADOS_ACTIVOS, Visita
 from .models import Cliente
 
 
@@ -38,6 +42,94 @@ class ClienteSerializer(serializers.ModelSerializer):
         ]
 
 
+# Estadísticas de visitas por cliente (?estadisticas=true). Agregados sobre
+# la relación inversa ``visitas``: un LEFT JOIN + GROUP BY en la misma query
+# del listado, apoyado en el índice visitas_cliente_estado_idx
+_EstadoVisita = Visita.EstadoVisitaChoices
+ESTADISTICAS_VISITAS = {
+    'totalVisitas': Count('visitas'),
+    'visitasAbiertas': Count(
+        'visitas', filter=Q(visitas__estado__in=ESTADOS_ACTIVOS)),
+    'visitasProgramadas': Count(
+        'visitas', filter=Q(visitas__estado=_EstadoVisita.PROGRAMADA)),
+    'visitasEnProgreso': Count(
+        'visitas', filter=Q(visitas__estado=_EstadoVisita.EN_PROGRESO)),
+    'ultimaVisita': Max(
+        'visitas__fecha_fin',
+        filter=Q(visitas__estado=_EstadoVisita.COMPLETADA)),
+    'proximaVisita': Min(
+        'visitas__fecha_programada',
+        filter=Q(visitas__estado=_EstadoVisita.PROGRAMADA,
+                 visitas__fecha_programada__gte=Now())),
+}
+
+
+class ClienteEstadisticasSerializer(ClienteSerializer):
+    """
+    ClienteSerializer más las estadísticas de visitas. El queryset debe
+    venir anotado con ESTADISTICAS_VISITAS.
+    """
+
+    totalVisitas = serializers.IntegerField(read_only=True)
+    visitasAbiertas = serializers.IntegerField(read_only=True)
+    visitasProgramadas = serializers.IntegerField(read_only=True)
+    visitasEnProgreso = serializers.IntegerField(read_only=True)
+    ultimaVisita = serializers.DateTimeField(read_only=True)
+    proximaVisita = serializers.DateTimeField(read_only=True)
+
+    class Meta(ClienteSerializer.Meta):
+        fields = ClienteSerializer.Meta.fields + list(ESTADISTICAS_VISITAS)
+
+
+_fecha = serializers.DateTimeField().to_representation
+
+# Proyección compacta del listado de clientes (mismas claves que ClienteSerializer)
+CLIENTE_PROYECCION = Proyeccion(
+    campos={
+        'idCliente': 'id',
+        'nombre': 'nombre',
+        'contacto': 'contacto',
+        'telefono': 'telefono',
+        'email': 'email',
+        'direccion': 'direccion',
+        'latitud': 'latitud',
+        'longitud': 'longitud',
+        'tipoCliente': 'tipo_cliente',
+        'activo': 'activo',
+        'fechaCreacion': 'fecha_creacion',
+        'fechaActualizacion': 'fecha_actualizacion',
+    },
+    compactos=[
+        'idCliente',
+        'nombre',
+        'contacto',
+        'telefono',
+        'tipoCliente',
+        'activo',
+    ],
+    formatos={
+        'latitud': serializers.DecimalField(
+            max_digits=10, decimal_places=8).to_representation,
+        'longitud': serializers.DecimalField(
+            max_digits=11, decimal_places=8).to_representation,
+        'fechaCreacion': _fecha,
+        'fechaActualizacion': _fecha,
+    }
+)
+
+# La misma proyección más las estadísticas de visitas. Solo la usa el listado
+# con ?estadisticas=true: los agregados requieren el JOIN con visitas
+CLIENTE_ESTADISTICAS_PROYECCION = Proyeccion(
+    campos={**CLIENTE_PROYECCION.campos, **ESTADISTICAS_VISITAS},
+    compactos=CLIENTE_PROYECCION.compactos,
+    formatos={
+        **CLIENTE_PROYECCION.formatos,
+        'ultimaVisita': _fecha,
+        'proximaVisita': _fecha,
+    }
+)
+
+
 class ClienteCreateSerializer(serializers.ModelSerializer):
     """
     Serializer para creación de Cliente con validaciones
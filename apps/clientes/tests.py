@@ -0,0 +1,435 @@
+import base64
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario
+from apps.visitas.models import Visita
+from .busqueda import buscar_clientes, fts_disponible
+from .importacion import importar_clientes, leer_csv
+from .geo import (
+    celdas_bbox, celdas_vecindad, geohash_cliente, geohash_encode, haversine_km
+)
+from .models import Cliente
+
+
+class ClientesTestMixin:
+    """
+    Datos base para las pruebas del módulo de clientes
+    """
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def crear_cliente(self, nombre, contacto='Ana Lopez', email=None, **kwargs):
+        return Cliente.objects.create(
+            nombre=nombre, contacto=contacto, telefono='12345678',
+            email=email or f'{nombre.lower().replace(" ", ".")}@empresa.com',
+            direccion='Zona 10, Guatemala City', **kwargs)
+
+    def buscar(self, termino, **params):
+        response = self.client.get('/api/clientes/', {'search': termino, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+class ClientesBusquedaTest(ClientesTestMixin, TestCase):
+    """
+    Búsqueda por nombre, contacto o email con el índice del motor actual
+    (FTS5 en SQLite, pg_trgm en PostgreSQL) o icontains sin índice
+    """
+
+    def ids(self, termino):
+        return {c['idCliente'] for c in self.buscar(termino)['data']}
+
+    def test_busca_en_nombre_contacto_y_email(self):
+        ferreteria = self.crear_cliente('Ferretería Central', contacto='Luis Mejia')
+        panaderia = self.crear_cliente('Panadería Sol', email='ventas@sol.com')
+        self.assertEqual(self.ids('Central'), {ferreteria.id})
+        self.assertEqual(self.ids('mejia'), {ferreteria.id})
+        self.assertEqual(self.ids('ventas@sol'), {panaderia.id})
+
+    def test_no_coincide_entre_campos(self):
+        # 'Lopez' termina el nombre y 'ana' inicia el contacto
+        self.crear_cliente('Distribuidora Lopez', contacto='ana Perez')
+        self.assertEqual(self.ids('Lopez ana'), set())
+        self.assertEqual(self.ids('lopez' + '\x1f' + 'ana'), set())
+
+    def test_indice_sigue_update_y_bulk_create(self):
+        cliente = self.crear_cliente('Farmacia Norte', email='farmacia@empresa.com')
+        Cliente.objects.filter(pk=cliente.pk).update(nombre='Farmacia Sur')
+        Cliente.objects.bulk_create([Cliente(
+            nombre='Farmacia Oeste', contacto='Eva Ruiz', telefono='12345678',
+            email='oeste@empresa.com', direccion='Zona 1')])
+        self.assertEqual(self.ids('Norte'), set())
+        self.assertEqual(self.ids('Sur'), {cliente.id})
+        self.assertEqual(len(self.ids('Oeste')), 1)
+
+    def test_termino_corto_sin_indice(self):
+        cliente = self.crear_cliente('Taller XZ')
+        self.assertEqual(self.ids('xz'), {cliente.id})
+
+    def test_comodines_like_literales(self):
+        self.crear_cliente('Tienda Uno')
+        descuento = self.crear_cliente('Todo al 100%', email='todo@empresa.com')
+        self.assertEqual(self.ids('100%'), {descuento.id})
+        self.assertEqual(self.ids('a_u'), set())
+
+    def test_paginacion_por_cursor(self):
+        creados = {self.crear_cliente(f'Bodega {i}').id for i in range(5)}
+        vistos, cursor = set(), None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            respuesta = self.buscar('Bodega', **params)
+            vistos.update(c['idCliente'] for c in respuesta['data'])
+            cursor = respuesta['pagination']['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, creados)
+
+    def test_cursor_con_rango_invalido(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(['alto', 1]).encode()).decode()
+        response = self.client.get('/api/clientes/', {'search': 'Bodega', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class GeohashTest(TestCase):
+    """
+    Codificación geohash y celdas de prefiltro, sin base de datos
+    """
+
+    def test_codificacion_conocida(self):
+        self.assertEqual(geohash_encode(42.6, -5.6, 5), 'ezs42')
+        self.assertEqual(geohash_encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash_encode(-90, -180, 3), '000')
+        self.assertEqual(geohash_encode(90, 180, 3), 'zzz')
+
+    def test_geohash_cliente(self):
+        self.assertEqual(geohash_cliente(None, -90.5), '')
+        self.assertEqual(
+            geohash_cliente(Decimal('14.6349'), Decimal('-90.5069')),
+            geohash_encode(14.6349, -90.5069))
+        self.assertEqual(len(geohash_cliente(14.6349, -90.5069)), 9)
+
+    def test_vecindad_cubre_el_radio(self):
+        # Puntos a la distancia del radio en las 8 direcciones
+        latitud, longitud, radio_km = 14.6349, -90.5069, 2
+        celdas = celdas_vecindad(latitud, longitud, radio_km)
+        delta_lat = radio_km / 110.57
+        delta_lng = radio_km / (111.32 * 0.9676)
+        for dlat in (-delta_lat, 0, delta_lat):
+            for dlng in (-delta_lng, 0, delta_lng):
+                gh = geohash_encode(latitud + dlat, longitud + dlng)
+                self.assertTrue(any(gh.startswith(c) for c in celdas), gh)
+
+    def test_bbox_acotado(self):
+        celdas = celdas_bbox(14.5, 14.7, -90.6, -90.4)
+        self.assertLessEqual(len(celdas), 32)
+        for lat, lng in ((14.5, -90.6), (14.7, -90.4), (14.6, -90.5)):
+            gh = geohash_encode(lat, lng)
+            self.assertTrue(any(gh.startswith(c) for c in celdas), gh)
+
+    def test_haversine(self):
+        # 1 grado de latitud ~ 111.2 km
+        self.assertAlmostEqual(haversine_km(0, 0, [(1, 0)])[0], 111.195, places=2)
+        self.assertEqual(haversine_km(14.6, -90.5, []), [])
+
+
+class ClientesGeoTest(ClientesTestMixin, TestCase):
+    """
+    /api/clientes/cercanos/ y /api/clientes/bbox/
+    """
+
+    ORIGEN = (14.6349, -90.5069)
+
+    def crear_en(self, nombre, latitud, longitud, **kwargs):
+        return self.crear_cliente(
+            nombre, latitud=Decimal(str(latitud)), longitud=Decimal(str(longitud)),
+            **kwargs)
+
+    def cercanos(self, **params):
+        return self.client.get('/api/clientes/cercanos/', {
+            'lat': self.ORIGEN[0], 'lng': self.ORIGEN[1], **params})
+
+    def test_ordena_por_distancia_y_recorta_por_radio(self):
+        lejano = self.crear_en('Lejano', 14.70, -90.5069)
+        medio = self.crear_en('Medio', 14.65, -90.5069)
+        cerca = self.crear_en('Cerca', 14.639, -90.5069)
+        self.crear_cliente('Sin Coordenadas')
+
+        data = self.cercanos(radio_km=5).json()['data']
+        self.assertEqual([c['idCliente'] for c in data], [cerca.id, medio.id])
+        self.assertAlmostEqual(data[0]['distanciaKm'], 0.456, places=2)
+        self.assertLess(data[0]['distanciaKm'], data[1]['distanciaKm'])
+
+        data = self.cercanos(radio_km=10, limite=1).json()['data']
+        self.assertEqual([c['idCliente'] for c in data], [cerca.id])
+        self.assertIn(lejano.id, [
+            c['idCliente'] for c in self.cercanos(radio_km=10).json()['data']])
+
+    def test_coincide_con_fuerza_bruta(self):
+        # Rejilla que cruza varios bordes de celda alrededor del origen
+        clientes = [
+            self.crear_en(f'Punto {i} {j}',
+                          round(self.ORIGEN[0] + i * 0.009, 6),
+                          round(self.ORIGEN[1] + j * 0.009, 6))
+            for i in range(-4, 5) for j in range(-4, 5)
+        ]
+        distancias = haversine_km(*self.ORIGEN, [
+            (float(c.latitud), float(c.longitud)) for c in clientes])
+        esperados = {
+            c.id for c, d in zip(clientes, distancias) if d <= 3
+        }
+        data = self.cercanos(radio_km=3, limite=100).json()['data']
+        self.assertEqual({c['idCliente'] for c in data}, esperados)
+
+    def test_filtra_activo_y_proyecta(self):
+        activo = self.crear_en('Activo', 14.636, -90.507)
+        self.crear_en('Inactivo', 14.636, -90.507, activo=False)
+        data = self.cercanos(activo='true', fields='idCliente,nombre').json()['data']
+        self.assertEqual(data, [
+            {'idCliente': activo.id, 'nombre': 'Activo', 'distanciaKm': data[0]['distanciaKm']}])
+
+    def test_bbox(self):
+        dentro = self.crear_en('Dentro', 14.6, -90.5)
+        borde = self.crear_en('Borde', 14.7, -90.4)
+        self.crear_en('Fuera', 14.71, -90.5)
+        self.crear_cliente('Sin Coordenadas')
+        response = self.client.get('/api/clientes/bbox/', {
+            'lat_min': 14.5, 'lat_max': 14.7, 'lng_min': -90.6, 'lng_max': -90.4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [c['idCliente'] for c in response.json()['data']], [borde.id, dentro.id])
+
+    def test_parametros_invalidos(self):
+        casos = (
+            ('/api/clientes/cercanos/', {'lng': -90.5}),
+            ('/api/clientes/cercanos/', {'lat': 'norte', 'lng': -90.5}),
+            ('/api/clientes/cercanos/', {'lat': 91, 'lng': -90.5}),
+            ('/api/clientes/cercanos/', {'lat': 14.6, 'lng': -90.5, 'radio_km': 0}),
+            ('/api/clientes/cercanos/', {'lat': 14.6, 'lng': -90.5, 'fields': 'x'}),
+            ('/api/clientes/bbox/', {
+                'lat_min': 14.7, 'lat_max': 14.5, 'lng_min': -90.6, 'lng_max': -90.4}),
+            ('/api/clientes/bbox/', {'lat_min': 14.5, 'lat_max': 14.7, 'lng_min': -90.6}),
+        )
+        for url, params in casos:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+
+class ClientesEstadisticasTest(ClientesTestMixin, TestCase):
+    """
+    Estadísticas de visitas por cliente: solo con ?estadisticas=true
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tecnico = Usuario.objects.create_user(
+            email='tecnico@skynet.com', nombre='Juan', apellido='Perez',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO)
+        self.con_visitas = self.crear_cliente('Empresa ABC')
+        self.sin_visitas = self.crear_cliente('Empresa XYZ')
+        ahora = timezone.now()
+        for estado, dias in (
+                (Visita.EstadoVisitaChoices.PROGRAMADA, 2),
+                (Visita.EstadoVisitaChoices.PROGRAMADA, 5),
+                (Visita.EstadoVisitaChoices.EN_PROGRESO, 1),
+                (Visita.EstadoVisitaChoices.COMPLETADA, 1),
+                (Visita.EstadoVisitaChoices.CANCELADA, 1)):
+            Visita.objects.create(
+                cliente=self.con_visitas, tecnico=self.tecnico, estado=estado,
+                fecha_programada=ahora + timedelta(days=dias),
+                fecha_inicio=ahora if estado != Visita.EstadoVisitaChoices.PROGRAMADA else None,
+                fecha_fin=ahora if estado == Visita.EstadoVisitaChoices.COMPLETADA else None,
+                tipo_visita=Visita.TipoVisitaChoices.MANTENIMIENTO,
+                descripcion='Mantenimiento')
+        self.proxima = ahora + timedelta(days=2)
+
+    def listar(self, **params):
+        response = self.client.get('/api/clientes/', params)
+        self.assertEqual(response.status_code, 200)
+        return {c['idCliente']: c for c in response.json()['data']}
+
+    def test_estadisticas_completas_y_proyectadas(self):
+        for params in ({}, {'view': 'compact'}, {'fields': 'idCliente'}):
+            with self.subTest(params=params):
+                data = self.listar(estadisticas='true', **params)
+                con = data[self.con_visitas.id]
+                self.assertEqual(
+                    (con['totalVisitas'], con['visitasAbiertas'],
+                     con['visitasProgramadas'], con['visitasEnProgreso']),
+                    (5, 3, 2, 1))
+                self.assertIsNotNone(con['ultimaVisita'])
+                self.assertTrue(con['proximaVisita'].startswith(
+                    self.proxima.date().isoformat()))
+                sin = data[self.sin_visitas.id]
+                self.assertEqual((sin['totalVisitas'], sin['ultimaVisita']), (0, None))
+
+    def test_sin_estadisticas_no_consulta_visitas(self):
+        for params in ({}, {'view': 'compact'}, {'fields': 'idCliente,nombre'}):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    data = self.listar(**params)
+                self.assertNotIn('totalVisitas', data[self.con_visitas.id])
+                self.assertFalse(any(
+                    '"visitas"' in q['sql'] for q in queries.captured_queries))
+
+    def test_campos_de_estadisticas_requieren_el_parametro(self):
+        for url, params in (
+                ('/api/clientes/', {}),
+                ('/api/clientes/cercanos/', {'lat': 14.6, 'lng': -90.5}),
+                ('/api/clientes/bbox/', {
+                    'lat_min': 14.5, 'lat_max': 14.7,
+                    'lng_min': -90.6, 'lng_max': -90.4})):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'fields': 'idCliente,totalVisitas', **params})
+                self.assertEqual(response.status_code, 400)
+        data = self.listar(estadisticas='true', fields='idCliente,totalVisitas')
+        self.assertEqual(data[self.con_visitas.id]['totalVisitas'], 5)
+
+
+class ClientesImportacionTest(ClientesTestMixin, TestCase):
+    """
+    Importación CSV: validación por fila, lotes con bulk_create y
+    atomicidad ante un archivo ilegible
+    """
+
+    ENCABEZADO = 'nombre,contacto,telefono,email,direccion,latitud,longitud,tipoCliente\n'
+
+    def fila(self, i, latitud='14.6349', longitud='-90.5069', **kwargs):
+        datos = {
+            'nombre': f'cliente {i}', 'contacto': 'ana lopez', 'telefono': '12345678',
+            'email': f'cliente{i}@empresa.com', 'direccion': 'Zona 10 Guatemala City',
+            'latitud': latitud, 'longitud': longitud, 'tipoCliente': 'corporativo',
+        }
+        datos.update(kwargs)
+        return ','.join(datos.values()) + '\n'
+
+    def importar(self, contenido, **params):
+        archivo = SimpleUploadedFile('clientes.csv', contenido.encode(), 'text/csv')
+        url = '/api/clientes/import/'
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(url, {'archivo': archivo}, format='multipart')
+
+    def test_crea_por_lotes_y_reporta_errores(self):
+        self.crear_cliente('Existente', email='existente@empresa.com')
+        contenido = self.ENCABEZADO + ''.join([
+            self.fila(1),
+            self.fila(2, latitud='', longitud=''),
+            self.fila(3, telefono='123'),
+            self.fila(4, email='cliente1@empresa.com'),
+            self.fila(5, email='existente@empresa.com'),
+            self.fila(6, latitud='14.6'),
+        ])
+        response = self.importar(contenido)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['total'], data['creados'], data['con_errores']), (6, 3, 3))
+        self.assertEqual([e['fila'] for e in data['errores']], [4, 5, 6])
+        self.assertIn('telefono', data['errores'][0]['errores'])
+        self.assertIn('fila 2', data['errores'][1]['errores']['email'][0])
+
+        cliente = Cliente.objects.get(email='cliente1@empresa.com')
+        self.assertEqual(cliente.nombre, 'Cliente 1')
+        self.assertEqual(cliente.tipo_cliente, 'CORPORATIVO')
+        self.assertEqual(cliente.latitud, Decimal('14.6349'))
+        self.assertEqual(cliente.geohash, geohash_cliente(14.6349, -90.5069))
+        self.assertIsNotNone(cliente.fecha_creacion)
+        self.assertEqual(Cliente.objects.get(email='cliente2@empresa.com').geohash, '')
+
+    def test_coordenadas_como_el_serializer(self):
+        contenido = self.ENCABEZADO + ''.join([
+            self.fila(1, latitud='14.123456789'),
+            self.fila(2, longitud='-90.5069123456'),
+            self.fila(3, latitud='19.5'),
+            self.fila(4, latitud='norte'),
+            self.fila(5, latitud='NaN'),
+            self.fila(6, latitud='14.12345678'),
+        ])
+        data = self.importar(contenido).json()['data']
+        errores = {e['fila']: e['errores'] for e in data['errores']}
+        self.assertEqual(sorted(errores), [2, 3, 4, 5, 6])
+        self.assertIn('latitud', errores[2])
+        self.assertIn('longitud', errores[3])
+        self.assertEqual(Cliente.objects.get().latitud, Decimal('14.12345678'))
+
+    def test_dry_run_y_punto_y_coma(self):
+        contenido = (self.ENCABEZADO + self.fila(1) + self.fila(2)).replace(',', ';')
+        data = self.importar(contenido, dry_run='true').json()['data']
+        self.assertEqual(data['creados'], 2)
+        self.assertFalse(Cliente.objects.exists())
+
+    def test_archivo_ilegible_no_deja_lotes_creados(self):
+        # El error de decodificación aparece después de varios lotes insertados
+        contenido = (self.ENCABEZADO + ''.join(
+            self.fila(i) for i in range(300))).encode() + b'\xff\xfe,\n'
+        with self.assertRaises(UnicodeDecodeError):
+            importar_clientes(leer_csv(io.BytesIO(contenido)), chunk_size=50)
+        self.assertFalse(Cliente.objects.exists())
+
+        archivo = SimpleUploadedFile('clientes.csv', contenido, 'text/csv')
+        response = self.client.post(
+            '/api/clientes/import/', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Cliente.objects.exists())
+
+    def test_solo_administradores_y_supervisores(self):
+        tecnico = Usuario.objects.create_user(
+            email='tecnico@skynet.com', nombre='Juan', apellido='Perez',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO)
+        self.client.force_authenticate(tecnico)
+        response = self.importar(self.ENCABEZADO + self.fila(1))
+        self.assertEqual(response.status_code, 403)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Índice FTS5 de SQLite')
+class ClientesBusquedaSQLiteTest(ClientesTestMixin, TestCase):
+
+    def test_usa_fts_y_ordena_por_bm25(self):
+        if not fts_disponible():
+            self.skipTest('SQLite sin FTS5 trigram')
+        parcial = self.crear_cliente('Servicios Industriales', contacto='Eva Ruiz')
+        exacto = self.crear_cliente('Industrial', contacto='Industrial Ruiz')
+        queryset = buscar_clientes(Cliente.objects.all(), 'Industrial')
+        self.assertIn('clientes_fts', str(queryset.query))
+        self.assertEqual(
+            list(queryset.order_by('-rango', 'id').values_list('id', flat=True)),
+            [exacto.id, parcial.id])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Índice pg_trgm de PostgreSQL')
+class ClientesBusquedaPostgreSQLTest(ClientesTestMixin, TestCase):
+
+    def test_usa_el_indice_trgm(self):
+        self.crear_cliente('Servicios Industriales')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = buscar_clientes(Cliente.objects.all(), 'Industrial').explain()
+        self.assertIn('clientes_busqueda_trgm_idx', plan)
+
+    def test_rango_por_word_similarity(self):
+        parcial = self.crear_cliente('Servicios Industriales')
+        exacto = self.crear_cliente('Industrial')
+        queryset = buscar_clientes(Cliente.objects.all(), 'Industrial')
+        self.assertEqual(
+            list(queryset.order_by('-rango', 'id').values_list('id', flat=True))[:1],
+            [exacto.id])
+        self.assertIn(parcial.id, queryset.values_list('id', flat=True))
@@ -8,7 +8,10 @@ from .views import (
     clientes_create_view,
     clientes_detail_view,
     clientes_update_view,
-    clientes_delete_view
+    clientes_delete_view,
+    clientes_cercanos_view,
+    clientes_bbox_view,
+    clientes_import_view
 )
 
 app_name = 'clientes'
@@ -17,7 +20,12 @@ urlpatterns = [
     # CRUD de clientes - siguiendo la especificación del frontend
     path('', clientes_list_view, name='clientes_list'),
     path('create/', clientes_create_view, name='clientes_create'),
+    path('import/', clientes_import_view, name='clientes_import'),
     path('<int:pk>/', clientes_detail_view, name='clientes_detail'),
     path('<int:pk>/update/', clientes_update_view, name='clientes_update'),
     path('<int:pk>/delete/', clientes_delete_view, name='clientes_delete'),
+
+    # Consultas geográficas para el mapa
+    path('cercanos/', clientes_cercanos_view, name='clientes_cercanos'),
+    path('bbox/', clientes_bbox_view, name='clientes_bbox'),
 ]
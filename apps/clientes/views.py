@@ -2,6 +2,8 @@
 SKYNET - Vistas del módulo de clientes
 """
 
+import csv
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -9,13 +11,26 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Cliente
+from .busqueda import buscar_clientes
+from .importacion import importar_clientes, leer_csv
+from .geo import celdas_bbox, celdas_vecindad, filtro_celdas, haversine_km
+from apps.utils.pagination import KeysetPaginator, CursorInvalido
+from apps.utils.projection import CampoProyeccionInvalido
 from .serializers import (
+    CLIENTE_ESTADISTICAS_PROYECCION,
+    CLIENTE_PROYECCION,
+    ESTADISTICAS_VISITAS,
     ClienteSerializer,
+    ClienteEstadisticasSerializer,
     ClienteCreateSerializer,
     ClienteUpdateSerializer
 )
 
 
+# Orden de los resultados de búsqueda (más relevantes primero)
+CLIENTES_BUSQUEDA_ORDERING = ['-rango', 'id']
+
+
 # ==============================================================================
 # CRUD DE CLIENTES
 # ==============================================================================
@@ -41,9 +56,47 @@ from .serializers import (
         openapi.Parameter(
             'search',
             openapi.IN_QUERY,
-            description="Buscar por nombre, contacto o email",
+            description=(
+                "Buscar por nombre, contacto o email (índice de trigramas). "
+                "Los resultados se ordenan por relevancia y se paginan por cursor"
+            ),
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'cursor',
+            openapi.IN_QUERY,
+            description="Cursor de la página siguiente de una búsqueda (pagination.next_cursor)",
             type=openapi.TYPE_STRING
         ),
+        openapi.Parameter(
+            'page_size',
+            openapi.IN_QUERY,
+            description="Resultados por página de una búsqueda (máximo 100)",
+            type=openapi.TYPE_INTEGER
+        ),
+        openapi.Parameter(
+            'view',
+            openapi.IN_QUERY,
+            description="Vista compacta para grids",
+            type=openapi.TYPE_STRING,
+            enum=['compact']
+        ),
+        openapi.Parameter(
+            'fields',
+            openapi.IN_QUERY,
+            description="Campos a devolver separados por coma (ej. idCliente,nombre,telefono)",
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'estadisticas',
+            openapi.IN_QUERY,
+            description=(
+                "Incluir estadísticas de visitas (totalVisitas, visitasAbiertas, "
+                "visitasProgramadas, visitasEnProgreso, ultimaVisita, proximaVisita) "
+                "calculadas en la misma query"
+            ),
+            type=openapi.TYPE_BOOLEAN
+        ),
     ],
     responses={
         200: openapi.Response(
@@ -81,8 +134,30 @@ def clientes_list_view(request):
     """
     Vista para listar clientes con filtros
     """
+    # Estadísticas de visitas: agregados en la misma query del listado
+    estadisticas = request.GET.get('estadisticas', '').lower() == 'true'
+    proyeccion = CLIENTE_ESTADISTICAS_PROYECCION if estadisticas else CLIENTE_PROYECCION
+
+    # Modo compacto: proyección en SQL sin ModelSerializer
+    try:
+        campos = proyeccion.claves_solicitadas(request.GET)
+    except CampoProyeccionInvalido as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en los campos solicitados',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer_class = ClienteSerializer
+    if estadisticas and campos is not None:
+        campos += [c for c in ESTADISTICAS_VISITAS if c not in campos]
+
     # Todos los usuarios autenticados pueden ver clientes
     queryset = Cliente.objects.all()
+    if estadisticas and campos is None:
+        queryset = queryset.annotate(**ESTADISTICAS_VISITAS)
+        serializer_class = ClienteEstadisticasSerializer
 
     # Aplicar filtros
     tipo_cliente = request.GET.get('tipo_cliente')
@@ -94,30 +169,64 @@ def clientes_list_view(request):
         is_active = activo.lower() == 'true'
         queryset = queryset.filter(activo=is_active)
 
-    search = request.GET.get('search')
+    search = request.GET.get('search', '').strip()
     if search:
-        queryset = queryset.filter(
-            nombre__icontains=search
-        ) | queryset.filter(
-            contacto__icontains=search
-        ) | queryset.filter(
-            email__icontains=search
-        )
+        return _clientes_busqueda_response(
+            request, queryset, search, campos, serializer_class, proyeccion)
 
     # Ordenar por nombre
     queryset = queryset.order_by('nombre')
 
     # Serializar datos
-    serializer = ClienteSerializer(queryset, many=True)
+    if campos is None:
+        data = serializer_class(queryset, many=True).data
+    else:
+        data = proyeccion.representar(proyeccion.values(queryset, campos), campos)
 
     return Response({
         'success': True,
-        'data': serializer.data,
+        'data': data,
         'message': 'Clientes obtenidos exitosamente',
         'errors': []
     }, status=status.HTTP_200_OK)
 
 
+def _clientes_busqueda_response(request, queryset, search, campos,
+                                serializer_class=ClienteSerializer,
+                                proyeccion=CLIENTE_PROYECCION):
+    """
+    Resultados de búsqueda ordenados por relevancia y paginados por cursor
+    """
+    queryset = buscar_clientes(queryset, search)
+    paginator = KeysetPaginator(CLIENTES_BUSQUEDA_ORDERING)
+    if campos is not None:
+        queryset = proyeccion.values(
+            queryset, campos, internos=paginator.campos)
+
+    try:
+        clientes, siguiente = paginator.paginate_queryset(queryset, request)
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la paginación',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if campos is None:
+        data = serializer_class(clientes, many=True).data
+    else:
+        data = proyeccion.representar(clientes, campos)
+
+    return Response({
+        'success': True,
+        'data': data,
+        'message': 'Clientes obtenidos exitosamente',
+        'errors': [],
+        'pagination': paginator.get_pagination_data(siguiente)
+    }, status=status.HTTP_200_OK)
+
+
 @swagger_auto_schema(
     method='post',
     operation_description="Crear un nuevo cliente en el sistema",
@@ -428,3 +537,323 @@ def clientes_delete_view(request, pk):
         'message': 'Cliente eliminado exitosamente',
         'errors': []
     }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# CONSULTAS GEOGRÁFICAS
+# ==============================================================================
+
+# Límites de las consultas geográficas
+RADIO_KM_DEFECTO = 5
+RADIO_KM_MAXIMO = 100
+LIMITE_CERCANOS_DEFECTO = 20
+LIMITE_CERCANOS_MAXIMO = 100
+LIMITE_BBOX_DEFECTO = 500
+LIMITE_BBOX_MAXIMO = 2000
+
+
+def _parametro_numerico(params, nombre, minimo, maximo, defecto=None, tipo=float):
+    """
+    Lee un parámetro numérico de la query string dentro de [minimo, maximo].
+    Lanza ValueError con un mensaje para el cliente si es inválido.
+    """
+    valor = params.get(nombre)
+    if valor in (None, ''):
+        if defecto is None:
+            raise ValueError(f'El parámetro {nombre} es requerido.')
+        return defecto
+    try:
+        valor = tipo(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'El parámetro {nombre} debe ser numérico.')
+    if not (minimo <= valor <= maximo):
+        raise ValueError(
+            f'El parámetro {nombre} debe estar entre {minimo} y {maximo}.')
+    return valor
+
+
+def _clientes_geo_queryset(request, celdas):
+    queryset = Cliente.objects.filter(filtro_celdas(celdas))
+    activo = request.GET.get('activo')
+    if activo is not None:
+        queryset = queryset.filter(activo=activo.lower() == 'true')
+    return queryset
+
+
+def _representar_clientes(queryset, campos):
+    """Clientes completos o proyectados (view/fields) indexados por id"""
+    if campos is None:
+        return {
+            cliente.id: ClienteSerializer(cliente).data for cliente in queryset
+        }
+    filas = list(CLIENTE_PROYECCION.values(queryset, campos, internos=['id']))
+    return {
+        fila['id']: datos
+        for fila, datos in zip(filas, CLIENTE_PROYECCION.representar(filas, campos))
+    }
+
+
+def _error_parametros(mensaje):
+    return Response({
+        'success': False,
+        'data': None,
+        'message': 'Error en los parámetros',
+        'errors': [mensaje]
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Clientes dentro de un radio, ordenados por distancia. Se prefiltran "
+        "por celdas geohash indexadas y se ordenan con la distancia haversine"
+    ),
+    operation_summary="Clientes Cercanos",
+    manual_parameters=[
+        openapi.Parameter('lat', openapi.IN_QUERY, description="Latitud del punto",
+                          type=openapi.TYPE_NUMBER, required=True),
+        openapi.Parameter('lng', openapi.IN_QUERY, description="Longitud del punto",
+                          type=openapi.TYPE_NUMBER, required=True),
+        openapi.Parameter('radio_km', openapi.IN_QUERY,
+                          description=f"Radio en km (defecto {RADIO_KM_DEFECTO}, máximo {RADIO_KM_MAXIMO})",
+                          type=openapi.TYPE_NUMBER),
+        openapi.Parameter('limite', openapi.IN_QUERY,
+                          description=f"Máximo de clientes (defecto {LIMITE_CERCANOS_DEFECTO})",
+                          type=openapi.TYPE_INTEGER),
+        openapi.Parameter('activo', openapi.IN_QUERY, description="Filtrar por estado activo",
+                          type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter('view', openapi.IN_QUERY, description="Vista compacta",
+                          type=openapi.TYPE_STRING, enum=['compact']),
+        openapi.Parameter('fields', openapi.IN_QUERY,
+                          description="Campos a devolver separados por coma",
+                          type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response(
+            description="Clientes cercanos",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": [
+                        {
+                            "idCliente": 1,
+                            "nombre": "Empresa XYZ",
+                            "latitud": 14.6349,
+                            "longitud": -90.5069,
+                            "distanciaKm": 0.842
+                        }
+                    ],
+                    "message": "Clientes cercanos obtenidos exitosamente",
+                    "errors": []
+                }
+            }
+        ),
+        400: "Parámetros inválidos"
+    },
+    tags=['Clientes']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def clientes_cercanos_view(request):
+    """
+    Vista para listar los clientes más cercanos a un punto
+    """
+    try:
+        campos = CLIENTE_PROYECCION.claves_solicitadas(request.GET)
+        latitud = _parametro_numerico(request.GET, 'lat', -90, 90)
+        longitud = _parametro_numerico(request.GET, 'lng', -180, 180)
+        radio_km = _parametro_numerico(
+            request.GET, 'radio_km', 0.01, RADIO_KM_MAXIMO, RADIO_KM_DEFECTO)
+        limite = _parametro_numerico(
+            request.GET, 'limite', 1, LIMITE_CERCANOS_MAXIMO,
+            LIMITE_CERCANOS_DEFECTO, tipo=int)
+    except (CampoProyeccionInvalido, ValueError) as e:
+        return _error_parametros(str(e))
+
+    # 1. Candidatos de la celda del punto y sus vecinas (índice geohash)
+    candidatos = list(_clientes_geo_queryset(
+        request, celdas_vecindad(latitud, longitud, radio_km)
+    ).values_list('id', 'latitud', 'longitud'))
+
+    # 2. Distancia exacta por lote, recorte por radio y orden
+    distancias = haversine_km(latitud, longitud, [
+        (float(lat), float(lng)) for _, lat, lng in candidatos])
+    cercanos = sorted(
+        (distancia, cliente_id)
+        for (cliente_id, _, _), distancia in zip(candidatos, distancias)
+        if distancia <= radio_km
+    )[:limite]
+
+    # 3. Solo se cargan las filas completas de los clientes devueltos
+    representaciones = _representar_clientes(
+        Cliente.objects.filter(id__in=[cliente_id for _, cliente_id in cercanos]),
+        campos)
+    data = []
+    for distancia, cliente_id in cercanos:
+        cliente = representaciones[cliente_id]
+        cliente['distanciaKm'] = round(distancia, 3)
+        data.append(cliente)
+
+    return Response({
+        'success': True,
+        'data': data,
+        'message': 'Clientes cercanos obtenidos exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Clientes dentro de un rectángulo (vista del mapa). Se prefiltran por "
+        "celdas geohash indexadas y se filtran por coordenadas exactas"
+    ),
+    operation_summary="Clientes en Área",
+    manual_parameters=[
+        openapi.Parameter('lat_min', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                          description="Latitud sur"),
+        openapi.Parameter('lat_max', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                          description="Latitud norte"),
+        openapi.Parameter('lng_min', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                          description="Longitud oeste"),
+        openapi.Parameter('lng_max', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                          description="Longitud este"),
+        openapi.Parameter('limite', openapi.IN_QUERY,
+                          description=f"Máximo de clientes (defecto {LIMITE_BBOX_DEFECTO}, máximo {LIMITE_BBOX_MAXIMO})",
+                          type=openapi.TYPE_INTEGER),
+        openapi.Parameter('activo', openapi.IN_QUERY, description="Filtrar por estado activo",
+                          type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter('view', openapi.IN_QUERY, description="Vista compacta",
+                          type=openapi.TYPE_STRING, enum=['compact']),
+        openapi.Parameter('fields', openapi.IN_QUERY,
+                          description="Campos a devolver separados por coma",
+                          type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response(description="Clientes en el área"),
+        400: "Parámetros inválidos"
+    },
+    tags=['Clientes']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def clientes_bbox_view(request):
+    """
+    Vista para listar los clientes dentro de un bounding box
+    """
+    try:
+        campos = CLIENTE_PROYECCION.claves_solicitadas(request.GET)
+        lat_min = _parametro_numerico(request.GET, 'lat_min', -90, 90)
+        lat_max = _parametro_numerico(request.GET, 'lat_max', -90, 90)
+        lng_min = _parametro_numerico(request.GET, 'lng_min', -180, 180)
+        lng_max = _parametro_numerico(request.GET, 'lng_max', -180, 180)
+        limite = _parametro_numerico(
+            request.GET, 'limite', 1, LIMITE_BBOX_MAXIMO,
+            LIMITE_BBOX_DEFECTO, tipo=int)
+        if lat_min > lat_max or lng_min > lng_max:
+            raise ValueError('lat_min/lng_min deben ser menores que lat_max/lng_max.')
+    except (CampoProyeccionInvalido, ValueError) as e:
+        return _error_parametros(str(e))
+
+    queryset = _clientes_geo_queryset(
+        request, celdas_bbox(lat_min, lat_max, lng_min, lng_max)
+    ).filter(
+        latitud__gte=lat_min, latitud__lte=lat_max,
+        longitud__gte=lng_min, longitud__lte=lng_max
+    ).order_by('nombre')[:limite]
+
+    data = list(_representar_clientes(queryset, campos).values())
+
+    return Response({
+        'success': True,
+        'data': data,
+        'message': 'Clientes obtenidos exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# IMPORTACIÓN MASIVA
+# ==============================================================================
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Importar clientes desde un archivo CSV (multipart, campo 'archivo'). "
+        "Columnas: nombre, contacto, telefono, email, direccion, latitud, "
+        "longitud, tipo_cliente. Las filas válidas se crean por lotes y las "
+        "inválidas se reportan con su número de fila"
+    ),
+    operation_summary="Importar Clientes",
+    manual_parameters=[
+        openapi.Parameter('archivo', openapi.IN_FORM, type=openapi.TYPE_FILE,
+                          required=True, description="Archivo CSV (UTF-8, separador , o ;)"),
+        openapi.Parameter('dry_run', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                          description="Solo validar, sin crear clientes"),
+    ],
+    responses={
+        200: openapi.Response(
+            description="Resumen de la importación",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {
+                        "total": 3,
+                        "creados": 2,
+                        "con_errores": 1,
+                        "errores": [
+                            {"fila": 4, "errores": {"telefono": ["Ingrese un número de teléfono válido para Guatemala. ..."]}}
+                        ],
+                        "errores_truncados": False
+                    },
+                    "message": "Importación completada",
+                    "errors": []
+                }
+            }
+        ),
+        400: "Archivo faltante o ilegible",
+        403: "Sin permisos"
+    },
+    tags=['Clientes']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def clientes_import_view(request):
+    """
+    Vista para importar clientes en lote desde CSV
+    """
+    # Verificar permisos (administradores y supervisores pueden crear clientes)
+    if not (request.user.es_administrador or request.user.es_supervisor):
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'No tienes permisos para importar clientes',
+            'errors': ['Solo administradores y supervisores pueden importar clientes']
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la importación',
+            'errors': ['Debe adjuntar el archivo CSV en el campo "archivo"']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = str(request.query_params.get('dry_run', '')).lower() == 'true'
+    try:
+        resumen = importar_clientes(leer_csv(archivo.file), dry_run=dry_run)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la importación',
+            'errors': [f'No se pudo leer el archivo: {e}']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'data': resumen.to_dict(),
+        'message': 'Validación completada' if dry_run else 'Importación completada',
+        'errors': []
+    }, status=status.HTTP_200_OK)
@@ -5,10 +5,144 @@ SKYNET - Autenticación JWT Personalizada
 import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework import authentication, exceptions
+from .cache import user_cache
+from .revocacion import registro_revocaciones
 
 User = get_user_model()
 
+# Campos del modelo que viajan en el access token (claim -> campo)
+CLAIMS_USUARIO = {
+    'user_id': 'id',
+    'email': 'email',
+    'nombre': 'nombre',
+    'apellido': 'apellido',
+    'rol': 'rol',
+}
+
+# Métodos que pueden autenticarse solo con los claims
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def usuario_desde_claims(payload):
+    """
+    Construye un Usuario a partir de los claims verificados del token sin
+    consultar la base de datos. Los campos que el token no trae quedan
+    diferidos y se cargan juntos (una query) la primera vez que se usan.
+    Retorna None si al token le falta algún claim.
+    """
+    if payload.get('token_type') != 'access':
+        return None
+    try:
+        valores = tuple(payload[claim] for claim in CLAIMS_USUARIO)
+    except KeyError:
+        return None
+
+    user = User.from_db(
+        DEFAULT_DB_ALIAS, list(CLAIMS_USUARIO.values()), valores)
+    user._desde_claims = True
+    return user
+
+
+def _decodificar(token, tipo):
+    """Payload verificado de un token del ``tipo`` indicado"""
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        msg = 'Token de autenticación inválido.'
+        raise exceptions.AuthenticationFailed(msg)
+
+    if payload.get('token_type') != tipo:
+        # Cada tipo sirve solo en su endpoint (el refresh en la renovación,
+        # el ticket en el stream de eventos)
+        msg = 'Token de autenticación inválido.'
+        raise exceptions.AuthenticationFailed(msg)
+    return payload
+
+
+def _verificar_revocacion(jti):
+    # Filtro en memoria: un token no revocado no genera queries
+    if jti and registro_revocaciones.esta_revocado(jti):
+        msg = 'El token ha sido revocado.'
+        raise exceptions.AuthenticationFailed(msg)
+
+
+def _usuario_activo(user_id, fresco=False):
+    try:
+        # Caché por proceso (y opcionalmente compartida) con TTL corto
+        user = user_cache.get(user_id, fresco=fresco)
+    except User.DoesNotExist:
+        msg = 'No se encontró el usuario correspondiente al token.'
+        raise exceptions.AuthenticationFailed(msg)
+
+    if not user.is_active:
+        msg = 'La cuenta del usuario ha sido desactivada.'
+        raise exceptions.AuthenticationFailed(msg)
+    return user
+
+
+def autenticar_token(token, usar_claims=False, fresco=False):
+    """
+    Usuario de un access token. Con ``usar_claims`` puede construirse desde
+    los claims sin consultar la base de datos; con ``fresco`` se lee la
+    fila actual en lugar de la caché. Lanza AuthenticationFailed
+    si el token no es válido.
+    """
+    payload = _decodificar(token, 'access')
+    _verificar_revocacion(payload.get('jti'))
+
+    if usar_claims:
+        # Una entrada vigente en la caché es más reciente que el token
+        user = user_cache.peek(payload.get('user_id'))
+        if user is None:
+            user = usuario_desde_claims(payload)
+            if user is not None:
+                return user
+        elif not user.is_active:
+            msg = 'La cuenta del usuario ha sido desactivada.'
+            raise exceptions.AuthenticationFailed(msg)
+        else:
+            return user
+
+    if 'user_id' not in payload:
+        msg = 'No se encontró el usuario correspondiente al token.'
+        raise exceptions.AuthenticationFailed(msg)
+    return _usuario_activo(payload['user_id'], fresco=fresco)
+
+
+def autenticar_sesion(token=None, ticket=None):
+    """
+    (usuario, jti, exp) de la sesión de un access token o de un ticket del
+    stream de eventos (ver tokens.emitir_ticket_stream). Lo usan los
+    endpoints servidos fuera de DRF (stream de eventos ASGI), que vuelven a
+    verificar la sesión con verificar_sesion() mientras la conexión sigue
+    abierta. Lanza AuthenticationFailed si no es válido.
+    """
+    if ticket is not None:
+        payload = _decodificar(ticket, 'stream')
+        jti, exp = payload.get('sesion_jti'), payload.get('sesion_exp')
+    else:
+        payload = _decodificar(token, 'access')
+        jti, exp = payload.get('jti'), payload.get('exp')
+    if 'user_id' not in payload or exp is None:
+        msg = 'Token de autenticación inválido.'
+        raise exceptions.AuthenticationFailed(msg)
+    return verificar_sesion(payload['user_id'], jti), jti, exp
+
+
+def verificar_sesion(user_id, jti):
+    """
+    Usuario de una sesión ya autenticada si sigue vigente: el access token
+    no fue revocado y la cuenta sigue activa. Lanza AuthenticationFailed.
+    """
+    _verificar_revocacion(jti)
+    return _usuario_activo(user_id)
+
 
 class JWTAuthentication(authentication.BaseAuthentication):
     """
@@ -52,24 +186,20 @@ class JWTAuthentication(authentication.BaseAuthentication):
         """
         Intenta autenticar las credenciales dadas.
         """
-        try:
-            payload = jwt.decode(
-                token,
-                settings.SECRET_KEY,
-                algorithms=[settings.JWT_ALGORITHM]
-            )
-        except jwt.InvalidTokenError:
-            msg = 'Token de autenticación inválido.'
-            raise exceptions.AuthenticationFailed(msg)
-
-        try:
-            user = User.objects.get(pk=payload['user_id'])
-        except User.DoesNotExist:
-            msg = 'No se encontró el usuario correspondiente al token.'
-            raise exceptions.AuthenticationFailed(msg)
-
-        if not user.is_active:
-            msg = 'La cuenta del usuario ha sido desactivada.'
-            raise exceptions.AuthenticationFailed(msg)
+        return (autenticar_token(
+            token,
+            usar_claims=self._usar_claims(request),
+            fresco=request.method not in METODOS_SEGUROS
+        ), token)
 
-        return (user, token)
+    def _usar_claims(self, request):
+        """
+        Con JWT_CLAIMS_USER activo las requests de solo lectura se autentican
+        con los claims del token; las escrituras siempre cargan la fila real
+        (sin caché), así que un save() de request.user no revierte cambios
+        hechos por otro proceso.
+        """
+        return (
+            getattr(settings, 'JWT_CLAIMS_USER', False)
+            and request.method in METODOS_SEGUROS
+        )
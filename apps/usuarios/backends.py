@@ -4,6 +4,7 @@ SKYNET - Backend de autenticación personalizado
 
 from django.contrib.auth.backends import BaseBackend
 from .models import Usuario
+from .passwords import HashingSaturado, verificador_passwords
 
 
 class EmailBackend(BaseBackend):
@@ -21,14 +22,14 @@ class EmailBackend(BaseBackend):
         if email is None or password is None:
             return None
 
-        try:
-            user = Usuario.objects.get(email=email)
-        except Usuario.DoesNotExist:
-            return None
+        user = Usuario.objects.filter(email=email).first()
 
-        # Verificar contraseña
-        if user.check_password(password):
-            return user
+        # Verificar contraseña (pool acotado, con rehash si es necesario)
+        try:
+            if verificador_passwords.verificar(user, password):
+                return user
+        except HashingSaturado:
+            pass
 
         return None
 
@@ -0,0 +1,145 @@
+"""
+SKYNET - Caché de usuarios para la autenticación JWT
+Evita el SELECT de usuarios en cada request autenticada.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Usuario
+
+
+class UserCache:
+    """
+    Caché de dos niveles para resolver el usuario de un token:
+
+    1. Diccionario local por proceso con TTL corto (sin red ni DB).
+    2. Opcionalmente, la caché compartida de Django (JWT_USER_CACHE_SHARED)
+       para que todos los workers aprovechen una misma carga.
+
+    Se guardan los valores de las columnas, no la instancia: cada acierto
+    construye un Usuario nuevo con ``from_db`` para que una vista que
+    modifique ``request.user`` no afecte a otras requests.
+    Las entradas se invalidan al guardar o eliminar un Usuario (signals);
+    en otros procesos la desactivación se aplica como máximo al vencer el TTL.
+    """
+    key_prefix = 'skynet:usuario:'
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._campos = [f.attname for f in Usuario._meta.concrete_fields]
+        self.hits_local = 0
+        self.hits_shared = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    # Configuración (se lee en cada uso para respetar override_settings)
+    @property
+    def ttl(self):
+        return getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', 10000)
+
+    @property
+    def shared(self):
+        if not getattr(settings, 'JWT_USER_CACHE_SHARED', False):
+            return None
+        return caches[getattr(settings, 'JWT_USER_CACHE_ALIAS', 'default')]
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}{user_id}'
+
+    def _construir(self, valores):
+        return Usuario.from_db(DEFAULT_DB_ALIAS, self._campos, valores)
+
+    def _guardar_local(self, user_id, valores):
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.ttl, valores)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def peek(self, user_id):
+        """
+        Usuario en la caché local si existe y no ha vencido (nunca consulta
+        la DB ni la caché compartida)
+        """
+        with self._lock:
+            entrada = self._local.get(user_id)
+        if entrada is None or entrada[0] < time.monotonic():
+            return None
+        return self._construir(entrada[1])
+
+    def get(self, user_id, fresco=False):
+        """
+        Obtiene el usuario por id. Lanza Usuario.DoesNotExist si no existe.
+        Con ``fresco`` lee siempre la fila de la DB (y renueva la caché):
+        las requests que escriben no deben partir de una copia vencida.
+        """
+        if self.ttl <= 0:
+            self.misses += 1
+            return Usuario.objects.get(pk=user_id)
+
+        if not fresco:
+            user = self.peek(user_id)
+            if user is not None:
+                self.hits_local += 1
+                return user
+
+        shared = None if fresco else self.shared
+        if shared is not None:
+            valores = shared.get(self._key(user_id))
+            if valores is not None:
+                self.hits_shared += 1
+                self._guardar_local(user_id, valores)
+                return self._construir(valores)
+
+        self.misses += 1
+        user = Usuario.objects.get(pk=user_id)
+        valores = tuple(getattr(user, campo) for campo in self._campos)
+        self._guardar_local(user_id, valores)
+        shared = self.shared
+        if shared is not None:
+            shared.set(self._key(user_id), valores, self.ttl)
+        return user
+
+    def invalidate(self, user_id):
+        """Elimina el usuario de ambos niveles de caché"""
+        with self._lock:
+            self._local.pop(user_id, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._key(user_id))
+        self.invalidaciones += 1
+
+    def clear(self):
+        """Vacía la caché local y reinicia los contadores"""
+        with self._lock:
+            self._local.clear()
+        self.hits_local = self.hits_shared = self.misses = 0
+        self.invalidaciones = 0
+
+    def stats(self):
+        """Contadores de aciertos/fallos para monitoreo"""
+        total = self.hits_local + self.hits_shared + self.misses
+        return {
+            'entradas_locales': len(self._local),
+            'hits_local': self.hits_local,
+            'hits_shared': self.hits_shared,
+            'misses': self.misses,
+            'invalidaciones': self.invalidaciones,
+            'hit_ratio': round(
+                (self.hits_local + self.hits_shared) / total, 4) if total else None,
+        }
+
+
+# Instancia única por proceso
+user_cache = UserCache()
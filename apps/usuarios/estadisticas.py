@@ -0,0 +1,130 @@
+"""
+SKYNET - Estadísticas de usuarios para dashboards
+Los conteos por (rol, activo) se mantienen en ContadorUsuarios desde las
+señales de Usuario, así que leerlos cuesta una query sobre a lo sumo seis
+filas. El conteo real se obtiene en una sola query de agregados
+condicionales y se usa como respaldo y para reconciliar.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import ContadorUsuarios, Usuario
+
+ROLES = list(Usuario.RolChoices.values)
+
+# Campos que mueven a un usuario entre contadores
+CAMPOS_CONTADORES = {'rol', 'activo'}
+
+# Clave de la respuesta por rol (compatible con la respuesta anterior)
+CLAVES_ROL = {
+    Usuario.RolChoices.ADMINISTRADOR: 'administradores',
+    Usuario.RolChoices.SUPERVISOR: 'supervisores',
+    Usuario.RolChoices.TECNICO: 'tecnicos',
+}
+
+
+def _alias(rol, activo):
+    return f"{rol.lower()}_{'activos' if activo else 'inactivos'}"
+
+
+def contar_usuarios():
+    """
+    Cantidad real de usuarios por (rol, activo) en una sola query
+    (un COUNT ... FILTER por combinación)
+    """
+    agregados = {
+        _alias(rol, activo): Count('id', filter=Q(rol=rol, activo=activo))
+        for rol in ROLES
+        for activo in (True, False)
+    }
+    resultado = Usuario.objects.aggregate(**agregados)
+    return {
+        (rol, activo): resultado[_alias(rol, activo)]
+        for rol in ROLES
+        for activo in (True, False)
+    }
+
+
+def leer_contadores():
+    """Conteos por (rol, activo) desde la tabla de contadores"""
+    return {
+        (rol, activo): total
+        for rol, activo, total in ContadorUsuarios.objects.values_list(
+            'rol', 'activo', 'total')
+    }
+
+
+def formatear_estadisticas(conteos):
+    """Respuesta del dashboard a partir de los conteos por (rol, activo)"""
+    datos = {'total_usuarios': sum(conteos.values())}
+    por_rol = {}
+    for rol in ROLES:
+        activos = conteos.get((rol, True), 0)
+        inactivos = conteos.get((rol, False), 0)
+        datos[CLAVES_ROL.get(rol, rol.lower())] = activos + inactivos
+        por_rol[rol] = {'activos': activos, 'inactivos': inactivos}
+    datos['activos'] = sum(v for (_, activo), v in conteos.items() if activo)
+    datos['inactivos'] = sum(v for (_, activo), v in conteos.items() if not activo)
+    datos['por_rol'] = por_rol
+    return datos
+
+
+def estadisticas_usuarios():
+    """
+    Estadísticas para el dashboard. Si los contadores aún no se han
+    inicializado se cuentan directamente (una query).
+    """
+    conteos = leer_contadores()
+    if not conteos:
+        conteos = contar_usuarios()
+    return formatear_estadisticas(conteos)
+
+
+def _sumar(rol, activo, delta):
+    actualizados = ContadorUsuarios.objects.filter(
+        rol=rol, activo=activo).update(total=F('total') + delta)
+    if not actualizados:
+        ContadorUsuarios.objects.get_or_create(rol=rol, activo=activo)
+        ContadorUsuarios.objects.filter(
+            rol=rol, activo=activo).update(total=F('total') + delta)
+
+
+def aplicar_cambio(anterior, nuevo):
+    """
+    Mueve un usuario entre contadores. ``anterior`` y ``nuevo`` son tuplas
+    (rol, activo) o None (alta / baja). El UPDATE es relativo
+    (total = total + delta) para no perder cambios concurrentes.
+    """
+    if anterior == nuevo:
+        return
+    if anterior is not None:
+        _sumar(*anterior, -1)
+    if nuevo is not None:
+        _sumar(*nuevo, 1)
+
+
+def reconciliar():
+    """
+    Reemplaza los contadores por el conteo real. Los contadores existentes
+    se bloquean primero: un cambio concurrente espera a que termine la
+    reconciliación o ya está incluido en el conteo.
+    Retorna la lista de desvíos corregidos (rol, activo, antes, ahora).
+    """
+    desvios = []
+    with transaction.atomic():
+        actuales = {
+            (c.rol, c.activo): c
+            for c in ContadorUsuarios.objects.select_for_update()
+        }
+        for clave, total in contar_usuarios().items():
+            contador = actuales.get(clave)
+            if contador is None:
+                ContadorUsuarios.objects.create(
+                    rol=clave[0], activo=clave[1], total=total)
+                desvios.append((clave[0], clave[1], None, total))
+            elif contador.total != total:
+                desvios.append((clave[0], clave[1], contador.total, total))
+                contador.total = total
+                contador.save(update_fields=['total'])
+    return desvios
@@ -0,0 +1,28 @@
+"""
+SKYNET - Hasher de contraseñas Argon2 con parámetros configurables
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class SkynetArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id con costos tomados de settings (ARGON2_TIME_COST,
+    ARGON2_MEMORY_COST en KiB, ARGON2_PARALLELISM). Conserva el algoritmo
+    'argon2', así que los hashes son compatibles con el hasher de Django;
+    al cambiar los costos, must_update() marca los hashes anteriores para
+    rehash en el siguiente login.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', 2)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', 19456)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', 1)
@@ -0,0 +1,24 @@
+"""
+SKYNET - Depuración de tokens expirados
+
+Uso:
+    python manage.py depurar_tokens
+
+Elimina las revocaciones y los refresh tokens ya expirados. Programarlo
+periódicamente (p. ej. cron cada hora); la verificación de tokens nunca
+ejecuta estos DELETE.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.usuarios.revocacion import registro_revocaciones
+
+
+class Command(BaseCommand):
+    help = 'Elimina las revocaciones y los refresh tokens expirados'
+
+    def handle(self, *args, **options):
+        eliminados = registro_revocaciones.depurar()
+        self.stdout.write(self.style.SUCCESS(
+            f"{eliminados['revocados']} revocaciones y "
+            f"{eliminados['refresco']} refresh tokens eliminados"))
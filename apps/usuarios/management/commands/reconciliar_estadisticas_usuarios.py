@@ -0,0 +1,26 @@
+"""
+SKYNET - Reconciliación de los contadores de estadísticas de usuarios
+
+Uso:
+    python manage.py reconciliar_estadisticas_usuarios
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.usuarios.estadisticas import reconciliar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de usuarios por rol y estado y corrige desvíos'
+
+    def handle(self, *args, **options):
+        desvios = reconciliar()
+        if not desvios:
+            self.stdout.write(self.style.SUCCESS('Contadores de usuarios al día'))
+            return
+        for rol, activo, antes, ahora in desvios:
+            estado = 'activos' if activo else 'inactivos'
+            self.stdout.write(self.style.WARNING(
+                f'{rol} {estado}: {antes if antes is not None else "sin contador"} -> {ahora}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(desvios)} contadores corregidos'))
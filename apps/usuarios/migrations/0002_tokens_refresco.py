@@ -0,0 +1,33 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRefresco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=32, unique=True, verbose_name='JTI')),
+                ('familia', models.CharField(db_index=True, max_length=32, verbose_name='Familia')),
+                ('fecha_expiracion', models.DateTimeField(verbose_name='Fecha de Expiración')),
+                ('fecha_uso', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Uso')),
+                ('revocado', models.BooleanField(default=False, verbose_name='Revocado')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens_refresco', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Token de Refresco',
+                'verbose_name_plural': 'Tokens de Refresco',
+                'db_table': 'tokens_refresco',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_tokens_refresco'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=32, unique=True, verbose_name='JTI')),
+                ('fecha_expiracion', models.DateTimeField(db_index=True, verbose_name='Fecha de Expiración')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de Creación')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tokens_revocados', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Token Revocado',
+                'verbose_name_plural': 'Tokens Revocados',
+                'db_table': 'tokens_revocados',
+            },
+        ),
+    ]
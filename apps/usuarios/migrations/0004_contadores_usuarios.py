@@ -0,0 +1,49 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def inicializar_contadores(apps, schema_editor):
+    """Crea un contador por (rol, activo) con el conteo actual"""
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    ContadorUsuarios = apps.get_model('usuarios', 'ContadorUsuarios')
+    conteos = {
+        (fila['rol'], fila['activo']): fila['total']
+        for fila in Usuario.objects.order_by().values('rol', 'activo').annotate(
+            total=Count('id'))
+    }
+    ContadorUsuarios.objects.bulk_create([
+        ContadorUsuarios(rol=rol, activo=activo, total=conteos.get((rol, activo), 0))
+        for rol in ('ADMINISTRADOR', 'SUPERVISOR', 'TECNICO')
+        for activo in (True, False)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_tokens_revocados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorUsuarios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rol', models.CharField(choices=[('ADMINISTRADOR', 'Administrador'), ('SUPERVISOR', 'Supervisor'), ('TECNICO', 'Técnico')], max_length=20, verbose_name='Rol')),
+                ('activo', models.BooleanField(verbose_name='Activo')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Contador de Usuarios',
+                'verbose_name_plural': 'Contadores de Usuarios',
+                'db_table': 'contadores_usuarios',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contadorusuarios',
+            constraint=models.UniqueConstraint(fields=('rol', 'activo'), name='contadores_usuarios_rol_activo_uniq'),
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-17 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_contadores_usuarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tokenrefresco',
+            name='access_jti',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='JTI del Access Token'),
+        ),
+    ]
@@ -97,3 +97,142 @@ class Usuario(AbstractBaseUser, PermissionsMixin, TimestampedModel):
     def is_active(self, value):
         """Setter para compatibilidad con Django Auth"""
         self.activo = value
+
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Las instancias construidas desde los claims del JWT solo traen
+        algunos campos: el primer acceso a un campo diferido carga todos
+        los restantes en una sola query en lugar de una por campo.
+        """
+        if fields is not None and getattr(self, '_desde_claims', False):
+            fields = set(fields) | self.get_deferred_fields()
+            self._desde_claims = False
+        super().refresh_from_db(using=using, fields=fields)
+
+
+class TokenRefresco(models.Model):
+    """
+    Refresh token emitido (identificado por su claim ``jti``).
+    Cada uso lo rota por uno nuevo de la misma familia; presentar de nuevo
+    un token ya usado revoca toda la familia (detección de reutilización).
+    """
+    jti = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name="JTI"
+    )
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='tokens_refresco',
+        verbose_name="Usuario"
+    )
+    familia = models.CharField(
+        max_length=32,
+        db_index=True,
+        verbose_name="Familia"
+    )
+    # Access token emitido junto con este refresh (para revocarlo)
+    access_jti = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        verbose_name="JTI del Access Token"
+    )
+    fecha_expiracion = models.DateTimeField(
+        verbose_name="Fecha de Expiración"
+    )
+    fecha_uso = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de Uso"
+    )
+    revocado = models.BooleanField(
+        default=False,
+        verbose_name="Revocado"
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+
+    class Meta:
+        verbose_name = "Token de Refresco"
+        verbose_name_plural = "Tokens de Refresco"
+        db_table = "tokens_refresco"
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.jti}"
+
+
+class TokenRevocado(models.Model):
+    """
+    Token revocado antes de su expiración (logout, desactivación).
+    Tabla persistente de respaldo del filtro en memoria de cada worker.
+    """
+    jti = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name="JTI"
+    )
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tokens_revocados',
+        verbose_name="Usuario"
+    )
+    fecha_expiracion = models.DateTimeField(
+        db_index=True,
+        verbose_name="Fecha de Expiración"
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Fecha de Creación"
+    )
+
+    class Meta:
+        verbose_name = "Token Revocado"
+        verbose_name_plural = "Tokens Revocados"
+        db_table = "tokens_revocados"
+
+    def __str__(self):
+        return self.jti
+
+
+class ContadorUsuarios(models.Model):
+    """
+    Cantidad de usuarios por (rol, activo), mantenida por las señales de
+    Usuario. Las estadísticas del dashboard leen estas filas (a lo sumo
+    una por combinación) en lugar de contar la tabla usuarios.
+    El comando reconciliar_estadisticas_usuarios corrige desvíos
+    (p. ej. tras un QuerySet.update()).
+    """
+    rol = models.CharField(
+        max_length=20,
+        choices=Usuario.RolChoices.choices,
+        verbose_name="Rol"
+    )
+    activo = models.BooleanField(
+        verbose_name="Activo"
+    )
+    total = models.IntegerField(
+        default=0,
+        verbose_name="Total"
+    )
+
+    class Meta:
+        verbose_name = "Contador de Usuarios"
+        verbose_name_plural = "Contadores de Usuarios"
+        db_table = "contadores_usuarios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['rol', 'activo'],
+                name='contadores_usuarios_rol_activo_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.rol} ({'activo' if self.activo else 'inactivo'}): {self.total}"
@@ -0,0 +1,127 @@
+"""
+SKYNET - Verificación de contraseñas fuera del hilo de la request
+El hash se calcula en un pool acotado con control de admisión: una ráfaga
+de logins no puede ocupar más de PASSWORD_HASH_WORKERS núcleos ni encolar
+más de PASSWORD_HASH_MAX_PENDING verificaciones por proceso.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    get_hasher, identify_hasher, is_password_usable, make_password
+)
+
+from .cache import user_cache
+from .models import Usuario
+
+
+class HashingSaturado(Exception):
+    """No hay capacidad para verificar la contraseña en este momento"""
+
+    def __init__(self, retry_after=1):
+        super().__init__('Demasiados inicios de sesión simultáneos.')
+        self.retry_after = retry_after
+
+
+class VerificadorPasswords:
+    """
+    Pool de hilos para check/rehash de contraseñas. argon2-cffi libera el
+    GIL durante el hash, así que el resto de hilos del worker sigue
+    atendiendo requests mientras se verifica.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._cupos = None
+        # Hash de referencia para igualar el tiempo con emails inexistentes
+        self._hash_ficticio = None
+
+    @property
+    def workers(self):
+        return getattr(settings, 'PASSWORD_HASH_WORKERS', 2)
+
+    @property
+    def max_pendientes(self):
+        return getattr(settings, 'PASSWORD_HASH_MAX_PENDING', 16)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10)
+
+    def preparar(self):
+        """
+        Calcula el hash de referencia. Se llama al iniciar el servidor
+        (core.wsgi / core.asgi) para que el primer login con un email
+        inexistente no pague además el cálculo del hash.
+        """
+        with self._lock:
+            if self._hash_ficticio is None:
+                self._hash_ficticio = make_password('skynet-hash-ficticio')
+        return self._hash_ficticio
+
+    def _iniciar(self):
+        with self._lock:
+            if self._executor is None:
+                self._cupos = threading.BoundedSemaphore(self.max_pendientes)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def _ejecutar(self, funcion, *args):
+        executor = self._iniciar()
+        if not self._cupos.acquire(blocking=False):
+            raise HashingSaturado()
+        try:
+            futuro = executor.submit(funcion, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingSaturado()
+
+    @staticmethod
+    def _verificar(password, encoded):
+        """
+        Retorna (valida, nuevo_hash). ``nuevo_hash`` solo se calcula si la
+        contraseña es válida y el hash usa otro algoritmo o costos viejos.
+        Corre en el pool: no toca la base de datos.
+        """
+        hasher = identify_hasher(encoded)
+        if not hasher.verify(password, encoded):
+            return False, None
+
+        preferido = get_hasher('default')
+        if hasher.algorithm != preferido.algorithm or preferido.must_update(encoded):
+            return True, make_password(password)
+        return True, None
+
+    def verificar(self, user, password):
+        """
+        Verifica la contraseña del usuario (o de ninguno si ``user`` es
+        None, con el mismo costo). Si el hash está desactualizado se
+        reemplaza con un UPDATE condicional sobre el hash anterior.
+        Lanza HashingSaturado si no hay cupo.
+        """
+        encoded = user.password if user is not None else None
+        if not encoded or not is_password_usable(encoded):
+            self._ejecutar(
+                self._verificar, password, self._hash_ficticio or self.preparar())
+            return False
+
+        valida, nuevo_hash = self._ejecutar(self._verificar, password, encoded)
+        if valida and nuevo_hash:
+            Usuario.objects.filter(pk=user.pk, password=encoded).update(
+                password=nuevo_hash)
+            user_cache.invalidate(user.pk)
+            user.password = nuevo_hash
+        return valida
+
+
+# Instancia única por proceso
+verificador_passwords = VerificadorPasswords()
@@ -0,0 +1,256 @@
+"""
+SKYNET - Revocación de tokens JWT
+Cada worker mantiene un filtro de Bloom con los ``jti`` revocados, así la
+verificación de un token válido no consulta la base de datos. La tabla
+TokenRevocado es la fuente de verdad y se sincroniza periódicamente.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import TokenRefresco, TokenRevocado
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray: sin falsos negativos y con una
+    tasa de falsos positivos cercana a ``tasa_error`` hasta ``capacidad``
+    elementos. Usa doble hashing sobre un solo digest blake2b.
+    """
+
+    def __init__(self, capacidad, tasa_error=0.01):
+        capacidad = max(int(capacidad), 1)
+        self.capacidad = capacidad
+        self.num_bits = max(8, int(math.ceil(
+            -capacidad * math.log(tasa_error) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, clave):
+        digest = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, clave):
+        """
+        Agrega la clave; retorna False si ya estaba (o es un falso
+        positivo). Solo las claves nuevas cuentan para ``elementos``, así
+        que reincorporar las mismas filas no adelanta la reconstrucción.
+        """
+        bits = self.bits
+        nueva = False
+        for posicion in self._posiciones(clave):
+            mascara = 1 << (posicion & 7)
+            if not bits[posicion >> 3] & mascara:
+                bits[posicion >> 3] |= mascara
+                nueva = True
+        if nueva:
+            self.elementos += 1
+        return nueva
+
+    def __contains__(self, clave):
+        bits = self.bits
+        return all(
+            bits[posicion >> 3] & (1 << (posicion & 7))
+            for posicion in self._posiciones(clave)
+        )
+
+
+class RegistroRevocaciones:
+    """
+    Registro de tokens revocados por proceso.
+
+    - ``esta_revocado``: si el jti no está en el filtro (el caso normal)
+      responde sin queries; un positivo se confirma en la tabla.
+    - Cada JWT_REVOCATION_SYNC_INTERVAL segundos se incorporan las filas
+      creadas por otros workers (una query por worker e intervalo).
+    - Cada JWT_REVOCATION_PRUNE_INTERVAL segundos se reconstruye el filtro
+      solo con las filas vigentes. Las filas expiradas (ya no pasan
+      jwt.decode) se eliminan fuera del camino de la request con
+      ``python manage.py depurar_tokens``.
+    """
+    # Solapamiento al sincronizar para no perder filas confirmadas tarde
+    margen_sincronizacion = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filtro = None
+        self._confirmados = set()
+        self._desde = None
+        self._proxima_sincronizacion = 0
+        self._proxima_depuracion = 0
+        self.verificaciones = 0
+        self.positivos = 0
+        self.falsos_positivos = 0
+        self.sincronizaciones = 0
+
+    # Configuración (se lee en cada uso para respetar override_settings)
+    @property
+    def intervalo_sincronizacion(self):
+        return getattr(settings, 'JWT_REVOCATION_SYNC_INTERVAL', 5)
+
+    @property
+    def intervalo_depuracion(self):
+        return getattr(settings, 'JWT_REVOCATION_PRUNE_INTERVAL', 3600)
+
+    @property
+    def capacidad(self):
+        return getattr(settings, 'JWT_REVOCATION_CAPACITY', 100000)
+
+    @property
+    def tasa_error(self):
+        return getattr(settings, 'JWT_REVOCATION_FALSE_POSITIVE_RATE', 0.01)
+
+    def _reconstruir(self):
+        """Carga todos los jti vigentes en un filtro nuevo"""
+        ahora = timezone.now()
+        jtis = list(TokenRevocado.objects.filter(
+            fecha_expiracion__gt=ahora).values_list('jti', flat=True))
+        filtro = FiltroBloom(max(self.capacidad, len(jtis) * 2), self.tasa_error)
+        for jti in jtis:
+            filtro.add(jti)
+        # Reemplazo atómico de referencias: los lectores nunca ven un filtro a medias
+        self._filtro = filtro
+        self._confirmados = set()
+        self._desde = ahora - self.margen_sincronizacion
+
+    def _incorporar_nuevos(self):
+        ahora = timezone.now()
+        nuevos = TokenRevocado.objects.filter(
+            fecha_creacion__gte=self._desde
+        ).values_list('jti', flat=True)
+        filtro = self._filtro
+        for jti in nuevos:
+            filtro.add(jti)
+        self._desde = ahora - self.margen_sincronizacion
+        if filtro.elementos > filtro.capacidad:
+            self._reconstruir()
+
+    def depurar(self):
+        """
+        Elimina revocaciones y refresh tokens expirados.
+        Retorna el número de filas eliminadas por tabla.
+        """
+        ahora = timezone.now()
+        revocados, _ = TokenRevocado.objects.filter(
+            fecha_expiracion__lte=ahora).delete()
+        refresco, _ = TokenRefresco.objects.filter(
+            fecha_expiracion__lte=ahora).delete()
+        return {'revocados': revocados, 'refresco': refresco}
+
+    def sincronizar(self, forzar=False):
+        """
+        Actualiza el filtro si venció el intervalo. Si otro hilo ya está
+        sincronizando se continúa con el filtro actual sin esperar.
+        """
+        ahora = time.monotonic()
+        if not forzar and self._filtro is not None and ahora < self._proxima_sincronizacion:
+            return
+        if not self._lock.acquire(blocking=self._filtro is None or forzar):
+            return
+        try:
+            if self._filtro is None or ahora >= self._proxima_depuracion:
+                self._reconstruir()
+                self._proxima_depuracion = ahora + self.intervalo_depuracion
+            else:
+                self._incorporar_nuevos()
+            self._proxima_sincronizacion = ahora + self.intervalo_sincronizacion
+            self.sincronizaciones += 1
+        finally:
+            self._lock.release()
+
+    def esta_revocado(self, jti):
+        """Indica si el jti fue revocado"""
+        self.verificaciones += 1
+        self.sincronizar()
+        if jti not in self._filtro:
+            return False
+        if jti in self._confirmados:
+            self.positivos += 1
+            return True
+        if TokenRevocado.objects.filter(jti=jti).exists():
+            self._confirmados.add(jti)
+            self.positivos += 1
+            return True
+        self.falsos_positivos += 1
+        return False
+
+    def revocar(self, jti, expiracion, usuario_id=None):
+        """
+        Registra la revocación de un token. Se aplica de inmediato en este
+        proceso y en los demás en la siguiente sincronización.
+        """
+        try:
+            with transaction.atomic():
+                TokenRevocado.objects.create(
+                    jti=jti, usuario_id=usuario_id, fecha_expiracion=expiracion)
+        except IntegrityError:
+            # Ya estaba revocado
+            pass
+        self.sincronizar()
+        self._agregar([jti])
+
+    def _agregar(self, jtis):
+        """
+        Agrega jtis al filtro vigente con el mismo lock de la sincronización:
+        una reconstrucción no puede reemplazar el filtro entre la lectura
+        de la tabla y el reemplazo y descartar la revocación recién hecha
+        """
+        with self._lock:
+            if self._filtro is None:
+                # Se reconstruirá desde la tabla en el siguiente uso
+                return
+            for jti in jtis:
+                self._filtro.add(jti)
+                self._confirmados.add(jti)
+
+    def revocar_varios(self, tokens, usuario_id=None):
+        """
+        Revoca varios tokens [(jti, expiracion), ...] con un solo INSERT.
+        Retorna cuántos se recibieron.
+        """
+        if not tokens:
+            return 0
+        TokenRevocado.objects.bulk_create([
+            TokenRevocado(jti=jti, usuario_id=usuario_id, fecha_expiracion=expiracion)
+            for jti, expiracion in tokens
+        ], ignore_conflicts=True)
+        self.sincronizar()
+        self._agregar([jti for jti, _ in tokens])
+        return len(tokens)
+
+    def reiniciar(self):
+        """Descarta el filtro local (se reconstruye en el siguiente uso)"""
+        with self._lock:
+            self._filtro = None
+            self._confirmados = set()
+            self._proxima_sincronizacion = 0
+            self._proxima_depuracion = 0
+        self.verificaciones = self.positivos = self.falsos_positivos = 0
+        self.sincronizaciones = 0
+
+    def stats(self):
+        """Contadores para monitoreo"""
+        filtro = self._filtro
+        return {
+            'entradas': filtro.elementos if filtro else 0,
+            'bytes_filtro': len(filtro.bits) if filtro else 0,
+            'verificaciones': self.verificaciones,
+            'positivos': self.positivos,
+            'falsos_positivos': self.falsos_positivos,
+            'sincronizaciones': self.sincronizaciones,
+        }
+
+
+# Instancia única por proceso
+registro_revocaciones = RegistroRevocaciones()
@@ -0,0 +1,129 @@
+"""
+SKYNET - Caché versionada de las listas de técnicos y supervisores
+Los selects de asignación del frontend piden estas listas cada vez que se
+abren. La respuesta completa (JSON ya renderizado) se precalcula una vez
+por versión y se sirve con ETag/Last-Modified; una request condicional
+vigente recibe 304 sin consultar la base de datos.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+
+from .models import Usuario
+
+
+class EntradaRoster:
+    """Respuesta precalculada de un roster para una versión"""
+
+    def __init__(self, version, cuerpo, etag, last_modified):
+        self.version = version
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class RosterCache:
+    """
+    Payload precalculado por rol y versión.
+
+    La versión es un contador en la caché compartida de Django que se
+    incrementa con cada cambio de Usuario (signals). Cada worker guarda su
+    copia local de la última entrada y solo consulta la caché compartida
+    para leer la versión. El ETag es el hash del cuerpo: si al reconstruir
+    el contenido no cambió, los clientes siguen recibiendo 304.
+
+    Con una caché por proceso (LocMemCache) los cambios hechos en otro
+    worker se ven al vencer ROSTER_CACHE_TTL.
+    """
+    key_prefix = 'skynet:roster:'
+
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ROSTER_CACHE_TTL', 300)
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'ROSTER_CACHE_ALIAS', 'default')]
+
+    def version(self):
+        """Versión vigente de los rosters"""
+        clave = self.key_prefix + 'version'
+        version = self.cache.get(clave)
+        if version is None:
+            # Un valor nuevo (no 1) evita reutilizar entradas de una versión
+            # anterior si la caché descartó la clave
+            self.cache.add(clave, int(time.time() * 1000), None)
+            version = self.cache.get(clave)
+        return version
+
+    def invalidar(self):
+        """Publica una nueva versión (cualquier cambio de Usuario)"""
+        clave = self.key_prefix + 'version'
+        try:
+            self.cache.incr(clave)
+        except ValueError:
+            self.cache.add(clave, int(time.time() * 1000), None)
+
+    def limpiar(self):
+        """Vacía las copias locales (útil en pruebas)"""
+        with self._lock:
+            self._local.clear()
+
+    def obtener(self, rol, construir):
+        """
+        Entrada vigente del roster ``rol``. ``construir`` retorna el cuerpo
+        de la respuesta (bytes) y solo se llama si ningún nivel lo tiene.
+        """
+        version = self.version()
+        with self._lock:
+            vence, local = self._local.get(rol, (0, None))
+        if local is not None and local.version == version and time.monotonic() < vence:
+            return local
+
+        clave = f'{self.key_prefix}{rol}:{version}'
+        entrada = self.cache.get(clave)
+        if entrada is None:
+            cuerpo = construir()
+            etag = '"%s"' % hashlib.blake2b(cuerpo, digest_size=16).hexdigest()
+            # Last-Modified solo avanza si el contenido cambió
+            if local is not None and local.etag == etag:
+                last_modified = local.last_modified
+            else:
+                last_modified = int(time.time())
+            entrada = EntradaRoster(version, cuerpo, etag, last_modified)
+            self.cache.set(clave, entrada, self.ttl)
+
+        with self._lock:
+            self._local[rol] = (time.monotonic() + self.ttl, entrada)
+        return entrada
+
+
+# Instancia única por proceso
+roster_cache = RosterCache()
+
+
+def construir_roster(rol, mensaje, serializer_class):
+    """
+    Cuerpo JSON de la lista de usuarios activos de un rol, con el mismo
+    formato que una Response de DRF
+    """
+    usuarios = Usuario.objects.filter(
+        rol=rol,
+        activo=True
+    ).order_by('nombre', 'apellido')
+
+    return JSONRenderer().render({
+        'success': True,
+        'data': serializer_class(usuarios, many=True).data,
+        'message': mensaje,
+        'errors': []
+    })
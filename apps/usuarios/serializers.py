@@ -7,6 +7,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from apps.utils.validators import validate_guatemala_phone, validate_guatemala_email
 from .models import Usuario
+from .passwords import verificador_passwords
 
 
 class LoginSerializer(serializers.Serializer):
@@ -22,15 +23,11 @@ class LoginSerializer(serializers.Serializer):
 
         if email and password:
             # Buscar usuario por email
-            try:
-                user = Usuario.objects.get(email=email)
-            except Usuario.DoesNotExist:
-                raise serializers.ValidationError(
-                    'Email o contraseña incorrectos.'
-                )
+            user = Usuario.objects.filter(email=email).first()
 
-            # Verificar contraseña
-            if not user.check_password(password):
+            # Verificar contraseña en el pool de hashing (también sin
+            # usuario, para no revelar qué emails existen por el tiempo)
+            if not verificador_passwords.verificar(user, password):
                 raise serializers.ValidationError(
                     'Email o contraseña incorrectos.'
                 )
@@ -0,0 +1,97 @@
+"""
+SKYNET - Señales del módulo de usuarios
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import user_cache
+from .estadisticas import CAMPOS_CONTADORES, aplicar_cambio
+from .models import Usuario
+from .rosters import roster_cache
+from .tokens import revocar_sesiones
+
+# Campos que viajan en los claims del access token y definen sus permisos
+CAMPOS_SESION = frozenset({'rol', 'activo'})
+
+# Campos cuyo cambio mueve contadores o revoca sesiones
+CAMPOS_ESTADO = CAMPOS_SESION | CAMPOS_CONTADORES
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    """
+    Invalida la caché de autenticación al guardar (incluye activar/desactivar)
+    o eliminar un usuario. Se repite al confirmar la transacción para que
+    una request concurrente no deje en caché la fila anterior.
+    """
+    user_id = instance.pk
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_rosters(sender, instance, **kwargs):
+    """
+    Publica una nueva versión de las listas de técnicos y supervisores.
+    Se repite al confirmar para que una lista construida con la fila
+    anterior quede bajo una versión ya vencida.
+    """
+    roster_cache.invalidar()
+    transaction.on_commit(roster_cache.invalidar)
+
+
+def _afecta_estado(update_fields):
+    return update_fields is None or bool(CAMPOS_ESTADO & set(update_fields))
+
+
+@receiver(pre_save, sender=Usuario)
+@receiver(pre_delete, sender=Usuario)
+def recordar_estado_usuario(sender, instance, update_fields=None, **kwargs):
+    """
+    (rol, activo) actual de la fila, leído en la misma transacción que el
+    cambio: una instancia vieja (p. ej. de la caché) no aporta su estado.
+    Una sola query para los contadores y la revocación de sesiones.
+    """
+    if instance.pk is None or not _afecta_estado(update_fields):
+        return
+    instance._estado_previo = Usuario.objects.filter(
+        pk=instance.pk).values_list('rol', 'activo').first()
+
+
+@receiver(post_save, sender=Usuario)
+def aplicar_cambio_estado_usuario(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Al crear un usuario o cambiar su rol o estado (incluye
+    activar/desactivar) actualiza los contadores de estadísticas y revoca
+    sus tokens: los access tokens autenticados solo con claims no vuelven
+    a leer la fila. La revocación se aplica al confirmar la transacción.
+    """
+    previo = instance.__dict__.pop('_estado_previo', None)
+    if created:
+        aplicar_cambio(None, (instance.rol, instance.activo))
+        return
+    if previo is None:
+        return
+    # Con update_fields, los campos no guardados conservan el valor de la fila
+    escritos = set(update_fields) if update_fields is not None else CAMPOS_ESTADO
+    nuevo = (
+        instance.rol if 'rol' in escritos else previo[0],
+        instance.activo if 'activo' in escritos else previo[1],
+    )
+    if previo == nuevo:
+        return
+    aplicar_cambio(previo, nuevo)
+    usuario_id = instance.pk
+    transaction.on_commit(lambda: revocar_sesiones(usuario_id))
+
+
+@receiver(post_delete, sender=Usuario)
+def descontar_usuario(sender, instance, **kwargs):
+    """Descuenta al usuario eliminado del contador de su fila"""
+    previo = instance.__dict__.pop('_estado_previo', None)
+    if previo is not None:
+        aplicar_cambio(previo, None)
@@ -1,3 +1,638 @@
-from django.test import TestCase
+import io
+import logging
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.utils.throttling import limpiar_buckets
+from apps.utils import throttling
+
+from .cache import user_cache
+from .estadisticas import contar_usuarios, leer_contadores
+from .models import ContadorUsuarios, TokenRefresco, TokenRevocado, Usuario
+from .passwords import HashingSaturado, VerificadorPasswords, verificador_passwords
+from .revocacion import FiltroBloom, registro_revocaciones
+from .rosters import roster_cache
+from .tokens import TokenRefrescoInvalido, rotar_refresh
+
+logger = logging.getLogger(__name__)
+
+
+class UsuariosTestMixin:
+    """
+    Datos base para las pruebas del módulo de usuarios
+    """
+    password = 'tecni12345'
+
+    def setUp(self):
+        self.tecnico = Usuario.objects.create_user(
+            email='tecnico@skynet.com', nombre='Juan', apellido='Perez',
+            password=self.password, rol=Usuario.RolChoices.TECNICO)
+        self.client = APIClient()
+        registro_revocaciones.reiniciar()
+        limpiar_buckets()
+
+    def login(self):
+        response = self.client.post('/api/usuarios/login/', {
+            'email': self.tecnico.email, 'password': self.password
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+
+class UserCacheEscriturasTest(UsuariosTestMixin, TestCase):
+    """
+    Las escrituras no parten de un usuario vencido de la caché
+    """
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'])
+        # Deja al usuario en la caché
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, 200)
+
+    def cambiar_password(self):
+        return self.client.put('/api/usuarios/change-password/', {
+            'old_password': self.password,
+            'new_password': 'nueva12345',
+            'confirm_password': 'nueva12345',
+        }, format='json')
+
+    def test_cambio_de_password_no_revierte_otros_campos(self):
+        # Cambio hecho por otro proceso sin invalidar la caché local
+        Usuario.objects.filter(pk=self.tecnico.pk).update(
+            rol=Usuario.RolChoices.SUPERVISOR, telefono='5555-0000')
+
+        self.assertEqual(self.cambiar_password().status_code, 200)
+        self.tecnico.refresh_from_db()
+        self.assertEqual(self.tecnico.rol, Usuario.RolChoices.SUPERVISOR)
+        self.assertEqual(self.tecnico.telefono, '5555-0000')
+        self.assertTrue(self.tecnico.check_password('nueva12345'))
+
+    def test_escritura_de_usuario_desactivado(self):
+        Usuario.objects.filter(pk=self.tecnico.pk).update(activo=False)
+        # La lectura puede usar la caché; la escritura lee la fila actual
+        self.assertIn(self.cambiar_password().status_code, (401, 403))
+        self.tecnico.refresh_from_db()
+        self.assertFalse(self.tecnico.activo)
+        self.assertTrue(self.tecnico.check_password(self.password))
+
+    def test_estadisticas_de_la_cache(self):
+        admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.client.force_authenticate(admin)
+        data = self.client.get('/api/usuarios/usuarios/stats/').json()['data']
+        self.assertGreaterEqual(data['cache_autenticacion']['hits_local'], 0)
+        self.assertIn('hit_ratio', data['cache_autenticacion'])
+
+
+class RevocacionTokensTest(UsuariosTestMixin, TestCase):
+
+    def test_logout_revoca_access_y_refresh(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'])
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, 200)
+
+        response = self.client.post(
+            '/api/usuarios/logout/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertIn(self.client.get('/api/usuarios/me/').status_code, (401, 403))
+        response = APIClient().post(
+            '/api/usuarios/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_revocacion_de_otro_worker_se_aplica_al_sincronizar(self):
+        registro_revocaciones.sincronizar(forzar=True)
+        jti = uuid.uuid4().hex
+        TokenRevocado.objects.create(
+            jti=jti, fecha_expiracion=timezone.now() + timedelta(hours=1))
+
+        registro_revocaciones.sincronizar(forzar=True)
+        self.assertTrue(registro_revocaciones.esta_revocado(jti))
+
+    def test_depuracion_elimina_expirados(self):
+        TokenRevocado.objects.create(
+            jti=uuid.uuid4().hex, fecha_expiracion=timezone.now() - timedelta(seconds=1))
+        vigente = TokenRevocado.objects.create(
+            jti=uuid.uuid4().hex, fecha_expiracion=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(registro_revocaciones.depurar()['revocados'], 1)
+        self.assertEqual(list(TokenRevocado.objects.values_list('jti', flat=True)),
+                         [vigente.jti])
+
+    def test_sincronizar_no_duplica_elementos(self):
+        registro_revocaciones.sincronizar(forzar=True)
+        for _ in range(3):
+            TokenRevocado.objects.create(
+                jti=uuid.uuid4().hex, fecha_expiracion=timezone.now() + timedelta(hours=1))
+        # Cada sincronización vuelve a leer las filas del margen de solapamiento
+        for _ in range(12):
+            registro_revocaciones.sincronizar(forzar=True)
+        self.assertEqual(registro_revocaciones.stats()['entradas'], 3)
+
+    def test_verificar_no_depura(self):
+        expirado = TokenRevocado.objects.create(
+            jti=uuid.uuid4().hex, fecha_expiracion=timezone.now() - timedelta(seconds=1))
+        with self.settings(JWT_REVOCATION_PRUNE_INTERVAL=0, JWT_REVOCATION_SYNC_INTERVAL=0):
+            registro_revocaciones.sincronizar(forzar=True)
+            # Vencido el intervalo: reconstruye el filtro sin DELETE
+            with CaptureQueriesContext(connection) as queries:
+                registro_revocaciones.esta_revocado(uuid.uuid4().hex)
+        self.assertTrue(queries.captured_queries)
+        self.assertFalse(any(
+            q['sql'].startswith('DELETE') for q in queries.captured_queries))
+        self.assertTrue(TokenRevocado.objects.filter(pk=expirado.pk).exists())
+
+    def test_comando_depurar_tokens(self):
+        TokenRevocado.objects.create(
+            jti=uuid.uuid4().hex, fecha_expiracion=timezone.now() - timedelta(seconds=1))
+        salida = io.StringIO()
+        call_command('depurar_tokens', stdout=salida)
+        self.assertIn('1 revocaciones', salida.getvalue())
+        self.assertFalse(TokenRevocado.objects.exists())
+
+    def test_filtro_sin_falsos_negativos(self):
+        filtro = FiltroBloom(1000, 0.01)
+        claves = [uuid.uuid4().hex for _ in range(1000)]
+        for clave in claves:
+            filtro.add(clave)
+        self.assertTrue(all(clave in filtro for clave in claves))
+
+        ajenas = sum(uuid.uuid4().hex in filtro for _ in range(10000))
+        self.assertLess(ajenas / 10000, 0.03)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'NUM_PROXIES': 1,
+    'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+        'refresh_ip': '3/min',
+    },
+})
+class TokenBucketThrottleTest(UsuariosTestMixin, TestCase):
+    """
+    Token buckets por IP: 429 con Retry-After, recarga con el tiempo y
+    X-Forwarded-For falsificado por el cliente
+    """
+
+    def refrescar(self, xff='203.0.113.7'):
+        return self.client.post(
+            '/api/usuarios/refresh/', {'refresh': 'x'}, format='json',
+            HTTP_X_FORWARDED_FOR=xff)
+
+    def test_429_con_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.refrescar().status_code, 401)
+        response = self.refrescar()
+        self.assertEqual(response.status_code, 429)
+        # 1 token cada 20 s
+        self.assertEqual(int(response['Retry-After']), 20)
+
+    def test_recarga_del_bucket(self):
+        ahora = time.monotonic()
+        with mock.patch.object(throttling.time, 'monotonic', return_value=ahora):
+            for _ in range(3):
+                self.refrescar()
+            self.assertEqual(self.refrescar().status_code, 429)
+        with mock.patch.object(throttling.time, 'monotonic', return_value=ahora + 20):
+            self.assertEqual(self.refrescar().status_code, 401)
+            self.assertEqual(self.refrescar().status_code, 429)
+
+    def test_xff_falsificado_no_evade_el_limite(self):
+        # El cliente antepone IPs distintas; el proxy agrega siempre la real
+        for i in range(3):
+            self.refrescar(f'10.0.0.{i}, 203.0.113.7')
+        self.assertEqual(
+            self.refrescar('10.0.0.99, 203.0.113.7').status_code, 429)
+        # Otra IP real tiene su propio bucket
+        self.assertEqual(self.refrescar('10.0.0.99, 198.51.100.1').status_code, 401)
+
+
+class RotacionRefreshTest(UsuariosTestMixin, TestCase):
+    """
+    Cada refresh se canjea una sola vez; reutilizarlo revoca la familia
+    """
+
+    def refrescar(self, refresh):
+        return APIClient().post(
+            '/api/usuarios/refresh/', {'refresh': refresh}, format='json')
+
+    def test_rotacion(self):
+        tokens = self.login()
+        response = self.refrescar(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        nuevos = response.json()['data']
+        self.assertNotEqual(nuevos['refresh'], tokens['refresh'])
+        self.assertEqual(
+            TokenRefresco.objects.values('familia').distinct().count(), 1)
+        self.assertEqual(self.refrescar(nuevos['refresh']).status_code, 200)
+
+    def test_reutilizacion_revoca_la_familia(self):
+        tokens = self.login()
+        nuevos = self.refrescar(tokens['refresh']).json()['data']
+
+        self.assertEqual(self.refrescar(tokens['refresh']).status_code, 401)
+        # El token legítimo más reciente también queda revocado
+        self.assertEqual(self.refrescar(nuevos['refresh']).status_code, 401)
+        self.assertFalse(TokenRefresco.objects.filter(revocado=False).exists())
+
+    def test_claims_desde_la_fila_actual(self):
+        tokens = self.login()
+        user_cache.get(self.tecnico.pk)
+        # Cambio sin señales: la caché conserva el nombre anterior
+        Usuario.objects.filter(pk=self.tecnico.pk).update(nombre='Juana')
+
+        user, nuevos = rotar_refresh(tokens['refresh'])
+        self.assertEqual(user.nombre, 'Juana')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + nuevos['access'])
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, 200)
+
+    def test_usuario_desactivado(self):
+        tokens = self.login()
+        Usuario.objects.filter(pk=self.tecnico.pk).update(activo=False)
+        with self.assertRaises(TokenRefrescoInvalido):
+            rotar_refresh(tokens['refresh'])
+        self.assertFalse(TokenRefresco.objects.filter(revocado=False).exists())
+
+    def test_fallo_al_emitir_no_consume_el_token(self):
+        tokens = self.login()
+        with mock.patch('apps.usuarios.tokens.emitir_tokens', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                rotar_refresh(tokens['refresh'])
+        self.assertIsNone(TokenRefresco.objects.get().fecha_uso)
+        self.assertEqual(self.refrescar(tokens['refresh']).status_code, 200)
+
+
+@override_settings(JWT_CLAIMS_USER=True)
+class RevocacionPorCambioDeUsuarioTest(UsuariosTestMixin, TestCase):
+    """
+    Cambiar el rol o el estado revoca los tokens emitidos, incluso los que
+    se autentican solo con claims
+    """
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.tokens['access'])
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, 200)
+        user_cache.clear()
+
+    def como_admin(self, metodo, url):
+        cliente = APIClient()
+        cliente.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(cliente, metodo)(url)
+        self.assertEqual(response.status_code, 200)
+
+    def assertSesionRevocada(self):
+        self.assertIn(self.client.get('/api/usuarios/me/').status_code, (401, 403))
+        response = APIClient().post(
+            '/api/usuarios/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_desactivar_revoca_los_tokens(self):
+        self.como_admin('post', f'/api/usuarios/usuarios/{self.tecnico.pk}/toggle-status/')
+        self.assertSesionRevocada()
+
+    def test_eliminar_revoca_los_tokens(self):
+        self.como_admin('delete', f'/api/usuarios/usuarios/{self.tecnico.pk}/delete/')
+        self.assertSesionRevocada()
+
+    def test_cambio_de_rol_revoca_los_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tecnico.rol = Usuario.RolChoices.SUPERVISOR
+            self.tecnico.save(update_fields=['rol'])
+        self.assertSesionRevocada()
+
+        # Un login posterior emite tokens con los claims nuevos
+        self.client.credentials()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.login()['access'])
+        response = self.client.get('/api/usuarios/me/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_otros_cambios_no_revocan(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tecnico.telefono = '5555-0000'
+            self.tecnico.save()
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, 200)
+
+
+class ContadoresUsuariosTest(UsuariosTestMixin, TestCase):
+    """
+    Los contadores por (rol, activo) siguen a la fila real, aunque la
+    instancia guardada esté vieja o la transacción se revierta
+    """
+
+    def assertContadoresAlDia(self):
+        contadores = {k: v for k, v in leer_contadores().items() if v}
+        reales = {k: v for k, v in contar_usuarios().items() if v}
+        self.assertEqual(contadores, reales)
+
+    def test_alta_cambio_y_baja(self):
+        supervisor = Usuario.objects.create_user(
+            email='supervisor@skynet.com', nombre='Maria', apellido='Garcia',
+            password='super12345', rol=Usuario.RolChoices.SUPERVISOR)
+        self.assertContadoresAlDia()
+        self.tecnico.activo = False
+        self.tecnico.save(update_fields=['activo'])
+        supervisor.rol = Usuario.RolChoices.TECNICO
+        supervisor.save()
+        self.assertContadoresAlDia()
+        self.assertEqual(leer_contadores()[(Usuario.RolChoices.TECNICO, False)], 1)
+        supervisor.delete()
+        self.assertContadoresAlDia()
+
+    def test_instancia_vieja(self):
+        vieja = Usuario.objects.get(pk=self.tecnico.pk)
+        self.tecnico.rol = Usuario.RolChoices.SUPERVISOR
+        self.tecnico.save()
+
+        # ``vieja`` aún cree que es técnico: el cambio parte de la fila real
+        vieja.activo = False
+        vieja.save(update_fields=['activo'])
+        self.assertContadoresAlDia()
+        Usuario.objects.get(pk=self.tecnico.pk).delete()
+        vieja.delete()
+        self.assertContadoresAlDia()
+
+    def test_rollback(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.tecnico.rol = Usuario.RolChoices.SUPERVISOR
+            self.tecnico.save()
+            raise RuntimeError('falla después de guardar')
+        self.assertContadoresAlDia()
+
+        # La instancia conserva el rol que no se guardó; al reintentar
+        # se mueve desde el estado confirmado
+        self.tecnico.save()
+        self.assertContadoresAlDia()
+        self.assertEqual(leer_contadores()[(Usuario.RolChoices.TECNICO, True)], 0)
+
+    def test_una_query_de_estado_por_guardado(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.tecnico.telefono = '5555-0000'
+            self.tecnico.save(update_fields=['telefono'])
+        self.assertFalse(any(
+            'SELECT' in q['sql'] and '"rol"' in q['sql'] for q in queries.captured_queries))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.tecnico.activo = False
+            self.tecnico.save()
+        lecturas = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and '"usuarios"' in q['sql']]
+        self.assertEqual(len(lecturas), 1)
+
+    def test_estadisticas_endpoint(self):
+        admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/usuarios/usuarios/stats/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['total_usuarios'], data['tecnicos']), (2, 1))
+
+    def test_reconciliar_corrige_desvios(self):
+        # QuerySet.update() no envía señales: los contadores quedan desviados
+        Usuario.objects.filter(pk=self.tecnico.pk).update(activo=False)
+        ContadorUsuarios.objects.filter(
+            rol=Usuario.RolChoices.SUPERVISOR, activo=True).delete()
+
+        salida = io.StringIO()
+        call_command('reconciliar_estadisticas_usuarios', stdout=salida)
+        self.assertIn('contadores corregidos', salida.getvalue())
+        self.assertIn('TECNICO inactivos: 0 -> 1', salida.getvalue())
+        self.assertContadoresAlDia()
+        self.assertEqual(len(leer_contadores()), 6)
+
+        salida = io.StringIO()
+        call_command('reconciliar_estadisticas_usuarios', stdout=salida)
+        self.assertIn('al día', salida.getvalue())
+
+
+class RostersTest(UsuariosTestMixin, TestCase):
+    """
+    /tecnicos/ y /supervisores/: JSON precalculado por versión con
+    ETag/Last-Modified y 304 sin consultar la base de datos
+    """
+
+    def setUp(self):
+        super().setUp()
+        roster_cache.cache.clear()
+        roster_cache.limpiar()
+        self.admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.supervisor = Usuario.objects.create_user(
+            email='supervisor@skynet.com', nombre='Maria', apellido='Garcia',
+            password='super12345', rol=Usuario.RolChoices.SUPERVISOR)
+        self.client.force_authenticate(self.admin)
+
+    def tearDown(self):
+        roster_cache.limpiar()
+
+    def test_lista_con_validadores(self):
+        Usuario.objects.create_user(
+            email='inactivo@skynet.com', nombre='Ana', apellido='Ruiz',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO, activo=False)
+        response = self.client.get('/api/usuarios/tecnicos/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual([u['email'] for u in data['data']], [self.tecnico.email])
+
+        supervisores = self.client.get('/api/usuarios/supervisores/')
+        self.assertEqual(
+            [u['email'] for u in supervisores.json()['data']], [self.supervisor.email])
+        self.assertNotEqual(supervisores['ETag'], response['ETag'])
+
+    def test_304_sin_consultas(self):
+        for url in ('/api/usuarios/tecnicos/', '/api/usuarios/supervisores/'):
+            with self.subTest(url=url):
+                primera = self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], primera['ETag'])
+
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+    def test_cambio_de_usuario_invalida_el_etag(self):
+        url = '/api/usuarios/tecnicos/'
+        etag = self.client.get(url)['ETag']
+
+        self.tecnico.nombre = 'Pedro'
+        self.tecnico.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data'][0]['nombre'], 'Pedro')
+        etag = response['ETag']
+
+        self.tecnico.activo = False
+        self.tecnico.save(update_fields=['activo'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [])
+
+        Usuario.objects.create_user(
+            email='nuevo@skynet.com', nombre='Luis', apellido='Mejia',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO)
+        self.assertEqual(len(self.client.get(url).json()['data']), 1)
+
+    def test_cambio_sin_efecto_conserva_el_etag(self):
+        # El admin no está en la lista: la versión cambia pero el contenido no
+        url = '/api/usuarios/tecnicos/'
+        primera = self.client.get(url)
+        self.admin.telefono = '5555-0000'
+        self.admin.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Last-Modified'], primera['Last-Modified'])
+
+    def test_requiere_autenticacion(self):
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get('/api/usuarios/tecnicos/').status_code, (401, 403))
+
+
+@override_settings(JWT_REVOCATION_SYNC_INTERVAL=3600)
+@tag('benchmark')
+class RevocacionBenchmarkTest(UsuariosTestMixin, TestCase):
+    """
+    Costo por request de la verificación de revocación con 20k tokens
+    revocados: sin queries para tokens vigentes.
+    """
+    revocados = 20000
+    verificaciones = 20000
+
+    def test_costo_por_verificacion(self):
+        expiracion = timezone.now() + timedelta(hours=1)
+        TokenRevocado.objects.bulk_create([
+            TokenRevocado(jti=uuid.uuid4().hex, fecha_expiracion=expiracion)
+            for _ in range(self.revocados)
+        ], batch_size=1000)
+        registro_revocaciones.sincronizar(forzar=True)
+
+        jtis = [uuid.uuid4().hex for _ in range(self.verificaciones)]
+        with CaptureQueriesContext(connection) as queries:
+            inicio = time.perf_counter()
+            for jti in jtis:
+                registro_revocaciones.esta_revocado(jti)
+            total = time.perf_counter() - inicio
+
+        stats = registro_revocaciones.stats()
+        # Solo los falsos positivos (~1%) consultan la tabla
+        self.assertEqual(len(queries), stats['falsos_positivos'])
+        self.assertLess(stats['falsos_positivos'], self.verificaciones * 0.03)
+        logger.info(
+            f'[benchmark] revocación: {total / self.verificaciones * 1e6:.2f} µs '
+            f'por verificación, {stats["falsos_positivos"]} falsos positivos '
+            f'en {self.verificaciones}, filtro de {stats["bytes_filtro"]} bytes'
+        )
+
+
+class PasswordHashingTest(UsuariosTestMixin, TestCase):
+
+    def test_login_actualiza_hash_legado(self):
+        legado = make_password(
+            self.password, hasher='pbkdf2_sha256')
+        Usuario.objects.filter(pk=self.tecnico.pk).update(password=legado)
+
+        self.login()
+        self.tecnico.refresh_from_db()
+        self.assertTrue(self.tecnico.password.startswith('argon2$'))
+        # El nuevo hash sigue siendo válido
+        self.login()
+
+    @override_settings(ARGON2_TIME_COST=3)
+    def test_login_actualiza_costos_de_argon2(self):
+        anterior = Usuario.objects.get(pk=self.tecnico.pk).password
+        self.login()
+        self.tecnico.refresh_from_db()
+        self.assertNotEqual(self.tecnico.password, anterior)
+        self.assertIn('t=3', self.tecnico.password)
+
+    def test_password_incorrecta_y_email_inexistente(self):
+        user = Usuario.objects.get(pk=self.tecnico.pk)
+        self.assertFalse(verificador_passwords.verificar(user, 'otra-clave'))
+        self.assertFalse(verificador_passwords.verificar(None, self.password))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1)
+    def test_admision_rechaza_sin_cupo(self):
+        verificador = VerificadorPasswords()
+        verificador._iniciar()
+        verificador._cupos.acquire()
+        with self.assertRaises(HashingSaturado):
+            verificador.verificar(self.tecnico, self.password)
+        verificador._cupos.release()
+        self.assertTrue(verificador.verificar(self.tecnico, self.password))
+
+        response = self.client.post('/api/usuarios/login/', {
+            'email': self.tecnico.email, 'password': self.password
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+@tag('benchmark')
+class PasswordHashingBenchmarkTest(UsuariosTestMixin, TestCase):
+    """
+    Latencia de verificación de login (p50/p99) con ráfagas concurrentes
+    sobre el pool acotado, con los costos de Argon2 configurados.
+    """
+    logins = 48
+    concurrencia = 8
+
+    def test_latencia_login_concurrente(self):
+        user = Usuario.objects.get(pk=self.tecnico.pk)
+        verificador = VerificadorPasswords()
+
+        def login(_):
+            inicio = time.perf_counter()
+            try:
+                resultado = verificador.verificar(user, self.password)
+            except HashingSaturado:
+                resultado = None
+            return resultado, time.perf_counter() - inicio
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            resultados = list(pool.map(login, range(self.logins)))
+
+        aceptados = sorted(t for ok, t in resultados if ok)
+        self.assertTrue(aceptados)
+        self.assertTrue(all(ok in (True, None) for ok, _ in resultados))
+
+        p50 = statistics.median(aceptados)
+        p99 = aceptados[min(len(aceptados) - 1, int(len(aceptados) * 0.99))]
+        logger.info(
+            f'[benchmark] login: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, '
+            f'{len(aceptados)}/{self.logins} aceptados con '
+            f'{self.concurrencia} clientes y {verificador.workers} workers'
+        )
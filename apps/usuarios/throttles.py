@@ -0,0 +1,38 @@
+"""
+SKYNET - Throttles de autenticación y registro de usuarios
+"""
+
+from apps.utils.throttling import TokenBucketThrottle
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Bucket por IP del cliente (respeta NUM_PROXIES de DRF)"""
+
+    def get_clave(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """Bucket por email de la cuenta atacada, sin importar la IP"""
+
+    def get_clave(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class RefreshIPThrottle(IPThrottle):
+    scope = 'refresh_ip'
+
+
+class UsuarioCreateIPThrottle(IPThrottle):
+    scope = 'usuarios_create_ip'
@@ -0,0 +1,235 @@
+"""
+SKYNET - Emisión y rotación de tokens JWT
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TokenRefresco, Usuario
+from .revocacion import registro_revocaciones
+
+
+# Vigencia del ticket para abrir el stream de eventos: solo debe alcanzar
+# para que el navegador abra la conexión
+VIGENCIA_TICKET_STREAM = timedelta(seconds=60)
+
+
+class TokenRefrescoInvalido(Exception):
+    """El refresh token no es válido, expiró, fue revocado o reutilizado"""
+
+
+def _nuevo_jti():
+    return uuid.uuid4().hex
+
+
+def _codificar(payload):
+    return jwt.encode(
+        payload, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def emitir_tokens(user, familia=None):
+    """
+    Genera un par access/refresh para el usuario y registra el refresh.
+    Con ``familia`` el nuevo refresh continúa la cadena de rotación.
+    """
+    ahora = timezone.now()
+    access_exp = ahora + getattr(
+        settings, 'JWT_ACCESS_TOKEN_LIFETIME', timedelta(hours=24))
+    refresh_exp = ahora + getattr(
+        settings, 'JWT_REFRESH_TOKEN_LIFETIME', timedelta(days=7))
+
+    # Payload del access token
+    access_jti = _nuevo_jti()
+    access_payload = {
+        'user_id': user.id,
+        'email': user.email,
+        'nombre': user.nombre,
+        'apellido': user.apellido,
+        'rol': user.rol,
+        'jti': access_jti,
+        'exp': access_exp,
+        'iat': ahora,
+        'token_type': 'access'
+    }
+
+    # Payload del refresh token
+    refresh_jti = _nuevo_jti()
+    refresh_payload = {
+        'user_id': user.id,
+        'jti': refresh_jti,
+        'exp': refresh_exp,
+        'iat': ahora,
+        'token_type': 'refresh'
+    }
+
+    TokenRefresco.objects.create(
+        jti=refresh_jti,
+        usuario_id=user.id,
+        familia=familia or _nuevo_jti(),
+        access_jti=access_jti,
+        fecha_expiracion=refresh_exp
+    )
+
+    return {
+        'access': _codificar(access_payload),
+        'refresh': _codificar(refresh_payload),
+    }
+
+
+def emitir_ticket_stream(access_token):
+    """
+    Ticket de corta vida para abrir el stream de eventos con ``?ticket=``:
+    EventSource no permite headers y el access token no debe quedar en
+    URLs (logs de acceso, historial). El ticket lleva el jti y la
+    expiración de la sesión del access token (ya autenticado): el stream
+    se cierra cuando la sesión expira o se revoca.
+    """
+    payload = jwt.decode(
+        access_token,
+        settings.SECRET_KEY,
+        algorithms=[settings.JWT_ALGORITHM]
+    )
+    ahora = timezone.now()
+    return _codificar({
+        'user_id': payload['user_id'],
+        'sesion_jti': payload.get('jti'),
+        'sesion_exp': payload['exp'],
+        'exp': ahora + VIGENCIA_TICKET_STREAM,
+        'iat': ahora,
+        'token_type': 'stream'
+    })
+
+
+def revocar_familia(familia):
+    """Revoca todos los refresh tokens de una familia"""
+    return TokenRefresco.objects.filter(
+        familia=familia, revocado=False).update(revocado=True)
+
+
+def revocar_sesiones(usuario_id):
+    """
+    Revoca todos los tokens vigentes del usuario: los access tokens
+    emitidos dentro de su vigencia (el filtro de revocación los rechaza
+    aunque se autentiquen solo con claims) y todas sus familias de refresh.
+    Se usa al cambiar el rol o el estado: los claims del token dejan de
+    describir al usuario. Retorna el número de access tokens revocados.
+    """
+    vigencia = getattr(settings, 'JWT_ACCESS_TOKEN_LIFETIME', timedelta(hours=24))
+    emitidos = TokenRefresco.objects.filter(
+        usuario_id=usuario_id,
+        fecha_creacion__gt=timezone.now() - vigencia
+    ).exclude(access_jti='').values_list('access_jti', 'fecha_creacion')
+    # fecha_creacion es posterior a la emisión: la revocación dura al menos
+    # lo que el token
+    revocados = registro_revocaciones.revocar_varios(
+        [(jti, creado + vigencia) for jti, creado in emitidos],
+        usuario_id=usuario_id)
+    TokenRefresco.objects.filter(
+        usuario_id=usuario_id, revocado=False).update(revocado=True)
+    return revocados
+
+
+def rotar_refresh(token):
+    """
+    Canjea un refresh token por un nuevo par de tokens sin verificar la
+    contraseña. Retorna (usuario, tokens).
+
+    El canje es un UPDATE condicional sobre el jti: si dos requests usan
+    el mismo token solo una lo consigue. Un token ya usado o revocado se
+    considera robado y revoca toda su familia.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        raise TokenRefrescoInvalido('Refresh token inválido o expirado.')
+
+    if payload.get('token_type') != 'refresh' or 'jti' not in payload:
+        raise TokenRefrescoInvalido('El token no es un refresh token.')
+
+    registro = TokenRefresco.objects.filter(
+        jti=payload['jti']
+    ).only('id', 'usuario_id', 'familia').first()
+    if registro is None:
+        raise TokenRefrescoInvalido('Refresh token desconocido.')
+
+    # Canje y emisión juntos: si la emisión falla el token sigue sin usar
+    with transaction.atomic():
+        canjeado = TokenRefresco.objects.filter(
+            pk=registro.pk,
+            fecha_uso__isnull=True,
+            revocado=False
+        ).update(fecha_uso=timezone.now())
+
+        if canjeado:
+            # Fila actual (no la caché): los claims nuevos deben reflejar
+            # el rol y el estado vigentes
+            user = Usuario.objects.filter(pk=registro.usuario_id).first()
+            if user is not None and user.is_active:
+                return user, emitir_tokens(user, familia=registro.familia)
+
+    revocar_familia(registro.familia)
+    if not canjeado:
+        raise TokenRefrescoInvalido(
+            'Refresh token reutilizado; la sesión fue revocada.')
+    if user is None:
+        raise TokenRefrescoInvalido('Usuario no encontrado.')
+    raise TokenRefrescoInvalido('La cuenta del usuario ha sido desactivada.')
+
+
+def revocar_access(token):
+    """
+    Revoca un access token hasta su expiración. Retorna False si el token
+    no es válido o no tiene jti (emitido antes de la revocación).
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        return False
+
+    if 'jti' not in payload or 'exp' not in payload:
+        return False
+
+    registro_revocaciones.revocar(
+        payload['jti'],
+        datetime.fromtimestamp(payload['exp'], tz=dt_timezone.utc),
+        usuario_id=payload.get('user_id')
+    )
+    return True
+
+
+def revocar_refresh(token, usuario_id):
+    """
+    Revoca la familia del refresh token si pertenece al usuario.
+    Retorna el número de refresh tokens revocados.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        return 0
+
+    if payload.get('token_type') != 'refresh' or 'jti' not in payload:
+        return 0
+
+    registro = TokenRefresco.objects.filter(
+        jti=payload['jti'], usuario_id=usuario_id
+    ).only('familia').first()
+    if registro is None:
+        return 0
+    return revocar_familia(registro.familia)
@@ -5,7 +5,7 @@ SKYNET - URLs del módulo de usuarios
 from django.urls import path
 from . import views
 from .views import (
-    login_view, logout_view, me_view, validate_token_view, change_password_view,
+    login_view, refresh_view, logout_view, me_view, validate_token_view, change_password_view,
     usuarios_list_view, usuarios_create_view, usuarios_detail_view,
     usuarios_update_view, usuarios_delete_view, usuarios_toggle_status_view,
     tecnicos_list_view, supervisores_list_view, usuarios_stats_view
@@ -16,6 +16,7 @@ app_name = 'usuarios'
 urlpatterns = [
     # Autenticación personalizada
     path('login/', login_view, name='login'),
+    path('refresh/', refresh_view, name='refresh'),
     path('logout/', logout_view, name='logout'),
 
     # Usuario autenticado
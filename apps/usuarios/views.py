@@ -3,13 +3,25 @@ SKYNET - Vistas para el módulo de usuarios
 """
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    api_view, authentication_classes, permission_classes, throttle_classes)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import logout
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Usuario
+from .cache import user_cache
+from .estadisticas import estadisticas_usuarios
+from .rosters import construir_roster, roster_cache
+from .passwords import HashingSaturado
+from .throttles import (
+    LoginEmailThrottle, LoginIPThrottle, RefreshIPThrottle,
+    UsuarioCreateIPThrottle
+)
 from .serializers import (
     LoginSerializer,
     UsuarioSerializer,
@@ -17,6 +29,10 @@ from .serializers import (
     UsuarioUpdateSerializer,
     ChangePasswordSerializer
 )
+from .tokens import (
+    TokenRefrescoInvalido, emitir_tokens, revocar_access, revocar_refresh,
+    rotar_refresh
+)
 
 
 # class CustomTokenObtainPairView(TokenObtainPairView):
@@ -109,6 +125,7 @@ from .serializers import (
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle])
 def login_view(request):
     """
     Vista alternativa para login usando serializer personalizado
@@ -116,45 +133,27 @@ def login_view(request):
     serializer = LoginSerializer(
         data=request.data, context={'request': request})
 
-    if serializer.is_valid():
-        user = serializer.validated_data['user']
-
-        # Generar tokens JWT manualmente
-        import jwt
-        from django.conf import settings
-        from datetime import datetime, timedelta
-
-        # Payload del access token
-        access_payload = {
-            'user_id': user.id,
-            'email': user.email,
-            'nombre': user.nombre,
-            'apellido': user.apellido,
-            'rol': user.rol,
-            'exp': datetime.utcnow() + timedelta(hours=24),
-            'iat': datetime.utcnow(),
-            'token_type': 'access'
-        }
+    try:
+        valido = serializer.is_valid()
+    except HashingSaturado as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en el inicio de sesión',
+            'errors': [str(e)]
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(e.retry_after)})
 
-        # Payload del refresh token
-        refresh_payload = {
-            'user_id': user.id,
-            'exp': datetime.utcnow() + timedelta(days=7),
-            'iat': datetime.utcnow(),
-            'token_type': 'refresh'
-        }
+    if valido:
+        user = serializer.validated_data['user']
 
-        # Generar tokens
-        access_token = jwt.encode(
-            access_payload, settings.SECRET_KEY, algorithm='HS256')
-        refresh_token = jwt.encode(
-            refresh_payload, settings.SECRET_KEY, algorithm='HS256')
+        tokens = emitir_tokens(user)
 
         return Response({
             'success': True,
             'data': {
-                'access': access_token,
-                'refresh': refresh_token,
+                'access': tokens['access'],
+                'refresh': tokens['refresh'],
                 'user': {
                     'id': user.id,
                     'email': user.email,
@@ -177,15 +176,92 @@ def login_view(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Canjear un refresh token por un nuevo par access/refresh. "
+        "El refresh token usado queda invalidado (rotación); reutilizarlo "
+        "revoca toda la sesión."
+    ),
+    operation_summary="Renovar Tokens",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['refresh'],
+        properties={
+            'refresh': openapi.Schema(
+                type=openapi.TYPE_STRING,
+                description='Refresh token emitido en el login o en la última renovación'
+            ),
+        }
+    ),
+    responses={
+        200: openapi.Response(
+            description="Tokens renovados",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {
+                        "access": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
+                        "refresh": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+                    },
+                    "message": "Tokens renovados exitosamente",
+                    "errors": []
+                }
+            }
+        ),
+        401: "Refresh token inválido, expirado, revocado o reutilizado"
+    },
+    tags=['Autenticación']
+)
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([RefreshIPThrottle])
+def refresh_view(request):
+    """
+    Renueva los tokens sin verificar la contraseña (no usa el hasher)
+    """
+    token = request.data.get('refresh')
+    if not token or not isinstance(token, str):
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error al renovar tokens',
+            'errors': ['El refresh token es requerido']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user, tokens = rotar_refresh(token)
+    except TokenRefrescoInvalido as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error al renovar tokens',
+            'errors': [str(e)]
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    return Response({
+        'success': True,
+        'data': tokens,
+        'message': 'Tokens renovados exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     """
-    Vista para cerrar sesión (simple)
+    Vista para cerrar sesión: revoca el access token de la request y, si
+    se envía, la sesión (familia) del refresh token
     """
     try:
-        # Por ahora solo confirmamos el logout
-        # En el futuro se implementará blacklist de tokens
+        if isinstance(request.auth, str):
+            revocar_access(request.auth)
+
+        refresh = request.data.get('refresh')
+        if isinstance(refresh, str) and refresh:
+            revocar_refresh(refresh, request.user.id)
 
         return Response({
             'success': True,
@@ -336,7 +412,7 @@ def change_password_view(request):
     if serializer.is_valid():
         user = request.user
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
 
         return Response({
             'success': True,
@@ -578,6 +654,7 @@ def usuarios_list_view(request):
 @api_view(['POST'])
 # Temporalmente permitir sin autenticación para crear el primer admin
 @permission_classes([AllowAny])
+@throttle_classes([UsuarioCreateIPThrottle])
 def usuarios_create_view(request):
     """
     Vista para crear un nuevo usuario
@@ -896,6 +973,24 @@ def usuarios_toggle_status_view(request, pk):
 # ENDPOINTS CONVENIENTES PARA EL FRONTEND
 # ==============================================================================
 
+def _roster_response(request, rol, mensaje):
+    """
+    Lista de usuarios activos del rol, renderizada una vez por versión.
+    Con If-None-Match / If-Modified-Since vigentes responde 304 sin
+    consultar la base de datos.
+    """
+    entrada = roster_cache.obtener(
+        rol, lambda: construir_roster(rol, mensaje, UsuarioSerializer))
+    response = HttpResponse(entrada.cuerpo, content_type='application/json')
+    response['ETag'] = entrada.etag
+    response['Last-Modified'] = http_date(entrada.last_modified)
+    # Privada (requiere autenticación) y siempre revalidada
+    response['Cache-Control'] = 'private, no-cache'
+    return get_conditional_response(
+        request._request, etag=entrada.etag,
+        last_modified=entrada.last_modified, response=response)
+
+
 @swagger_auto_schema(
     method='get',
     operation_description="Obtener lista de técnicos activos",
@@ -922,6 +1017,9 @@ def usuarios_toggle_status_view(request, pk):
                     "errors": []
                 }
             }
+        ),
+        304: openapi.Response(
+            description="Sin cambios desde la versión indicada en If-None-Match"
         )
     },
     tags=['Usuarios - Conveniencia']
@@ -933,20 +1031,9 @@ def tecnicos_list_view(request):
     Vista para obtener lista de técnicos activos
     Endpoint de conveniencia para el frontend
     """
-    # Solo técnicos activos
-    tecnicos = Usuario.objects.filter(
-        rol=Usuario.RolChoices.TECNICO,
-        activo=True
-    ).order_by('nombre', 'apellido')
-
-    serializer = UsuarioSerializer(tecnicos, many=True)
-
-    return Response({
-        'success': True,
-        'data': serializer.data,
-        'message': 'Técnicos obtenidos exitosamente',
-        'errors': []
-    }, status=status.HTTP_200_OK)
+    # Solo técnicos activos (lista precalculada, responde 304 si no cambió)
+    return _roster_response(
+        request, Usuario.RolChoices.TECNICO, 'Técnicos obtenidos exitosamente')
 
 
 @swagger_auto_schema(
@@ -975,6 +1062,9 @@ def tecnicos_list_view(request):
                     "errors": []
                 }
             }
+        ),
+        304: openapi.Response(
+            description="Sin cambios desde la versión indicada en If-None-Match"
         )
     },
     tags=['Usuarios - Conveniencia']
@@ -986,20 +1076,9 @@ def supervisores_list_view(request):
     Vista para obtener lista de supervisores activos
     Endpoint de conveniencia para el frontend
     """
-    # Solo supervisores activos
-    supervisores = Usuario.objects.filter(
-        rol=Usuario.RolChoices.SUPERVISOR,
-        activo=True
-    ).order_by('nombre', 'apellido')
-
-    serializer = UsuarioSerializer(supervisores, many=True)
-
-    return Response({
-        'success': True,
-        'data': serializer.data,
-        'message': 'Supervisores obtenidos exitosamente',
-        'errors': []
-    }, status=status.HTTP_200_OK)
+    # Solo supervisores activos (lista precalculada, responde 304 si no cambió)
+    return _roster_response(
+        request, Usuario.RolChoices.SUPERVISOR, 'Supervisores obtenidos exitosamente')
 
 
 @swagger_auto_schema(
@@ -1018,7 +1097,12 @@ def supervisores_list_view(request):
                         "supervisores": 3,
                         "tecnicos": 5,
                         "activos": 8,
-                        "inactivos": 2
+                        "inactivos": 2,
+                        "por_rol": {
+                            "ADMINISTRADOR": {"activos": 2, "inactivos": 0},
+                            "SUPERVISOR": {"activos": 2, "inactivos": 1},
+                            "TECNICO": {"activos": 4, "inactivos": 1}
+                        }
                     },
                     "message": "Estadísticas obtenidas exitosamente",
                     "errors": []
@@ -1044,25 +1128,15 @@ def usuarios_stats_view(request):
             'errors': ['Permisos insuficientes']
         }, status=status.HTTP_403_FORBIDDEN)
 
-    total_usuarios = Usuario.objects.count()
-    administradores = Usuario.objects.filter(
-        rol=Usuario.RolChoices.ADMINISTRADOR).count()
-    supervisores = Usuario.objects.filter(
-        rol=Usuario.RolChoices.SUPERVISOR).count()
-    tecnicos = Usuario.objects.filter(rol=Usuario.RolChoices.TECNICO).count()
-    activos = Usuario.objects.filter(activo=True).count()
-    inactivos = Usuario.objects.filter(activo=False).count()
+    # Contadores mantenidos por señales: una query sobre a lo sumo 6 filas
+    data = estadisticas_usuarios()
+    if request.user.es_administrador:
+        # Aciertos de la caché de autenticación de este proceso
+        data['cache_autenticacion'] = user_cache.stats()
 
     return Response({
         'success': True,
-        'data': {
-            'total_usuarios': total_usuarios,
-            'administradores': administradores,
-            'supervisores': supervisores,
-            'tecnicos': tecnicos,
-            'activos': activos,
-            'inactivos': inactivos
-        },
+        'data': data,
         'message': 'Estadísticas obtenidas exitosamente',
         'errors': []
     }, status=status.HTTP_200_OK)
@@ -0,0 +1,63 @@
+"""
+SKYNET - Filtros por rango de fechas compatibles con índices
+Convierte días locales (America/Guatemala) en rangos [inicio, fin) de
+timestamps con zona horaria, en lugar de usar lookups __date que aplican
+una conversión por fila e impiden usar los índices B-tree.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+def parse_fecha(valor):
+    """
+    Convierte 'YYYY-MM-DD' (o un date) en date; ValueError si no es válida
+    """
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    if isinstance(valor, date):
+        return valor
+
+    try:
+        fecha = parse_date(str(valor).strip()) if valor else None
+    except ValueError:
+        # Bien formada pero inexistente (p. ej. 2024-02-30)
+        fecha = None
+    if fecha is None:
+        raise ValueError(f"Fecha inválida '{valor}'. Formato esperado: YYYY-MM-DD")
+    return fecha
+
+
+def inicio_del_dia(fecha, tz=None):
+    """Medianoche local del día indicado como datetime con zona horaria"""
+    tz = tz or timezone.get_current_timezone()
+    return timezone.make_aware(datetime.combine(fecha, time.min), tz)
+
+
+def rango_fechas(desde=None, hasta=None, tz=None):
+    """
+    Rango semiabierto [inicio, fin) que cubre los días locales desde..hasta
+    (ambos inclusive). Cualquiera de los extremos puede omitirse (None).
+    """
+    inicio = fin = None
+    if desde:
+        inicio = inicio_del_dia(parse_fecha(desde), tz)
+    if hasta:
+        fin = inicio_del_dia(parse_fecha(hasta) + timedelta(days=1), tz)
+    return inicio, fin
+
+
+def filtrar_rango_fechas(queryset, campo, desde=None, hasta=None, tz=None):
+    """
+    Filtra ``campo`` por días locales usando comparaciones directas
+    (campo >= inicio AND campo < fin) que el planificador resuelve con
+    un range scan sobre el índice.
+    """
+    inicio, fin = rango_fechas(desde, hasta, tz)
+    if inicio is not None:
+        queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    if fin is not None:
+        queryset = queryset.filter(**{f'{campo}__lt': fin})
+    return queryset
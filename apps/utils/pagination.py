@@ -0,0 +1,176 @@
+"""
+SKYNET - Paginación por cursor (keyset)
+Evita OFFSET y COUNT(*) en listados grandes
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class CursorInvalido(Exception):
+    """
+    El cursor recibido no pudo decodificarse o no corresponde al ordenamiento
+    """
+
+
+def _codificar_valor(value):
+    """Serializa un valor de ordenamiento conservando su tipo"""
+    if isinstance(value, datetime):
+        # isoformat completo: DjangoJSONEncoder trunca los microsegundos
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decodificar_valor(value):
+    """Operación inversa de _codificar_valor"""
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise ValueError('Valor de cursor desconocido')
+    return value
+
+
+class KeysetPaginator:
+    """
+    Paginador keyset sobre un ordenamiento estable.
+
+    El último campo del ordenamiento debe ser único (normalmente ``id``) para
+    que el cursor identifique una posición exacta. Nunca ejecuta COUNT(*):
+    se pide una fila extra para saber si existe una página siguiente.
+    Los campos del ordenamiento no deben admitir NULL.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, ordering, page_size=None, max_page_size=None):
+        self.ordering = list(ordering)
+        self.page_size = page_size or settings.REST_FRAMEWORK.get(
+            'PAGE_SIZE', 20)
+        if max_page_size is not None:
+            self.max_page_size = max_page_size
+
+    @property
+    def campos(self):
+        """Nombres de los campos del ordenamiento sin prefijo de dirección"""
+        return [campo.lstrip('-') for campo in self.ordering]
+
+    def get_page_size(self, request):
+        """Tamaño de página solicitado, acotado a max_page_size"""
+        valor = request.GET.get(self.page_size_query_param)
+        if valor:
+            try:
+                tamano = int(valor)
+            except ValueError:
+                return self.page_size
+            if tamano > 0:
+                return min(tamano, self.max_page_size)
+        return self.page_size
+
+    def encode_cursor(self, row):
+        """Genera un cursor opaco a partir de la última fila de la página"""
+        valores = []
+        for campo in self.campos:
+            if isinstance(row, dict):
+                valor = row[campo]
+            else:
+                valor = getattr(row, campo)
+            valores.append(_codificar_valor(valor))
+        payload = json.dumps(valores, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor, queryset=None):
+        """
+        Decodifica un cursor opaco en la lista de valores de ordenamiento.
+        Con ``queryset`` cada valor se convierte con el campo (o la
+        anotación) que ordena: un valor de otro tipo es un cursor inválido
+        y no un error de la base de datos al filtrar.
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = base64.urlsafe_b64decode(cursor + padding)
+            valores = json.loads(payload)
+            if not isinstance(valores, list):
+                raise ValueError('El cursor debe ser una lista')
+            valores = [_decodificar_valor(v) for v in valores]
+        except (ValueError, TypeError):
+            raise CursorInvalido('El cursor proporcionado no es válido.')
+
+        if len(valores) != len(self.ordering):
+            raise CursorInvalido('El cursor proporcionado no es válido.')
+        if queryset is not None:
+            valores = [
+                self._convertir(queryset, campo, valor)
+                for campo, valor in zip(self.campos, valores)
+            ]
+        return valores
+
+    @staticmethod
+    def _convertir(queryset, nombre, valor):
+        """Valor del cursor con el tipo del campo de ordenamiento"""
+        anotacion = queryset.query.annotations.get(nombre)
+        try:
+            campo = (anotacion.output_field if anotacion is not None
+                     else queryset.model._meta.get_field(nombre))
+        except FieldDoesNotExist:
+            return valor
+        if valor is None or isinstance(valor, (list, dict, bool)):
+            # Los campos del ordenamiento no admiten NULL
+            raise CursorInvalido('El cursor proporcionado no es válido.')
+        try:
+            return campo.to_python(valor)
+        except (ValidationError, ValueError, TypeError):
+            raise CursorInvalido('El cursor proporcionado no es válido.')
+
+    def keyset_filter(self, valores):
+        """
+        Construye la condición "después de" para el ordenamiento:
+        (a > x) OR (a = x AND b > y) OR ... respetando la dirección de cada campo
+        """
+        condicion = Q()
+        igualdades = {}
+        for campo, valor in zip(self.ordering, valores):
+            nombre = campo.lstrip('-')
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            condicion |= Q(**igualdades, **{f'{nombre}__{lookup}': valor})
+            igualdades[nombre] = valor
+        return condicion
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Retorna (filas, siguiente_cursor) para la página solicitada
+        """
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.GET.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(
+                self.keyset_filter(self.decode_cursor(cursor, queryset)))
+
+        filas = list(queryset[:page_size + 1])
+        siguiente = None
+        if len(filas) > page_size:
+            filas = filas[:page_size]
+            siguiente = self.encode_cursor(filas[-1])
+
+        self.page_size_actual = page_size
+        return filas, siguiente
+
+    def get_pagination_data(self, siguiente):
+        """Metadatos de paginación que acompañan al envelope estándar"""
+        return {
+            'next_cursor': siguiente,
+            'has_more': siguiente is not None,
+            'page_size': self.page_size_actual,
+        }
@@ -0,0 +1,91 @@
+"""
+SKYNET - Proyecciones compactas para listados (?view=compact / ?fields=)
+Lee solo las columnas solicitadas con values() y evita ModelSerializer
+"""
+
+from django.db.models import F
+
+
+class CampoProyeccionInvalido(Exception):
+    """
+    Se solicitó un campo que la proyección no expone
+    """
+
+
+class Proyeccion:
+    """
+    Describe las columnas que un listado puede devolver en modo compacto.
+
+    ``campos`` mapea la clave camelCase que espera el frontend al campo ORM
+    (o expresión) que la produce. ``formatos`` aplica la misma representación
+    que el serializer completo a fechas y decimales, para que ambos modos
+    devuelvan valores idénticos.
+    """
+
+    def __init__(self, campos, compactos, formatos=None):
+        self.campos = dict(campos)
+        self.compactos = list(compactos)
+        self.formatos = formatos or {}
+
+    def claves_solicitadas(self, params):
+        """
+        Claves a devolver según el query string, o None para el modo completo
+        """
+        fields = params.get('fields')
+        if fields:
+            claves = []
+            for clave in fields.split(','):
+                clave = clave.strip()
+                if clave and clave not in claves:
+                    claves.append(clave)
+            desconocidas = [c for c in claves if c not in self.campos]
+            if desconocidas:
+                raise CampoProyeccionInvalido(
+                    f"Campos no disponibles: {', '.join(desconocidas)}. "
+                    f"Opciones: {', '.join(self.campos)}")
+            return claves
+
+        if params.get('view') == 'compact':
+            return list(self.compactos)
+
+        return None
+
+    def values(self, queryset, claves, internos=()):
+        """
+        Proyecta el queryset en SQL a las claves pedidas.
+        ``internos`` agrega campos que se necesitan (p. ej. para el cursor)
+        sin exponerlos en la respuesta.
+        """
+        posicionales = []
+        expresiones = {}
+        for clave in claves:
+            origen = self.campos[clave]
+            if origen == clave:
+                posicionales.append(clave)
+            elif isinstance(origen, str):
+                expresiones[clave] = F(origen)
+            else:
+                expresiones[clave] = origen
+
+        for campo in internos:
+            if campo not in posicionales and campo not in expresiones:
+                posicionales.append(campo)
+
+        return queryset.values(*posicionales, **expresiones)
+
+    def representar(self, filas, claves):
+        """
+        Convierte las filas de values() al formato de salida del frontend
+        """
+        formatos = [
+            (clave, self.formatos[clave])
+            for clave in claves if clave in self.formatos
+        ]
+        datos = []
+        for fila in filas:
+            item = {clave: fila[clave] for clave in claves}
+            for clave, formato in formatos:
+                if item[clave] is not None:
+                    item[clave] = formato(item[clave])
+            datos.append(item)
+        return datos
@@ -0,0 +1,22 @@
+"""
+SKYNET - Utilidades comunes para serializers
+"""
+
+
+class SharedRepresentationMixin:
+    """
+    Mixin para serializers anidados que se repiten en un mismo listado
+    (técnico, supervisor, cliente...).
+
+    Cada instancia se serializa una sola vez por respuesta: la representación
+    se guarda en el contexto del serializer raíz, indexada por clase y pk,
+    y se reutiliza en las filas siguientes.
+    """
+    shared_cache_key = '_representaciones_compartidas'
+
+    def to_representation(self, instance):
+        cache = self.context.setdefault(self.shared_cache_key, {})
+        key = (type(self), instance.pk)
+        if key not in cache:
+            cache[key] = super().to_representation(instance)
+        return cache[key]
@@ -0,0 +1,145 @@
+"""
+SKYNET - Limitación de tasa con token buckets
+Throttles de DRF (responden 429 con Retry-After) con un bucket por clave.
+Cada proceso tiene su propio bucket en memoria (camino rápido, sin red);
+con RATE_LIMIT_BACKEND = 'cache' además se consume un bucket compartido
+en la caché de Django para que el límite sea global entre workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODOS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Convierte 'N/periodo' (formato de DRF: '5/min', '100/hour') en
+    (capacidad, tokens por segundo)
+    """
+    cantidad, periodo = rate.split('/')
+    capacidad = int(cantidad)
+    return capacidad, capacidad / PERIODOS[periodo[0]]
+
+
+def _recargar(estado, capacidad, tasa, ahora):
+    """Tokens disponibles tras recargar desde el último consumo"""
+    if estado is None:
+        return float(capacidad)
+    tokens, ultimo = estado
+    return min(float(capacidad), tokens + max(0.0, ahora - ultimo) * tasa)
+
+
+class BucketsLocales:
+    """Buckets por proceso, acotados a RATE_LIMIT_MAX_KEYS claves (LRU)"""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, tasa):
+        """
+        Consume un token. Retorna 0 si se permitió o los segundos a
+        esperar hasta el próximo token.
+        """
+        maximo = getattr(settings, 'RATE_LIMIT_MAX_KEYS', 50000)
+        with self._lock:
+            ahora = time.monotonic()
+            tokens = _recargar(self._buckets.get(clave), capacidad, tasa, ahora)
+            if tokens < 1:
+                return (1 - tokens) / tasa
+            self._buckets[clave] = (tokens - 1, ahora)
+            self._buckets.move_to_end(clave)
+            while len(self._buckets) > maximo:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def limpiar(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class BucketsCache:
+    """
+    Buckets en la caché compartida de Django. La lectura y escritura no
+    son atómicas: bajo carrera se puede aceptar algún request de más, pero
+    el bucket local de cada worker sigue acotando la ráfaga.
+    """
+    key_prefix = 'skynet:ratelimit:'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default')]
+
+    def consumir(self, clave, capacidad, tasa):
+        key = self.key_prefix + clave
+        ahora = time.time()
+        tokens = _recargar(self.cache.get(key), capacidad, tasa, ahora)
+        if tokens < 1:
+            return (1 - tokens) / tasa
+        # El bucket lleno vuelve al estado inicial: puede expirar
+        self.cache.set(key, (tokens - 1, ahora), int(capacidad / tasa) + 1)
+        return 0
+
+    def limpiar(self):
+        pass
+
+
+buckets_locales = BucketsLocales()
+BACKENDS_COMPARTIDOS = {
+    'cache': BucketsCache(),
+}
+
+
+def limpiar_buckets():
+    """Vacía los buckets locales (útil en pruebas)"""
+    buckets_locales.limpiar()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle base. Las subclases definen ``scope`` (la tasa se toma de
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope]) y ``get_clave``;
+    si ``get_clave`` retorna None la request no se limita.
+    """
+    scope = None
+    metodos = ('POST',)
+
+    def __init__(self):
+        self.espera = None
+
+    def get_clave(self, request, view):
+        raise NotImplementedError('.get_clave() debe ser implementado')
+
+    def allow_request(self, request, view):
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return True
+        if request.method not in self.metodos:
+            return True
+
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        clave = self.get_clave(request, view)
+        if rate is None or clave is None:
+            return True
+
+        capacidad, tasa = parse_rate(rate)
+        clave = f'{self.scope}:{clave}'
+
+        # Camino rápido: si el bucket local ya está vacío no se consulta
+        # el backend compartido
+        self.espera = buckets_locales.consumir(clave, capacidad, tasa)
+        if not self.espera:
+            compartido = BACKENDS_COMPARTIDOS.get(
+                getattr(settings, 'RATE_LIMIT_BACKEND', 'local'))
+            if compartido is not None:
+                self.espera = compartido.consumir(clave, capacidad, tasa)
+        return not self.espera
+
+    def wait(self):
+        return self.espera
@@ -7,35 +7,44 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 
 
+# Patrones precompilados (también usados por validaciones en lote)
+_PHONE_CLEAN_RE = re.compile(r'[\s\-\+]')
+# 502XXXXXXXX o XXXXXXXX (número local)
+_GUATEMALA_PHONE_RE = re.compile(r'^(502)?\d{8}$')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+GUATEMALA_PHONE_MESSAGE = (
+    'Ingrese un número de teléfono válido para Guatemala. '
+    'Formatos válidos: +502 XXXX-XXXX, 502 XXXX-XXXX, o XXXX-XXXX'
+)
+EMAIL_MESSAGE = 'Ingrese un email válido.'
+
+
+def is_guatemala_phone(value):
+    """Indica si el valor es un teléfono válido para Guatemala"""
+    return bool(_GUATEMALA_PHONE_RE.match(_PHONE_CLEAN_RE.sub('', value)))
+
+
+def is_valid_email(value):
+    """Indica si el valor tiene formato de email"""
+    return bool(_EMAIL_RE.match(value))
+
+
 def validate_guatemala_phone(value):
     """
     Validador para números de teléfono de Guatemala
     Formato: +502 XXXX-XXXX o 502 XXXX-XXXX o XXXX-XXXX
     """
-    # Remover espacios y guiones
-    clean_value = re.sub(r'[\s\-\+]', '', value)
-
-    # Patrones válidos para Guatemala
-    patterns = [
-        r'^502\d{8}$',      # 502XXXXXXXX
-        r'^\d{8}$',         # XXXXXXXX (número local)
-        r'^502\d{4}\d{4}$',  # 502XXXXXXXX
-    ]
-
-    if not any(re.match(pattern, clean_value) for pattern in patterns):
-        raise ValidationError(
-            'Ingrese un número de teléfono válido para Guatemala. '
-            'Formatos válidos: +502 XXXX-XXXX, 502 XXXX-XXXX, o XXXX-XXXX'
-        )
+    if not is_guatemala_phone(value):
+        raise ValidationError(GUATEMALA_PHONE_MESSAGE)
 
 
 def validate_guatemala_email(value):
     """
     Validador básico para emails
     """
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, value):
-        raise ValidationError('Ingrese un email válido.')
+    if not is_valid_email(value):
+        raise ValidationError(EMAIL_MESSAGE)
 
 
 def validate_coordinates(latitude, longitude):
@@ -0,0 +1,20 @@
+"""
+SKYNET - Configuración de la app visitas
+"""
+
+from django.apps import AppConfig
+
+
+class VisitasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.visitas'
+    verbose_name = 'Visitas'
+
+    def ready(self):
+        """
+        Importar señales cuando la app esté lista
+        """
+        try:
+            import apps.visitas.signals
+        except ImportError:
+            pass
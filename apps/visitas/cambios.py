@@ -0,0 +1,271 @@
+"""
+SKYNET - Feed de cambios para sincronización incremental
+Cada alta, modificación o eliminación de visitas, ejecuciones y clientes
+agrega una fila a ``cambios`` (señales para save()/delete() y registro
+explícito en los caminos sin señales: update(), bulk_create e INSERT en
+lote). Los clientes guardan el último id recibido y piden solo lo
+posterior (``?since=<cursor>``) en lugar de volver a descargar las listas.
+
+Las filas se insertan en la misma transacción que el cambio: se confirman
+o se revierten con él. Para que el orden de los ids siga al de los commits,
+quien registra cambios toma un lock de transacción (advisory lock en
+PostgreSQL; SQLite ya serializa las escrituras) que se libera al
+confirmar: un lector nunca ve un id mientras otro menor sigue en vuelo.
+Como resguardo en motores sin ese lock, el feed solo entrega filas con
+más de MARGEN_LECTURA de antigüedad.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.clientes.models import Cliente
+from apps.clientes.serializers import ClienteSerializer
+from .filters import visitas_visibles_para
+from .models import Cambio, Ejecucion, PurgaCambios, Visita
+from .serializers import EjecucionSerializer, VisitaSerializer
+
+_Entidad = Cambio.EntidadChoices
+_Operacion = Cambio.OperacionChoices
+
+# Cambios por página del feed
+LIMITE_CAMBIOS = 500
+MAX_LIMITE_CAMBIOS = 1000
+
+MARGEN_LECTURA = timedelta(seconds=1)
+
+# Clave del advisory lock que ordena los commits del feed en PostgreSQL
+LOCK_FEED = 0x534b594e
+
+
+class CursorExpirado(Exception):
+    """El cursor es anterior a los cambios conservados (purgados)"""
+
+
+# ------------------------------------------------------------------------------
+# Registro
+# ------------------------------------------------------------------------------
+
+def _ordenar_commits():
+    """
+    Lock de transacción del feed: las transacciones que registran cambios
+    se confirman en el orden en que obtienen sus ids
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_FEED])
+
+
+def registrar(cambios):
+    """
+    Inserta ``cambios`` (instancias de Cambio sin guardar) con un solo
+    INSERT, en la transacción en curso: si la transacción (o el savepoint)
+    se revierte, no se registran. Llamar dentro de la transacción del
+    cambio (save(), delete() y las transiciones ya la abren).
+    """
+    if not cambios:
+        return
+    _ordenar_commits()
+    ahora = timezone.now()
+    for cambio in cambios:
+        cambio.fecha = ahora
+    Cambio.objects.bulk_create(cambios)
+
+
+def _cambio(entidad, objeto_id, operacion, alcance=(None, None)):
+    return Cambio(
+        entidad=entidad, objeto_id=objeto_id, operacion=operacion,
+        tecnico_id=alcance[0], supervisor_id=alcance[1])
+
+
+def cambios_visita(visita, operacion=_Operacion.GUARDADO):
+    """
+    Cambios de una visita. Si se reasignó (técnico o supervisor distinto
+    al leído), primero una baja para quienes dejan de verla y, en el
+    guardado, sus ejecuciones para quienes la reciben.
+    """
+    alcance = (visita.tecnico_id, visita.supervisor_id)
+    cambios = []
+    previo = getattr(visita, '_alcance_previo', None)
+    if operacion == _Operacion.GUARDADO and previo is not None and previo != alcance:
+        retirado = tuple(
+            anterior if anterior != actual else None
+            for anterior, actual in zip(previo, alcance))
+        cambios.append(_cambio(_Entidad.VISITA, visita.pk, _Operacion.ELIMINADO, retirado))
+        cambios.extend(
+            _cambio(_Entidad.EJECUCION, ejecucion_id, _Operacion.GUARDADO, alcance)
+            for ejecucion_id in Ejecucion.objects.filter(
+                visita_id=visita.pk).values_list('id', flat=True))
+    cambios.append(_cambio(_Entidad.VISITA, visita.pk, operacion, alcance))
+    visita._alcance_previo = alcance
+    return cambios
+
+
+def registrar_visitas(visitas, operacion=_Operacion.GUARDADO):
+    cambios = []
+    for visita in visitas:
+        cambios.extend(cambios_visita(visita, operacion))
+    registrar(cambios)
+
+
+def alcance_ejecucion(ejecucion):
+    """(tecnico_id, supervisor_id) de la visita de una ejecución"""
+    if Ejecucion.visita.is_cached(ejecucion):
+        return ejecucion.visita.tecnico_id, ejecucion.visita.supervisor_id
+    return Visita.objects.filter(pk=ejecucion.visita_id).values_list(
+        'tecnico_id', 'supervisor_id').first() or (None, None)
+
+
+def registrar_ejecucion(ejecucion, operacion=_Operacion.GUARDADO):
+    registrar([_cambio(
+        _Entidad.EJECUCION, ejecucion.pk, operacion, alcance_ejecucion(ejecucion))])
+
+
+def registrar_clientes(cliente_ids, operacion=_Operacion.GUARDADO):
+    registrar([_cambio(_Entidad.CLIENTE, pk, operacion) for pk in cliente_ids])
+
+
+# ------------------------------------------------------------------------------
+# Lectura
+# ------------------------------------------------------------------------------
+
+def cursor_actual():
+    """Id del último cambio registrado (0 si no hay)"""
+    return Cambio.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _alcance_rol(usuario):
+    """Filtro de las filas propias del rol (None: administrador, todas)"""
+    if usuario.es_tecnico:
+        return {'tecnico_id': usuario.id}
+    if usuario.es_supervisor:
+        return {'supervisor_id': usuario.id}
+    return None
+
+
+def leer_cambios(usuario, desde, limite=LIMITE_CAMBIOS):
+    """
+    Hasta ``limite`` cambios visibles para ``usuario`` con id > ``desde``,
+    en orden. Retorna (cambios, hay_mas). Lanza CursorExpirado si los
+    cambios posteriores a ``desde`` ya se purgaron.
+    """
+    purgado = PurgaCambios.objects.filter(pk=1).values_list('hasta_id', flat=True).first()
+    if purgado is not None and desde < purgado:
+        raise CursorExpirado(
+            'El cursor es anterior a los cambios conservados; '
+            'descargue de nuevo las listas completas.')
+
+    base = Cambio.objects.filter(
+        id__gt=desde, fecha__lte=timezone.now() - MARGEN_LECTURA).order_by('id')
+    alcance = _alcance_rol(usuario)
+    if alcance is None:
+        filas = list(base[:limite + 1])
+    else:
+        # Dos rangos sobre índices (filas del rol y clientes) mezclados por id,
+        # en lugar de un OR que impide usar cualquiera de los dos
+        propias = base.filter(**alcance)[:limite + 1]
+        clientes = base.filter(entidad=_Entidad.CLIENTE)[:limite + 1]
+        filas = list(heapq.merge(propias, clientes, key=lambda c: c.id))[:limite + 1]
+    return filas[:limite], len(filas) > limite
+
+
+def _serializar_visitas(usuario, ids):
+    queryset = visitas_visibles_para(
+        usuario, VisitaSerializer.setup_eager_loading(Visita.objects.filter(pk__in=ids)))
+    return {v.pk: VisitaSerializer(v).data for v in queryset}
+
+
+def _serializar_ejecuciones(usuario, ids):
+    queryset = Ejecucion.objects.filter(
+        pk__in=ids, visita__in=visitas_visibles_para(usuario, Visita.objects.all()))
+    return {e.pk: EjecucionSerializer(e).data for e in queryset}
+
+
+def _serializar_clientes(usuario, ids):
+    return {c.pk: ClienteSerializer(c).data for c in Cliente.objects.filter(pk__in=ids)}
+
+
+MODELOS_CON_ALCANCE = {
+    _Entidad.VISITA: Visita,
+    _Entidad.EJECUCION: Ejecucion,
+}
+
+SERIALIZADORES = {
+    _Entidad.VISITA: _serializar_visitas,
+    _Entidad.EJECUCION: _serializar_ejecuciones,
+    _Entidad.CLIENTE: _serializar_clientes,
+}
+
+
+def serializar_cambios(usuario, cambios):
+    """
+    Un elemento por objeto (su último cambio de la página), con el estado
+    actual de la fila en ``datos``, leída en lote por entidad.
+    Un guardado cuya fila ya no existe se entrega como eliminado; si la
+    fila dejó de ser visible para el usuario se omite (su baja llega en
+    un cambio posterior).
+    """
+    ultimos = {}
+    for cambio in cambios:
+        clave = (cambio.entidad, cambio.objeto_id)
+        ultimos.pop(clave, None)
+        ultimos[clave] = cambio
+
+    ids = {}
+    for (entidad, objeto_id), cambio in ultimos.items():
+        if cambio.operacion == _Operacion.GUARDADO:
+            ids.setdefault(entidad, set()).add(objeto_id)
+    datos = {}
+    ocultos = set()
+    for entidad, objeto_ids in ids.items():
+        datos[entidad] = SERIALIZADORES[entidad](usuario, objeto_ids)
+        faltantes = objeto_ids - datos[entidad].keys()
+        if faltantes and entidad in MODELOS_CON_ALCANCE:
+            # Existen pero el usuario ya no las ve
+            ocultos.update(
+                (entidad, pk) for pk in MODELOS_CON_ALCANCE[entidad].objects.filter(
+                    pk__in=faltantes).values_list('id', flat=True))
+
+    resultado = []
+    for clave, cambio in ultimos.items():
+        if clave in ocultos:
+            continue
+        entidad, objeto_id = clave
+        fila = None
+        operacion = cambio.operacion
+        if operacion == _Operacion.GUARDADO:
+            fila = datos[entidad].get(objeto_id)
+            if fila is None:
+                operacion = _Operacion.ELIMINADO
+        resultado.append({
+            'secuencia': cambio.id,
+            'entidad': entidad,
+            'id': objeto_id,
+            'operacion': operacion,
+            'fecha': cambio.fecha,
+            'datos': fila,
+        })
+    return resultado
+
+
+def purgar_cambios(antes_de):
+    """
+    Elimina los cambios registrados antes de ``antes_de`` y avanza la marca
+    de purga; retorna cuántos se eliminaron. Se elimina hasta el mayor id
+    anterior a la fecha (un prefijo de la secuencia, sin huecos).
+    """
+    with transaction.atomic():
+        hasta = Cambio.objects.filter(fecha__lt=antes_de).aggregate(
+            hasta=Max('id'))['hasta']
+        if hasta is None:
+            return 0
+        eliminados, _ = Cambio.objects.filter(id__lte=hasta).delete()
+        marca, _ = PurgaCambios.objects.select_for_update().get_or_create(pk=1)
+        if hasta > marca.hasta_id:
+            marca.hasta_id = hasta
+            marca.fecha = timezone.now()
+            marca.save()
+    return eliminados
@@ -0,0 +1,256 @@
+"""
+SKYNET - Eventos de cambio de estado de visitas (push a supervisores)
+Las transiciones del workflow (iniciar, completar, cancelar) se publican al
+confirmarse y el broker las reparte a las suscripciones del stream SSE
+(ver sse.py) del supervisor de la visita y de los administradores, en
+lugar de que cada pantalla consulte el listado cada pocos segundos.
+
+El broker vive en el proceso; EVENTOS_BACKEND define cómo le llegan los
+eventos:
+
+- ``local``: la transición se entrega directamente. Suficiente con un
+  solo proceso ASGI (las vistas síncronas corren en el mismo proceso).
+- ``feed``: cada proceso con suscriptores lee el feed de cambios cada
+  EVENTOS_INTERVALO_FEED segundos (una query por proceso, no por
+  conexión), así que ve las transiciones hechas en cualquier worker.
+- Ruta a una clase propia con ``iniciar(broker)`` y ``publicar(evento)``.
+"""
+
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cambios import MARGEN_LECTURA, cursor_actual
+from .models import Cambio, Visita
+
+logger = logging.getLogger(__name__)
+
+TIPO_TRANSICION = 'visita.estado'
+
+# Eventos pendientes por conexión; una conexión que no los consume se
+# cierra y el cliente se pone al día con el feed de cambios al reconectar
+MAX_EVENTOS_PENDIENTES = 100
+
+
+def evento_visita(visita, estado_anterior=None):
+    """Payload del evento de estado de una visita"""
+    return {
+        'tipo': TIPO_TRANSICION,
+        'visitaId': visita.pk,
+        'estado': visita.estado,
+        'estadoAnterior': estado_anterior,
+        'tecnicoId': visita.tecnico_id,
+        'supervisorId': visita.supervisor_id,
+        'clienteId': visita.cliente_id,
+        'fecha': (visita.fecha_actualizacion or timezone.now()).isoformat(),
+    }
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión del stream (vive en su event loop)"""
+
+    def __init__(self, supervisor_id=None, maximo=MAX_EVENTOS_PENDIENTES):
+        self.loop = asyncio.get_running_loop()
+        self.supervisor_id = supervisor_id    # None: todas las visitas
+        self.cola = asyncio.Queue(maximo)
+        self.cerrada = False
+
+    def entregar(self, evento):
+        """Encola un evento (se ejecuta en el loop de la suscripción)"""
+        if self.cerrada:
+            return
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            logger.warning('Suscripción de eventos desbordada; se cierra la conexión')
+            self.cerrar()
+
+    def cerrar(self):
+        """Termina el stream: vacía la cola y encola el fin (None)"""
+        if self.cerrada:
+            return
+        self.cerrada = True
+        while not self.cola.empty():
+            self.cola.get_nowait()
+        self.cola.put_nowait(None)
+
+    async def siguiente(self, timeout):
+        """Próximo evento, None al cerrarse; TimeoutError si no hay"""
+        return await asyncio.wait_for(self.cola.get(), timeout)
+
+
+class BrokerEventos:
+    """
+    Suscripciones del proceso indexadas por supervisor: repartir un evento
+    solo recorre las conexiones de su supervisor y las de administradores.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_supervisor = {}
+        self._todas = set()
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            nombre = getattr(settings, 'EVENTOS_BACKEND', 'local')
+            clase = BACKENDS.get(nombre) or import_string(nombre)
+            self._backend = clase()
+        return self._backend
+
+    def configurar(self, backend):
+        """Reemplaza el backend (útil en pruebas)"""
+        self._backend = backend
+
+    @property
+    def total_suscripciones(self):
+        with self._lock:
+            return len(self._todas) + sum(len(s) for s in self._por_supervisor.values())
+
+    def suscribir(self, supervisor_id=None):
+        """Nueva suscripción (llamar desde el event loop del stream)"""
+        suscripcion = Suscripcion(supervisor_id)
+        with self._lock:
+            if supervisor_id is None:
+                self._todas.add(suscripcion)
+            else:
+                self._por_supervisor.setdefault(supervisor_id, set()).add(suscripcion)
+        self.backend.iniciar(self)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        suscripcion.cerrada = True
+        with self._lock:
+            if suscripcion.supervisor_id is None:
+                self._todas.discard(suscripcion)
+            else:
+                grupo = self._por_supervisor.get(suscripcion.supervisor_id, set())
+                grupo.discard(suscripcion)
+                if not grupo:
+                    self._por_supervisor.pop(suscripcion.supervisor_id, None)
+
+    def distribuir(self, evento):
+        """
+        Entrega el evento a las suscripciones interesadas. Se puede llamar
+        desde cualquier hilo: cada entrega se agenda en el loop de su
+        conexión.
+        """
+        with self._lock:
+            destinos = list(self._todas)
+            destinos.extend(self._por_supervisor.get(evento.get('supervisorId'), ()))
+        for suscripcion in destinos:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, evento)
+            except RuntimeError:
+                # Loop cerrado: la conexión ya terminó
+                self.cancelar(suscripcion)
+
+    def publicar(self, evento):
+        self.backend.publicar(evento)
+
+
+class BackendLocal:
+    """Entrega directa dentro del proceso"""
+
+    def iniciar(self, broker):
+        pass
+
+    def publicar(self, evento):
+        broker_eventos.distribuir(evento)
+
+
+class BackendFeed:
+    """
+    Lee las transiciones del feed de cambios. Un solo sondeo por proceso
+    mientras haya suscriptores; publicar() no hace nada porque la
+    transición ya quedó registrada en el feed.
+    """
+
+    def __init__(self):
+        self._tarea = None
+        self._estados = {}
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'EVENTOS_INTERVALO_FEED', 2)
+
+    def iniciar(self, broker):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._sondear(broker))
+
+    def publicar(self, evento):
+        pass
+
+    async def _sondear(self, broker):
+        cursor = await sync_to_async(self._sin_conexion(cursor_actual))()
+        while broker.total_suscripciones:
+            await asyncio.sleep(self.intervalo)
+            try:
+                cursor, eventos = await sync_to_async(
+                    self._sin_conexion(self._leer))(cursor)
+            except Exception:
+                logger.exception('Error leyendo el feed de cambios para eventos')
+                continue
+            for evento in eventos:
+                broker.distribuir(evento)
+
+    @staticmethod
+    def _sin_conexion(funcion):
+        """Fuera del ciclo de request nadie más cierra la conexión"""
+        def envuelta(*args):
+            try:
+                return funcion(*args)
+            finally:
+                connection.close_if_unusable_or_obsolete()
+        return envuelta
+
+    def _leer(self, cursor):
+        """(nuevo cursor, eventos) de las visitas cambiadas desde ``cursor``"""
+        cambios = list(Cambio.objects.filter(
+            id__gt=cursor,
+            fecha__lte=timezone.now() - MARGEN_LECTURA
+        ).order_by('id').values_list('id', 'entidad', 'objeto_id', 'operacion')[:1000])
+        if not cambios:
+            return cursor, []
+
+        ids = {
+            objeto_id for _, entidad, objeto_id, operacion in cambios
+            if entidad == Cambio.EntidadChoices.VISITA
+            and operacion == Cambio.OperacionChoices.GUARDADO
+        }
+        eventos = []
+        for visita in Visita.objects.filter(pk__in=ids).only(
+                'id', 'estado', 'tecnico_id', 'supervisor_id', 'cliente_id',
+                'fecha_actualizacion'):
+            # Solo cambios de estado (el feed también trae otras ediciones).
+            # Una visita vista por primera vez solo registra su estado: sin
+            # el anterior no se sabe si la edición fue una transición
+            anterior = self._estados.get(visita.pk)
+            if anterior is not None and anterior != visita.estado:
+                eventos.append(evento_visita(visita, anterior))
+            self._estados[visita.pk] = visita.estado
+        if len(self._estados) > 50000:
+            self._estados.clear()
+        return cambios[-1][0], eventos
+
+
+BACKENDS = {
+    'local': BackendLocal,
+    'feed': BackendFeed,
+}
+
+# Instancia única por proceso
+broker_eventos = BrokerEventos()
+
+
+def publicar_transicion(visita, estado_anterior):
+    """Publica la transición de ``visita`` cuando se confirme la transacción"""
+    evento = evento_visita(visita, estado_anterior)
+    transaction.on_commit(lambda: broker_eventos.publicar(evento))
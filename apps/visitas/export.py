@@ -0,0 +1,111 @@
+"""
+SKYNET - Exportación de visitas en streaming (NDJSON / CSV)
+Las filas se leen con un cursor del lado del servidor y se escriben a la
+respuesta a medida que llegan, con memoria constante sin importar el total.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Ejecucion
+from .serializers import VISITA_PROYECCION, EJECUCION_PROYECCION
+
+# Filas por lote leídas del cursor (y por query de ejecuciones)
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATOS_EXPORTACION = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """
+    Buffer mínimo para csv.writer: devuelve la línea en lugar de guardarla
+    """
+
+    def write(self, value):
+        return value
+
+
+def _lotes(iterable, tamano):
+    """Agrupa un iterador en listas de ``tamano`` elementos"""
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def iterar_visitas(queryset, campos, incluir_ejecuciones=False,
+                   chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Genera las visitas del queryset como diccionarios ya formateados.
+
+    Con ``incluir_ejecuciones`` cada lote de visitas se completa con una
+    sola query de ejecuciones (prefetch manual, ya que iterator() no
+    aplica prefetch_related).
+    """
+    filas = VISITA_PROYECCION.values(
+        queryset, campos, internos=['id']
+    ).iterator(chunk_size=chunk_size)
+    campos_ejecucion = list(EJECUCION_PROYECCION.campos)
+
+    for lote in _lotes(filas, chunk_size):
+        ejecuciones_por_visita = {}
+        if incluir_ejecuciones:
+            ejecuciones = EJECUCION_PROYECCION.values(
+                Ejecucion.objects.filter(
+                    visita_id__in=[fila['id'] for fila in lote]
+                ).order_by('visita_id', 'tiempo_inicio'),
+                campos_ejecucion
+            )
+            for ejecucion in EJECUCION_PROYECCION.representar(
+                    ejecuciones, campos_ejecucion):
+                ejecuciones_por_visita.setdefault(
+                    ejecucion['visitaId'], []).append(ejecucion)
+
+        for fila, visita in zip(lote, VISITA_PROYECCION.representar(lote, campos)):
+            if incluir_ejecuciones:
+                visita['ejecuciones'] = ejecuciones_por_visita.get(
+                    fila['id'], [])
+            yield visita
+
+
+def generar_ndjson(visitas):
+    """Una visita JSON por línea"""
+    for visita in visitas:
+        yield json.dumps(visita, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def generar_csv(visitas, campos, incluir_ejecuciones=False):
+    """
+    CSV plano. Con ejecuciones se emite una fila por ejecución repitiendo
+    las columnas de la visita (o una fila vacía si la visita no tiene).
+    """
+    writer = csv.writer(Echo())
+    columnas_ejecucion = [
+        c for c in EJECUCION_PROYECCION.campos if c != 'visitaId'
+    ] if incluir_ejecuciones else []
+
+    encabezado = list(campos) + [
+        f'ejecucion.{columna}' for columna in columnas_ejecucion]
+    yield writer.writerow(encabezado)
+
+    for visita in visitas:
+        base = [visita[campo] for campo in campos]
+        if not incluir_ejecuciones:
+            yield writer.writerow(base)
+            continue
+
+        ejecuciones = visita['ejecuciones'] or [None]
+        for ejecucion in ejecuciones:
+            extra = [
+                ejecucion[columna] if ejecucion else ''
+                for columna in columnas_ejecucion
+            ]
+            yield writer.writerow(base + extra)
@@ -0,0 +1,55 @@
+"""
+SKYNET - Filtros compartidos del módulo de visitas
+"""
+
+from apps.utils.fechas import filtrar_rango_fechas
+from .models import Visita
+
+
+def visitas_visibles_para(user, queryset=None):
+    """
+    Restringe el queryset de visitas según el rol del usuario
+    """
+    if queryset is None:
+        queryset = Visita.objects.all()
+
+    if user.es_tecnico:
+        # Los técnicos solo ven sus propias visitas
+        return queryset.filter(tecnico=user)
+    if user.es_supervisor:
+        # Los supervisores ven visitas que supervisan
+        return queryset.filter(supervisor=user)
+    # Los administradores ven todas las visitas
+    return queryset
+
+
+def filtrar_visitas(queryset, params):
+    """
+    Aplica los filtros opcionales de query string del listado de visitas.
+    Lanza ValueError si algún filtro tiene un valor inválido.
+    """
+    estado = params.get('estado')
+    if estado:
+        queryset = queryset.filter(estado=estado)
+
+    tipo_visita = params.get('tipo_visita')
+    if tipo_visita:
+        queryset = queryset.filter(tipo_visita=tipo_visita)
+
+    tecnico_id = params.get('tecnico_id')
+    if tecnico_id:
+        queryset = queryset.filter(tecnico_id=tecnico_id)
+
+    cliente_id = params.get('cliente_id')
+    if cliente_id:
+        queryset = queryset.filter(cliente_id=cliente_id)
+
+    # Días locales convertidos a un rango [inicio, fin) sobre el índice
+    queryset = filtrar_rango_fechas(
+        queryset,
+        'fecha_programada',
+        desde=params.get('fecha_desde'),
+        hasta=params.get('fecha_hasta')
+    )
+
+    return queryset
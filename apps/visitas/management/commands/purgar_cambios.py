@@ -0,0 +1,30 @@
+"""
+SKYNET - Purga del feed de cambios
+
+Uso:
+    python manage.py purgar_cambios [--dias 30]
+
+Los clientes con un cursor anterior a los cambios conservados reciben 410
+y vuelven a descargar las listas completas.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.visitas.cambios import purgar_cambios
+
+
+class Command(BaseCommand):
+    help = 'Elimina los cambios del feed de sincronización más antiguos que --dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30,
+                            help='Días de cambios a conservar')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser al menos 1')
+        eliminados = purgar_cambios(timezone.now() - timedelta(days=options['dias']))
+        self.stdout.write(self.style.SUCCESS(f'{eliminados} cambios eliminados'))
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Visita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('fecha_programada', models.DateTimeField(verbose_name='Fecha Programada')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+                ('estado', models.CharField(choices=[('PROGRAMADA', 'Programada'), ('EN_PROGRESO', 'En Progreso'), ('COMPLETADA', 'Completada'), ('CANCELADA', 'Cancelada'), ('REPROGRAMADA', 'Reprogramada')], default='PROGRAMADA', max_length=20, verbose_name='Estado')),
+                ('tipo_visita', models.CharField(choices=[('MANTENIMIENTO', 'Mantenimiento'), ('INSTALACION', 'Instalación'), ('REPARACION', 'Reparación'), ('INSPECCION', 'Inspección')], max_length=20, verbose_name='Tipo de Visita')),
+                ('descripcion', models.TextField(verbose_name='Descripción')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('latitud', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True, verbose_name='Latitud')),
+                ('longitud', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True, verbose_name='Longitud')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visitas', to='clientes.cliente', verbose_name='Cliente')),
+                ('supervisor', models.ForeignKey(blank=True, limit_choices_to={'rol': 'SUPERVISOR'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='visitas_supervisadas', to=settings.AUTH_USER_MODEL, verbose_name='Supervisor')),
+                ('tecnico', models.ForeignKey(limit_choices_to={'rol': 'TECNICO'}, on_delete=django.db.models.deletion.CASCADE, related_name='visitas_asignadas', to=settings.AUTH_USER_MODEL, verbose_name='Técnico Asignado')),
+            ],
+            options={
+                'verbose_name': 'Visita',
+                'verbose_name_plural': 'Visitas',
+                'db_table': 'visitas',
+                'ordering': ['-fecha_programada'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Ejecucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('descripcion', models.TextField(verbose_name='Descripción de la Ejecución')),
+                ('tiempo_inicio', models.DateTimeField(verbose_name='Tiempo de Inicio')),
+                ('tiempo_fin', models.DateTimeField(blank=True, null=True, verbose_name='Tiempo de Finalización')),
+                ('completada', models.BooleanField(default=False, verbose_name='Completada')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('evidencia_foto', models.CharField(blank=True, max_length=500, verbose_name='URL de Evidencia Fotográfica')),
+                ('visita', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejecuciones', to='visitas.visita', verbose_name='Visita')),
+            ],
+            options={
+                'verbose_name': 'Ejecución',
+                'verbose_name_plural': 'Ejecuciones',
+                'db_table': 'ejecuciones',
+                'ordering': ['tiempo_inicio'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ejecucion',
+            index=models.Index(fields=['visita', 'tiempo_inicio'], name='ejecuciones_visita_tiempo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['-fecha_programada', 'id'], name='visitas_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['tecnico', '-fecha_programada', 'id'], name='visitas_tecnico_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['supervisor', '-fecha_programada', 'id'], name='visitas_supervisor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['estado', '-fecha_programada', 'id'], name='visitas_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(condition=models.Q(('estado__in', ['PROGRAMADA', 'EN_PROGRESO'])), fields=['tecnico', 'fecha_programada'], name='visitas_tecnico_activas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(condition=models.Q(('estado__in', ['PROGRAMADA', 'EN_PROGRESO'])), fields=['supervisor', 'fecha_programada'], name='visitas_sup_activas_idx'),
+        ),
+    ]
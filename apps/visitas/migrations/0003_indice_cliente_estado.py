@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0002_indices_visitas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['cliente', 'estado', 'fecha_programada', 'fecha_fin'], name='visitas_cliente_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0003_indice_cliente_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ejecucion',
+            name='id_local',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Id Local'),
+        ),
+        migrations.AddConstraint(
+            model_name='ejecucion',
+            constraint=models.UniqueConstraint(condition=models.Q(('id_local', ''), _negated=True), fields=('visita', 'id_local'), name='ejecuciones_visita_id_local_uniq'),
+        ),
+    ]
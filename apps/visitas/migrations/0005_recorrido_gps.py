@@ -0,0 +1,34 @@
+# Generated by Django 3.2.4 on 2026-10-17 07:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0004_ejecuciones_id_local'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoRecorrido',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(verbose_name='Fecha del Punto')),
+                ('latitud_e6', models.IntegerField(verbose_name='Latitud (microgrados)')),
+                ('longitud_e6', models.IntegerField(verbose_name='Longitud (microgrados)')),
+                ('precision', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Precisión (metros)')),
+                ('visita', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recorrido', to='visitas.visita', verbose_name='Visita')),
+            ],
+            options={
+                'verbose_name': 'Punto de Recorrido',
+                'verbose_name_plural': 'Puntos de Recorrido',
+                'db_table': 'puntos_recorrido',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='puntorecorrido',
+            constraint=models.UniqueConstraint(fields=('visita', 'fecha'), name='puntos_recorrido_visita_fecha_uniq'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.4 on 2026-10-17 08:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0005_recorrido_gps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cambio',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entidad', models.CharField(choices=[('visita', 'Visita'), ('ejecucion', 'Ejecución'), ('cliente', 'Cliente')], max_length=10, verbose_name='Entidad')),
+                ('objeto_id', models.BigIntegerField(verbose_name='Id del Objeto')),
+                ('operacion', models.CharField(choices=[('guardado', 'Creado o actualizado'), ('eliminado', 'Eliminado')], max_length=10, verbose_name='Operación')),
+                ('tecnico_id', models.BigIntegerField(blank=True, null=True, verbose_name='Id del Técnico')),
+                ('supervisor_id', models.BigIntegerField(blank=True, null=True, verbose_name='Id del Supervisor')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha del Cambio')),
+            ],
+            options={
+                'verbose_name': 'Cambio',
+                'verbose_name_plural': 'Cambios',
+                'db_table': 'cambios',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['tecnico_id', 'id'], name='cambios_tecnico_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['supervisor_id', 'id'], name='cambios_supervisor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['entidad', 'id'], name='cambios_entidad_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.4 on 2026-10-17 08:58
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.utils.timezone
+
+
+def marcar_purga_previa(apps, schema_editor):
+    # Antes de esta migración la purga se deducía del menor id conservado:
+    # se conserva ese criterio una sola vez para los cursores ya emitidos
+    Cambio = apps.get_model('visitas', 'Cambio')
+    PurgaCambios = apps.get_model('visitas', 'PurgaCambios')
+    primero = Cambio.objects.aggregate(primero=Min('id'))['primero']
+    PurgaCambios.objects.create(id=1, hasta_id=primero - 1 if primero else 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitas', '0006_feed_cambios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgaCambios',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('hasta_id', models.BigIntegerField(default=0, verbose_name='Último Id Purgado')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de la Purga')),
+            ],
+            options={
+                'verbose_name': 'Purga de Cambios',
+                'verbose_name_plural': 'Purgas de Cambios',
+                'db_table': 'cambios_purga',
+            },
+        ),
+        migrations.RunPython(marcar_purga_previa, migrations.RunPython.noop),
+    ]
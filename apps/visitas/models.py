@@ -2,7 +2,7 @@
 SKYNET - Modelos del módulo de visitas
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from apps.utils.models import TimestampedModel
@@ -10,6 +10,24 @@ from apps.clientes.models import Cliente
 from apps.usuarios.models import Usuario
 
 
+# Estados en los que una visita ocupa la agenda del técnico
+ESTADOS_ACTIVOS = ['PROGRAMADA', 'EN_PROGRESO']
+
+
+class TransicionConflicto(Exception):
+    """
+    Otra request cambió el estado de la visita entre la lectura y la
+    transición (p. ej. dos dispositivos completándola a la vez)
+    """
+
+    def __init__(self, estado_esperado, estado_actual):
+        self.estado_esperado = estado_esperado
+        self.estado_actual = estado_actual
+        super().__init__(
+            f"La visita cambió de estado ({estado_esperado} -> {estado_actual}) "
+            "antes de aplicar la operación.")
+
+
 class Visita(TimestampedModel):
     """
     Modelo de Visita según la especificación del frontend
@@ -110,6 +128,44 @@ class Visita(TimestampedModel):
         verbose_name_plural = "Visitas"
         db_table = "visitas"
         ordering = ['-fecha_programada']
+        indexes = [
+            # Listado general: ORDER BY fecha_programada DESC, id
+            models.Index(
+                fields=['-fecha_programada', 'id'],
+                name='visitas_fecha_idx'
+            ),
+            # Agenda del técnico y alcance del supervisor
+            models.Index(
+                fields=['tecnico', '-fecha_programada', 'id'],
+                name='visitas_tecnico_fecha_idx'
+            ),
+            models.Index(
+                fields=['supervisor', '-fecha_programada', 'id'],
+                name='visitas_supervisor_fecha_idx'
+            ),
+            # Filtro por estado
+            models.Index(
+                fields=['estado', '-fecha_programada', 'id'],
+                name='visitas_estado_fecha_idx'
+            ),
+            # Visitas activas (conflictos de agenda, tableros de supervisión)
+            models.Index(
+                fields=['tecnico', 'fecha_programada'],
+                name='visitas_tecnico_activas_idx',
+                condition=models.Q(estado__in=ESTADOS_ACTIVOS)
+            ),
+            models.Index(
+                fields=['supervisor', 'fecha_programada'],
+                name='visitas_sup_activas_idx',
+                condition=models.Q(estado__in=ESTADOS_ACTIVOS)
+            ),
+            # Estadísticas por cliente (conteos por estado, última y próxima
+            # visita). fecha_fin al final lo hace cubriente: sin leer la tabla
+            models.Index(
+                fields=['cliente', 'estado', 'fecha_programada', 'fecha_fin'],
+                name='visitas_cliente_estado_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Visita {self.id} - {self.cliente.nombre} ({self.estado})"
@@ -144,7 +200,20 @@ class Visita(TimestampedModel):
 
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        # post_save (feed de cambios) en la misma transacción que la fila
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Recuerda el técnico y el supervisor con que se leyó la fila: si se
+        reasigna, el feed de cambios retira la visita a los anteriores.
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'tecnico_id' in instance.__dict__ and 'supervisor_id' in instance.__dict__:
+            instance._alcance_previo = (instance.tecnico_id, instance.supervisor_id)
+        return instance
 
     # Propiedades de estado
     @property
@@ -177,37 +246,89 @@ class Visita(TimestampedModel):
         return self.latitud is not None and self.longitud is not None
 
     # Métodos de workflow
-    def iniciar(self, usuario=None):
-        """Iniciar una visita programada"""
-        if self.estado != self.EstadoVisitaChoices.PROGRAMADA:
-            raise ValidationError(
-                "Solo se pueden iniciar visitas programadas.")
-
-        self.estado = self.EstadoVisitaChoices.EN_PROGRESO
-        self.fecha_inicio = timezone.now()
-        self.save()
-
-    def completar(self, observaciones=None):
-        """Completar una visita en progreso"""
-        if self.estado != self.EstadoVisitaChoices.EN_PROGRESO:
-            raise ValidationError(
-                "Solo se pueden completar visitas en progreso.")
-
-        self.estado = self.EstadoVisitaChoices.COMPLETADA
-        self.fecha_fin = timezone.now()
+    def _transicionar(self, origenes, destino, mensaje, **cambios):
+        """
+        Aplica una transición con un único
+        ``UPDATE ... WHERE id = ? AND estado = <estado leído>`` que solo
+        escribe las columnas que cambian (sin save() ni clean()), junto
+        con el INSERT del feed de cambios en la misma transacción.
+        Si otra request cambió el estado antes, no escribe nada y lanza
+        TransicionConflicto (Visita.DoesNotExist si la visita ya no existe).
+        """
+        if self.estado not in origenes:
+            raise ValidationError(mensaje)
+
+        # update() no aplica auto_now: la fecha se asigna explícitamente
+        estado_anterior = self.estado
+        cambios['estado'] = destino
+        cambios['fecha_actualizacion'] = timezone.now()
+        # update() no envía señales: el feed de cambios (en la misma
+        # transacción) y los eventos del stream de supervisores se
+        # alimentan aquí
+        from .cambios import registrar_visitas
+        from .eventos import publicar_transicion
+        with transaction.atomic(savepoint=False):
+            actualizadas = Visita.objects.filter(
+                pk=self.pk, estado=self.estado).update(**cambios)
+            if actualizadas:
+                for campo, valor in cambios.items():
+                    setattr(self, campo, valor)
+                registrar_visitas([self])
+                publicar_transicion(self, estado_anterior)
+        if not actualizadas:
+            estado_actual = Visita.objects.filter(
+                pk=self.pk).values_list('estado', flat=True).first()
+            if estado_actual is None:
+                raise Visita.DoesNotExist('La visita no existe.')
+            raise TransicionConflicto(self.estado, estado_actual)
+
+    @staticmethod
+    def _cambios_opcionales(latitud=None, longitud=None, observaciones=None):
+        cambios = {}
+        if latitud is not None and longitud is not None:
+            cambios['latitud'] = latitud
+            cambios['longitud'] = longitud
         if observaciones:
-            self.observaciones = observaciones
-        self.save()
+            cambios['observaciones'] = observaciones
+        return cambios
+
+    def iniciar(self, usuario=None, latitud=None, longitud=None, observaciones=None,
+                fecha=None):
+        """
+        Iniciar una visita programada (opcionalmente con coordenadas).
+        ``fecha`` permite registrar la hora real de inicio (sincronización offline).
+        """
+        self._transicionar(
+            [self.EstadoVisitaChoices.PROGRAMADA],
+            self.EstadoVisitaChoices.EN_PROGRESO,
+            "Solo se pueden iniciar visitas programadas.",
+            fecha_inicio=fecha or timezone.now(),
+            **self._cambios_opcionales(latitud, longitud, observaciones))
+
+    def completar(self, observaciones=None, latitud=None, longitud=None, fecha=None):
+        """Completar una visita en progreso (opcionalmente con coordenadas finales)"""
+        fecha_fin = fecha or timezone.now()
+        if self.fecha_inicio and fecha_fin < self.fecha_inicio:
+            raise ValidationError(
+                "La fecha de fin no puede ser anterior a la fecha de inicio.")
+        self._transicionar(
+            [self.EstadoVisitaChoices.EN_PROGRESO],
+            self.EstadoVisitaChoices.COMPLETADA,
+            "Solo se pueden completar visitas en progreso.",
+            fecha_fin=fecha_fin,
+            **self._cambios_opcionales(latitud, longitud, observaciones))
 
     def cancelar(self, motivo=None):
         """Cancelar una visita"""
-        if self.estado in [self.EstadoVisitaChoices.COMPLETADA]:
-            raise ValidationError("No se pueden cancelar visitas completadas.")
-
-        self.estado = self.EstadoVisitaChoices.CANCELADA
+        cambios = {}
         if motivo:
-            self.observaciones = f"CANCELADA: {motivo}"
-        self.save()
+            cambios['observaciones'] = f"CANCELADA: {motivo}"
+        self._transicionar(
+            [estado for estado in self.EstadoVisitaChoices.values
+             if estado != self.EstadoVisitaChoices.COMPLETADA],
+            self.EstadoVisitaChoices.CANCELADA,
+            "No se pueden cancelar visitas completadas.",
+            **cambios)
 
 
 class Ejecucion(TimestampedModel):
@@ -245,12 +366,33 @@ class Ejecucion(TimestampedModel):
         blank=True,
         verbose_name="URL de Evidencia Fotográfica"
     )
+    # Id generado por la app móvil al crearla sin conexión: un reenvío de
+    # la misma operación devuelve la ejecución existente en lugar de duplicarla
+    id_local = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name="Id Local"
+    )
 
     class Meta:
         verbose_name = "Ejecución"
         verbose_name_plural = "Ejecuciones"
         db_table = "ejecuciones"
         ordering = ['tiempo_inicio']
+        indexes = [
+            models.Index(
+                fields=['visita', 'tiempo_inicio'],
+                name='ejecuciones_visita_tiempo_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['visita', 'id_local'],
+                condition=~models.Q(id_local=''),
+                name='ejecuciones_visita_id_local_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"Ejecución {self.id} - Visita {self.visita.id}"
@@ -274,7 +416,9 @@ class Ejecucion(TimestampedModel):
 
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        # post_save (feed de cambios) en la misma transacción que la fila
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
     @property
     def duracion_minutos(self):
@@ -291,3 +435,158 @@ class Ejecucion(TimestampedModel):
         if observaciones:
             self.observaciones = observaciones
         self.save()
+
+
+class PuntoRecorrido(models.Model):
+    """
+    Posición GPS reportada por la app durante una visita. Tabla angosta de
+    solo inserción: coordenadas en microgrados (enteros) y sin timestamps
+    de auditoría; se escribe por lotes con bulk_create.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    visita = models.ForeignKey(
+        Visita,
+        on_delete=models.CASCADE,
+        related_name='recorrido',
+        db_index=False,
+        verbose_name="Visita"
+    )
+    fecha = models.DateTimeField(
+        verbose_name="Fecha del Punto"
+    )
+    latitud_e6 = models.IntegerField(
+        verbose_name="Latitud (microgrados)"
+    )
+    longitud_e6 = models.IntegerField(
+        verbose_name="Longitud (microgrados)"
+    )
+    precision = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Precisión (metros)"
+    )
+
+    class Meta:
+        verbose_name = "Punto de Recorrido"
+        verbose_name_plural = "Puntos de Recorrido"
+        db_table = "puntos_recorrido"
+        constraints = [
+            # También es el índice de lectura del recorrido (visita, fecha);
+            # un lote reenviado no duplica puntos
+            models.UniqueConstraint(
+                fields=['visita', 'fecha'],
+                name='puntos_recorrido_visita_fecha_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Punto {self.id} - Visita {self.visita_id}"
+
+    @property
+    def latitud(self):
+        return self.latitud_e6 / 1e6
+
+    @property
+    def longitud(self):
+        return self.longitud_e6 / 1e6
+
+
+class Cambio(models.Model):
+    """
+    Registro de cambios de visitas, ejecuciones y clientes para la
+    sincronización incremental (``?since=``). El id es la secuencia
+    monótona que usan los clientes como cursor; las eliminaciones quedan
+    como lápidas. ``tecnico_id``/``supervisor_id`` copian la asignación de
+    la visita para filtrar por rol sin joins (NULL en clientes, visibles
+    para todos).
+    """
+
+    class EntidadChoices(models.TextChoices):
+        VISITA = 'visita', 'Visita'
+        EJECUCION = 'ejecucion', 'Ejecución'
+        CLIENTE = 'cliente', 'Cliente'
+
+    class OperacionChoices(models.TextChoices):
+        GUARDADO = 'guardado', 'Creado o actualizado'
+        ELIMINADO = 'eliminado', 'Eliminado'
+
+    id = models.BigAutoField(primary_key=True)
+    entidad = models.CharField(
+        max_length=10,
+        choices=EntidadChoices.choices,
+        verbose_name="Entidad"
+    )
+    objeto_id = models.BigIntegerField(
+        verbose_name="Id del Objeto"
+    )
+    operacion = models.CharField(
+        max_length=10,
+        choices=OperacionChoices.choices,
+        verbose_name="Operación"
+    )
+    # Sin FK: el registro sobrevive a la eliminación de los usuarios
+    tecnico_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Id del Técnico"
+    )
+    supervisor_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Id del Supervisor"
+    )
+    fecha = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Fecha del Cambio"
+    )
+
+    class Meta:
+        verbose_name = "Cambio"
+        verbose_name_plural = "Cambios"
+        db_table = "cambios"
+        indexes = [
+            # Feed de cada rol: WHERE <alcance> AND id > cursor ORDER BY id
+            models.Index(
+                fields=['tecnico_id', 'id'],
+                name='cambios_tecnico_idx'
+            ),
+            models.Index(
+                fields=['supervisor_id', 'id'],
+                name='cambios_supervisor_idx'
+            ),
+            models.Index(
+                fields=['entidad', 'id'],
+                name='cambios_entidad_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Cambio {self.id} - {self.entidad} {self.objeto_id} ({self.operacion})"
+
+
+class PurgaCambios(models.Model):
+    """
+    Marca de purga del feed de cambios (una sola fila): el mayor id
+    eliminado por purgar_cambios. Un cursor anterior a esta marca expiró.
+    Se registra explícitamente en lugar de deducirla del menor id
+    conservado: un hueco en la secuencia no es una purga.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    hasta_id = models.BigIntegerField(
+        default=0,
+        verbose_name="Último Id Purgado"
+    )
+    fecha = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Fecha de la Purga"
+    )
+
+    class Meta:
+        verbose_name = "Purga de Cambios"
+        verbose_name_plural = "Purgas de Cambios"
+        db_table = "cambios_purga"
+
+    def __str__(self):
+        return f"Cambios purgados hasta {self.hasta_id}"
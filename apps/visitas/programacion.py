@@ -0,0 +1,182 @@
+"""
+SKYNET - Programación de visitas en lote
+Valida referencias y conflictos de agenda para todo el lote con un número
+fijo de queries e inserta con bulk_create en una sola transacción.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.clientes.models import Cliente
+from apps.usuarios.models import Usuario
+from apps.utils.fechas import rango_fechas
+from .cambios import registrar_visitas
+from .models import ESTADOS_ACTIVOS, Visita
+from .serializers import VisitaLoteItemSerializer
+
+# Límite de visitas por solicitud
+MAX_VISITAS_POR_LOTE = 500
+
+
+def _agregar_error(errores, indice, campo, mensaje):
+    errores.setdefault(indice, {}).setdefault(campo, []).append(mensaje)
+
+
+def validar_lote(items):
+    """
+    Valida un lote de visitas.
+
+    Retorna (validas, errores): ``validas`` es una lista de (indice, datos)
+    lista para insertar y ``errores`` un dict indice -> {campo: [mensajes]}.
+    Queries: usuarios, clientes y conflictos existentes (una de cada una).
+    Dentro de una transacción las filas de los usuarios quedan bloqueadas
+    (SELECT ... FOR UPDATE) hasta el commit: dos lotes con el mismo técnico
+    no pueden validar la misma agenda a la vez.
+    """
+    errores = {}
+    candidatas = []
+
+    # 1. Formato de cada elemento (sin tocar la base de datos)
+    for indice, item in enumerate(items):
+        serializer = VisitaLoteItemSerializer(data=item)
+        if serializer.is_valid():
+            candidatas.append((indice, serializer.validated_data))
+        else:
+            errores[indice] = serializer.errors
+
+    # 2. Referencias: una query para usuarios y otra para clientes
+    usuario_ids = set()
+    cliente_ids = set()
+    for _, datos in candidatas:
+        usuario_ids.add(datos['tecnico'])
+        if datos.get('supervisor'):
+            usuario_ids.add(datos['supervisor'])
+        cliente_ids.add(datos['cliente'])
+
+    usuarios = Usuario.objects.select_for_update().only(
+        'id', 'rol', 'activo').in_bulk(usuario_ids)
+    clientes = Cliente.objects.only('id', 'activo').in_bulk(cliente_ids)
+
+    referenciadas = []
+    for indice, datos in candidatas:
+        tecnico = usuarios.get(datos['tecnico'])
+        if tecnico is None:
+            _agregar_error(errores, indice, 'tecnico', 'El técnico no existe.')
+        elif not tecnico.es_tecnico:
+            _agregar_error(errores, indice, 'tecnico',
+                           'Solo se pueden asignar usuarios con rol TECNICO.')
+        elif not tecnico.activo:
+            _agregar_error(errores, indice, 'tecnico',
+                           'No se puede asignar un técnico inactivo.')
+
+        supervisor_id = datos.get('supervisor')
+        if supervisor_id:
+            supervisor = usuarios.get(supervisor_id)
+            if supervisor is None:
+                _agregar_error(errores, indice, 'supervisor',
+                               'El supervisor no existe.')
+            elif not supervisor.es_supervisor:
+                _agregar_error(errores, indice, 'supervisor',
+                               'Solo se pueden asignar usuarios con rol SUPERVISOR.')
+            elif not supervisor.activo:
+                _agregar_error(errores, indice, 'supervisor',
+                               'No se puede asignar un supervisor inactivo.')
+
+        cliente = clientes.get(datos['cliente'])
+        if cliente is None:
+            _agregar_error(errores, indice, 'cliente', 'El cliente no existe.')
+        elif not cliente.activo:
+            _agregar_error(errores, indice, 'cliente',
+                           'No se pueden crear visitas para clientes inactivos.')
+
+        if indice not in errores:
+            referenciadas.append((indice, datos))
+
+    # 3. Conflictos de agenda (mismo técnico, mismo día local) en una pasada
+    ocupados = set()
+    if referenciadas:
+        dias = [timezone.localdate(d['fecha_programada']) for _, d in referenciadas]
+        inicio, fin = rango_fechas(min(dias), max(dias))
+        existentes = Visita.objects.filter(
+            tecnico_id__in={d['tecnico'] for _, d in referenciadas},
+            estado__in=ESTADOS_ACTIVOS,
+            fecha_programada__gte=inicio,
+            fecha_programada__lt=fin
+        ).values_list('tecnico_id', 'fecha_programada')
+        ocupados = {
+            (tecnico_id, timezone.localdate(fecha))
+            for tecnico_id, fecha in existentes
+        }
+
+    validas = []
+    for indice, datos in referenciadas:
+        dia = timezone.localdate(datos['fecha_programada'])
+        clave = (datos['tecnico'], dia)
+        if clave in ocupados:
+            _agregar_error(errores, indice, 'tecnico',
+                           f'El técnico ya tiene visitas programadas para {dia}.')
+            continue
+        # Las visitas del mismo lote también ocupan la agenda
+        ocupados.add(clave)
+        validas.append((indice, datos))
+
+    return validas, errores
+
+
+def _asignar_ids(visitas):
+    """
+    Ids de las visitas recién insertadas cuando el motor no los retorna
+    en bulk_create (SQLite). Un técnico tiene a lo sumo una visita activa
+    por día, así que (técnico, fecha programada) identifica cada una.
+    """
+    ids = {
+        (tecnico_id, fecha): pk
+        for pk, tecnico_id, fecha in Visita.objects.filter(
+            tecnico_id__in={v.tecnico_id for v in visitas},
+            fecha_programada__in={v.fecha_programada for v in visitas},
+            estado=Visita.EstadoVisitaChoices.PROGRAMADA
+        ).values_list('id', 'tecnico_id', 'fecha_programada')
+    }
+    for visita in visitas:
+        visita.pk = ids.get((visita.tecnico_id, visita.fecha_programada))
+        visita._state.adding = False
+
+
+def crear_visitas_en_lote(items, permitir_parcial=False):
+    """
+    Valida e inserta un lote de visitas.
+
+    Si ``permitir_parcial`` es False y algún elemento tiene errores no se
+    inserta ninguna visita. Retorna (visitas_creadas, errores), donde
+    ``visitas_creadas`` es una lista de (indice, visita).
+    """
+    # Validación e INSERT en la misma transacción: los conflictos de agenda
+    # se verifican con los técnicos bloqueados
+    with transaction.atomic():
+        validas, errores = validar_lote(items)
+        if not validas or (errores and not permitir_parcial):
+            return [], errores
+
+        visitas = [
+            Visita(
+                cliente_id=datos['cliente'],
+                tecnico_id=datos['tecnico'],
+                supervisor_id=datos.get('supervisor'),
+                fecha_programada=datos['fecha_programada'],
+                tipo_visita=datos['tipo_visita'],
+                descripcion=datos['descripcion'],
+                observaciones=datos.get('observaciones', ''),
+                latitud=datos.get('latitud'),
+                longitud=datos.get('longitud'),
+            )
+            for _, datos in validas
+        ]
+
+        # bulk_create no llama a save()/clean() ni envía señales: las mismas
+        # reglas ya se validaron y el feed de cambios se registra aquí
+        Visita.objects.bulk_create(visitas, batch_size=200)
+        if any(visita.pk is None for visita in visitas):
+            _asignar_ids(visitas)
+        registrar_visitas(visitas)
+
+    return [(indice, visita) for (indice, _), visita in zip(validas, visitas)], errores
@@ -0,0 +1,225 @@
+"""
+SKYNET - Recorrido GPS de las visitas
+La app móvil envía por lotes las posiciones registradas mientras la visita
+está en curso. Los puntos se validan sin serializers por punto y se
+insertan con un solo bulk_create (sin señales ni save() por fila); el
+recorrido se lee con una query sobre el índice (visita, fecha) y se
+simplifica antes de responder.
+"""
+
+import math
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import PuntoRecorrido, Visita
+
+# Límite de puntos por solicitud de ingesta
+MAX_PUNTOS_LOTE = 2000
+
+# Filas por INSERT
+TAMANO_INSERT = 500
+
+# Simplificación por defecto del recorrido
+TOLERANCIA_METROS = 10.0
+MAX_PUNTOS_RECORRIDO = 500
+
+# Visitas que aceptan puntos (COMPLETADA: lotes enviados al recuperar señal)
+ESTADOS_RECORRIDO = {
+    Visita.EstadoVisitaChoices.EN_PROGRESO,
+    Visita.EstadoVisitaChoices.COMPLETADA,
+}
+
+# Tolerancia del reloj del dispositivo
+MARGEN_FUTURO = timedelta(minutes=5)
+
+METROS_POR_GRADO = 111320.0
+
+
+class PuntoInvalido(Exception):
+    pass
+
+
+def _coordenada(valor, limite, campo):
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise PuntoInvalido(f'{campo} debe ser numérica.')
+    try:
+        valor = float(valor)
+    except ValueError:
+        raise PuntoInvalido(f'{campo} debe ser numérica.')
+    if not -limite <= valor <= limite:
+        raise PuntoInvalido(f'{campo} fuera de rango (±{limite}).')
+    return int(round(valor * 1e6))
+
+
+def _fecha(valor, limite):
+    try:
+        fecha = parse_datetime(valor) if isinstance(valor, str) else None
+    except ValueError:
+        # Bien formada pero inexistente (p. ej. 2024-02-30)
+        fecha = None
+    if fecha is None:
+        raise PuntoInvalido('fecha debe ser un datetime ISO 8601.')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    if fecha > limite:
+        raise PuntoInvalido('fecha no puede ser futura.')
+    return fecha
+
+
+def _precision(valor):
+    if valor is None:
+        return None
+    if (isinstance(valor, bool) or not isinstance(valor, (int, float))
+            or not math.isfinite(valor) or valor < 0):
+        raise PuntoInvalido('precision debe ser un número positivo (metros).')
+    return min(int(round(valor)), 32767)
+
+
+def parsear_punto(punto, limite):
+    """(visita_id, fecha, latitud_e6, longitud_e6, precision) de un punto"""
+    if not isinstance(punto, dict):
+        raise PuntoInvalido('Cada punto debe ser un objeto.')
+    visita_id = punto.get('visita')
+    if isinstance(visita_id, bool) or not isinstance(visita_id, int):
+        raise PuntoInvalido('visita debe ser el id de la visita.')
+    return (
+        visita_id,
+        _fecha(punto.get('fecha'), limite),
+        _coordenada(punto.get('latitud'), 90, 'latitud'),
+        _coordenada(punto.get('longitud'), 180, 'longitud'),
+        _precision(punto.get('precision')),
+    )
+
+
+def registrar_puntos(usuario, puntos):
+    """
+    Inserta los puntos válidos de visitas en curso (o recién completadas)
+    asignadas a ``usuario``. Retorna (aceptados, rechazados); cada rechazo
+    es {'indice', 'error'}. Los puntos ya registrados (misma visita y
+    fecha) se ignoran, así que reenviar un lote es seguro.
+    """
+    limite = timezone.now() + MARGEN_FUTURO
+    validos = []
+    rechazados = []
+    for indice, punto in enumerate(puntos):
+        try:
+            validos.append((indice, parsear_punto(punto, limite)))
+        except PuntoInvalido as e:
+            rechazados.append({'indice': indice, 'error': str(e)})
+
+    # Una query para autorizar todas las visitas del lote
+    visitas = {}
+    if validos:
+        visitas = {
+            visita_id: (tecnico_id, estado)
+            for visita_id, tecnico_id, estado in Visita.objects.filter(
+                pk__in={fila[0] for _, fila in validos}
+            ).values_list('id', 'tecnico_id', 'estado')
+        }
+
+    nuevos = []
+    for indice, (visita_id, fecha, latitud_e6, longitud_e6, precision) in validos:
+        visita = visitas.get(visita_id)
+        if visita is None:
+            rechazados.append({'indice': indice, 'error': 'La visita no existe.'})
+        elif visita[0] != usuario.id:
+            rechazados.append({'indice': indice, 'error': 'La visita no está asignada al técnico.'})
+        elif visita[1] not in ESTADOS_RECORRIDO:
+            rechazados.append({'indice': indice, 'error': 'La visita no está en progreso.'})
+        else:
+            nuevos.append(PuntoRecorrido(
+                visita_id=visita_id, fecha=fecha, latitud_e6=latitud_e6,
+                longitud_e6=longitud_e6, precision=precision))
+
+    if nuevos:
+        PuntoRecorrido.objects.bulk_create(
+            nuevos, batch_size=TAMANO_INSERT, ignore_conflicts=True)
+
+    rechazados.sort(key=lambda r: r['indice'])
+    return len(nuevos), rechazados
+
+
+def simplificar(puntos, tolerancia_m=TOLERANCIA_METROS, max_puntos=MAX_PUNTOS_RECORRIDO):
+    """
+    Reduce un recorrido ordenado [(fecha, lat_e6, lng_e6, precision), ...]
+    con Ramer-Douglas-Peucker: se descartan los puntos a menos de
+    ``tolerancia_m`` metros del segmento que los une, conservando los
+    extremos y los giros (con tolerancia 0 no se descarta ninguno). Si aún
+    quedan más de ``max_puntos`` se muestrea uniformemente (siempre con el
+    primero y el último).
+    """
+    if len(puntos) <= 2:
+        return list(puntos)
+
+    resultado = _douglas_peucker(puntos, tolerancia_m) if tolerancia_m > 0 else list(puntos)
+    if max_puntos and len(resultado) > max_puntos:
+        paso = (len(resultado) - 1) / (max(max_puntos, 2) - 1)
+        resultado = [resultado[round(i * paso)] for i in range(max(max_puntos, 2))]
+    return resultado
+
+
+def _douglas_peucker(puntos, tolerancia_m):
+    """Puntos conservados por Ramer-Douglas-Peucker (iterativo, sin recursión)"""
+    total = len(puntos)
+    # Proyección equirectangular local en metros (suficiente para una visita)
+    lat0 = math.radians(puntos[0][1] / 1e6)
+    escala_x = METROS_POR_GRADO * math.cos(lat0) / 1e6
+    escala_y = METROS_POR_GRADO / 1e6
+    xs = [p[2] * escala_x for p in puntos]
+    ys = [p[1] * escala_y for p in puntos]
+
+    conservar = [False] * total
+    conservar[0] = conservar[-1] = True
+    tolerancia2 = tolerancia_m * tolerancia_m
+    pendientes = [(0, total - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        ax, ay = xs[inicio], ys[inicio]
+        dx, dy = xs[fin] - ax, ys[fin] - ay
+        largo2 = dx * dx + dy * dy
+        maxima, indice = -1.0, -1
+        for i in range(inicio + 1, fin):
+            px, py = xs[i] - ax, ys[i] - ay
+            if largo2:
+                # Distancia al segmento (no a la recta): el técnico puede
+                # volver sobre sus pasos
+                t = min(1.0, max(0.0, (px * dx + py * dy) / largo2))
+                px, py = px - t * dx, py - t * dy
+            distancia2 = px * px + py * py
+            if distancia2 > maxima:
+                maxima, indice = distancia2, i
+        if maxima > tolerancia2:
+            conservar[indice] = True
+            pendientes.append((inicio, indice))
+            pendientes.append((indice, fin))
+
+    return [p for p, conservado in zip(puntos, conservar) if conservado]
+
+
+def obtener_recorrido(visita, desde=None, hasta=None,
+                      tolerancia_m=TOLERANCIA_METROS, max_puntos=MAX_PUNTOS_RECORRIDO):
+    """Recorrido simplificado de una visita, listo para serializar"""
+    queryset = PuntoRecorrido.objects.filter(visita=visita)
+    if desde is not None:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta is not None:
+        queryset = queryset.filter(fecha__lte=hasta)
+    puntos = list(queryset.order_by('fecha').values_list(
+        'fecha', 'latitud_e6', 'longitud_e6', 'precision'))
+
+    return {
+        'visitaId': visita.pk,
+        'totalPuntos': len(puntos),
+        'puntos': [
+            {
+                'fecha': fecha.isoformat(),
+                'latitud': latitud_e6 / 1e6,
+                'longitud': longitud_e6 / 1e6,
+                'precision': precision,
+            }
+            for fecha, latitud_e6, longitud_e6, precision
+            in simplificar(puntos, tolerancia_m, max_puntos)
+        ],
+    }
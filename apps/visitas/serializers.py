@@ -3,10 +3,27 @@ SKYNET - Serializers del módulo de visitas
 """
 
 from rest_framework import serializers
+from django.db.models import CharField, Case, Prefetch, Value, When
+from django.db.models.functions import Concat
 from django.utils import timezone
-from .models import Visita, Ejecucion
+from .models import ESTADOS_ACTIVOS, Visita, Ejecucion
 from apps.clientes.serializers import ClienteSerializer
 from apps.usuarios.serializers import UsuarioSerializer
+from apps.utils.fechas import filtrar_rango_fechas
+from apps.utils.projection import Proyeccion
+from apps.utils.serializers import SharedRepresentationMixin
+
+
+class ClienteAnidadoSerializer(SharedRepresentationMixin, ClienteSerializer):
+    """
+    Cliente anidado en visitas: se serializa una vez por respuesta
+    """
+
+
+class UsuarioAnidadoSerializer(SharedRepresentationMixin, UsuarioSerializer):
+    """
+    Técnico/supervisor anidado en visitas: se serializa una vez por respuesta
+    """
 
 
 class EjecucionSerializer(serializers.ModelSerializer):
@@ -64,9 +81,9 @@ class VisitaSerializer(serializers.ModelSerializer):
         source='fecha_actualizacion', read_only=True)
 
     # Relaciones anidadas (opcional)
-    cliente = ClienteSerializer(read_only=True)
-    tecnico = UsuarioSerializer(read_only=True)
-    supervisor = UsuarioSerializer(read_only=True)
+    cliente = ClienteAnidadoSerializer(read_only=True)
+    tecnico = UsuarioAnidadoSerializer(read_only=True)
+    supervisor = UsuarioAnidadoSerializer(read_only=True)
     ejecuciones = EjecucionSerializer(many=True, read_only=True)
 
     class Meta:
@@ -94,6 +111,104 @@ class VisitaSerializer(serializers.ModelSerializer):
             'ejecuciones'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Carga las relaciones anidadas con un número fijo de queries:
+        un JOIN para cliente/técnico/supervisor y un prefetch para ejecuciones
+        """
+        return queryset.select_related(
+            'cliente', 'tecnico', 'supervisor'
+        ).prefetch_related(
+            # Mismo orden que el índice (visita_id, tiempo_inicio): sin sort extra
+            Prefetch(
+                'ejecuciones',
+                queryset=Ejecucion.objects.order_by('visita_id', 'tiempo_inicio')
+            )
+        )
+
+
+_fecha = serializers.DateTimeField().to_representation
+_latitud = serializers.DecimalField(
+    max_digits=10, decimal_places=8).to_representation
+_longitud = serializers.DecimalField(
+    max_digits=11, decimal_places=8).to_representation
+
+# Proyección compacta del listado de visitas (mismas claves que VisitaSerializer
+# más nombres planos de cliente/técnico/supervisor en lugar de objetos anidados)
+VISITA_PROYECCION = Proyeccion(
+    campos={
+        'idVisita': 'id',
+        'clienteId': 'cliente_id',
+        'tecnicoId': 'tecnico_id',
+        'supervisorId': 'supervisor_id',
+        'fechaProgramada': 'fecha_programada',
+        'fechaInicio': 'fecha_inicio',
+        'fechaFin': 'fecha_fin',
+        'estado': 'estado',
+        'tipoVisita': 'tipo_visita',
+        'descripcion': 'descripcion',
+        'observaciones': 'observaciones',
+        'latitud': 'latitud',
+        'longitud': 'longitud',
+        'fechaCreacion': 'fecha_creacion',
+        'fechaActualizacion': 'fecha_actualizacion',
+        'clienteNombre': 'cliente__nombre',
+        'tecnicoNombre': Concat(
+            'tecnico__nombre', Value(' '), 'tecnico__apellido'),
+        # Sin supervisor el Concat daría ' ': null igual que el serializer
+        'supervisorNombre': Case(
+            When(supervisor__isnull=True, then=Value(None)),
+            default=Concat('supervisor__nombre', Value(' '), 'supervisor__apellido'),
+            output_field=CharField()),
+    },
+    compactos=[
+        'idVisita',
+        'fechaProgramada',
+        'estado',
+        'tipoVisita',
+        'clienteNombre',
+        'tecnicoNombre',
+    ],
+    formatos={
+        'fechaProgramada': _fecha,
+        'fechaInicio': _fecha,
+        'fechaFin': _fecha,
+        'fechaCreacion': _fecha,
+        'fechaActualizacion': _fecha,
+        'latitud': _latitud,
+        'longitud': _longitud,
+    }
+)
+
+
+# Proyección de ejecuciones para exportaciones (mismas claves que EjecucionSerializer)
+EJECUCION_PROYECCION = Proyeccion(
+    campos={
+        'idEjecucion': 'id',
+        'visitaId': 'visita_id',
+        'descripcion': 'descripcion',
+        'tiempoInicio': 'tiempo_inicio',
+        'tiempoFin': 'tiempo_fin',
+        'completada': 'completada',
+        'observaciones': 'observaciones',
+        'evidenciaFoto': 'evidencia_foto',
+        'fechaCreacion': 'fecha_creacion',
+    },
+    compactos=[
+        'idEjecucion',
+        'visitaId',
+        'tiempoInicio',
+        'tiempoFin',
+        'completada',
+    ],
+    formatos={
+        'tiempoInicio': _fecha,
+        'tiempoFin': _fecha,
+        'fechaCreacion': _fecha,
+    }
+)
+
 
 class VisitaCreateSerializer(serializers.ModelSerializer):
     """
@@ -155,17 +270,21 @@ class VisitaCreateSerializer(serializers.ModelSerializer):
 
         # Validar que el técnico no tenga visitas simultáneas
         if tecnico and fecha_programada:
-            # Buscar visitas del técnico en la misma fecha/hora
-            conflictos = Visita.objects.filter(
-                tecnico=tecnico,
-                fecha_programada__date=fecha_programada.date(),
-                estado__in=[Visita.EstadoVisitaChoices.PROGRAMADA,
-                            Visita.EstadoVisitaChoices.EN_PROGRESO]
+            # Buscar visitas del técnico en el mismo día local
+            dia = timezone.localdate(fecha_programada)
+            conflictos = filtrar_rango_fechas(
+                Visita.objects.filter(
+                    tecnico=tecnico,
+                    estado__in=ESTADOS_ACTIVOS
+                ),
+                'fecha_programada',
+                desde=dia,
+                hasta=dia
             ).exclude(id=self.instance.id if self.instance else None)
 
             if conflictos.exists():
                 raise serializers.ValidationError({
-                    'tecnico': f'El técnico ya tiene visitas programadas para {fecha_programada.date()}.'
+                    'tecnico': f'El técnico ya tiene visitas programadas para {dia}.'
                 })
 
         # Validar coordenadas si se proporcionan
@@ -180,6 +299,46 @@ class VisitaCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class VisitaLoteItemSerializer(serializers.Serializer):
+    """
+    Serializer para cada visita de una programación en lote.
+    Solo valida formato: las referencias (cliente, técnico, supervisor) y los
+    conflictos de agenda se validan para todo el lote en apps.visitas.programacion
+    """
+    cliente = serializers.IntegerField()
+    tecnico = serializers.IntegerField()
+    supervisor = serializers.IntegerField(required=False, allow_null=True)
+    fecha_programada = serializers.DateTimeField()
+    tipo_visita = serializers.ChoiceField(
+        choices=Visita.TipoVisitaChoices.choices)
+    descripcion = serializers.CharField()
+    observaciones = serializers.CharField(
+        required=False, allow_blank=True, default='')
+    latitud = serializers.DecimalField(
+        max_digits=10, decimal_places=8, required=False, allow_null=True)
+    longitud = serializers.DecimalField(
+        max_digits=11, decimal_places=8, required=False, allow_null=True)
+
+    def validate_fecha_programada(self, value):
+        """Validar que la fecha programada sea futura"""
+        if value < timezone.now():
+            raise serializers.ValidationError(
+                "No se pueden programar visitas en fechas pasadas.")
+        return value
+
+    def validate(self, attrs):
+        """Validar coordenadas si se proporcionan"""
+        latitud = attrs.get('latitud')
+        longitud = attrs.get('longitud')
+
+        if (latitud is not None and longitud is None) or (latitud is None and longitud is not None):
+            raise serializers.ValidationError({
+                'coordenadas': 'Debe proporcionar tanto latitud como longitud, o ninguna.'
+            })
+
+        return attrs
+
+
 class VisitaUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer para actualización de Visita
@@ -317,3 +476,72 @@ class VisitaWorkflowSerializer(serializers.Serializer):
             })
 
         return attrs
+
+
+# ==============================================================================
+# SINCRONIZACIÓN OFFLINE
+# ==============================================================================
+
+class OperacionSyncSerializer(serializers.Serializer):
+    """
+    Formato de una operación de la cola offline de la app móvil.
+    Los ``datos`` se validan en apps.visitas.sincronizacion según el tipo.
+    """
+    TIPOS = [
+        ('iniciar', 'Iniciar visita'),
+        ('completar', 'Completar visita'),
+        ('cancelar', 'Cancelar visita'),
+        ('crear_ejecucion', 'Crear ejecución'),
+        ('actualizar_ejecucion', 'Actualizar ejecución'),
+    ]
+
+    id = serializers.CharField(max_length=64)
+    tipo = serializers.ChoiceField(choices=TIPOS)
+    visita = serializers.IntegerField()
+    ejecucion = serializers.IntegerField(required=False)
+    ejecucion_local = serializers.CharField(max_length=64, required=False)
+    datos = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        """La actualización de una ejecución indica su id del servidor o el local"""
+        if attrs['tipo'] == 'actualizar_ejecucion':
+            if ('ejecucion' in attrs) == ('ejecucion_local' in attrs):
+                raise serializers.ValidationError({
+                    'ejecucion': 'Debe indicar ejecucion o ejecucion_local.'
+                })
+        return attrs
+
+
+class VisitaSyncWorkflowSerializer(VisitaWorkflowSerializer):
+    """
+    Workflow desde la cola offline: admite la hora real de la operación
+    """
+    fecha = serializers.DateTimeField(required=False)
+
+    def validate_fecha(self, value):
+        if value > timezone.now():
+            raise serializers.ValidationError(
+                "La fecha de la operación no puede ser futura.")
+        return value
+
+
+class VisitaSyncCancelarSerializer(serializers.Serializer):
+    """Cancelación desde la cola offline"""
+    motivo = serializers.CharField()
+
+
+class EjecucionSyncCreateSerializer(EjecucionCreateSerializer):
+    """
+    Creación de ejecución desde la cola offline. La visita ya viene
+    cargada (no se consulta por operación) y ``id_local`` es obligatorio.
+    """
+    id_local = serializers.CharField(max_length=64)
+
+    class Meta(EjecucionCreateSerializer.Meta):
+        fields = [
+            'id_local',
+            'descripcion',
+            'tiempo_inicio',
+            'observaciones',
+            'evidencia_foto'
+        ]
@@ -0,0 +1,51 @@
+"""
+SKYNET - Señales del módulo de visitas
+Alimentan el feed de cambios (ver cambios.py) desde save() y delete().
+Los caminos sin señales (update() de las transiciones, bulk_create de la
+programación en lote e INSERT de la importación de clientes) registran
+sus cambios explícitamente.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.clientes.models import Cliente
+from .cambios import registrar_clientes, registrar_ejecucion, registrar_visitas
+from .models import Cambio, Ejecucion, Visita
+
+ELIMINADO = Cambio.OperacionChoices.ELIMINADO
+
+
+@receiver(post_save, sender=Visita)
+def registrar_visita_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_visitas([instance])
+
+
+@receiver(post_delete, sender=Visita)
+def registrar_visita_eliminada(sender, instance, **kwargs):
+    registrar_visitas([instance], ELIMINADO)
+
+
+@receiver(post_save, sender=Ejecucion)
+def registrar_ejecucion_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_ejecucion(instance)
+
+
+@receiver(pre_delete, sender=Ejecucion)
+def registrar_ejecucion_eliminada(sender, instance, **kwargs):
+    # pre_delete: en un borrado en cascada la visita aún existe para
+    # copiar su asignación
+    registrar_ejecucion(instance, ELIMINADO)
+
+
+@receiver(post_save, sender=Cliente)
+def registrar_cliente_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_clientes([instance.pk])
+
+
+@receiver(post_delete, sender=Cliente)
+def registrar_cliente_eliminado(sender, instance, **kwargs):
+    registrar_clientes([instance.pk], ELIMINADO)
@@ -0,0 +1,252 @@
+"""
+SKYNET - Sincronización offline de la app móvil de técnicos
+Recibe la cola de operaciones registradas sin conexión (iniciar,
+ejecuciones, completar, cancelar) y la aplica en orden. Todas las visitas
+y ejecuciones involucradas se cargan al inicio con dos queries; cada
+visita se procesa en su propia transacción (todo o nada por visita).
+
+Los reenvíos son idempotentes: una transición cuyo estado destino ya se
+alcanzó y una ejecución con el mismo ``id_local`` se reportan como
+``ya_aplicada`` sin escribir.
+"""
+
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import TransicionConflicto, Visita, Ejecucion
+from .serializers import (
+    EjecucionSyncCreateSerializer,
+    EjecucionUpdateSerializer,
+    OperacionSyncSerializer,
+    VisitaSyncCancelarSerializer,
+    VisitaSyncWorkflowSerializer,
+)
+
+# Límite de operaciones por solicitud
+MAX_OPERACIONES_SYNC = 500
+
+# Estado de cada operación en la respuesta
+APLICADA = 'aplicada'
+YA_APLICADA = 'ya_aplicada'
+ERROR = 'error'
+REVERTIDA = 'revertida'    # se aplicó, pero otra operación de la visita falló
+OMITIDA = 'omitida'        # no se intentó porque una anterior de la visita falló
+
+_Estado = Visita.EstadoVisitaChoices
+
+# Estados en los que la transición ya está aplicada (reenvío de la cola)
+YA_INICIADA = {_Estado.EN_PROGRESO, _Estado.COMPLETADA}
+
+
+class ErrorOperacion(Exception):
+    """Una operación no se puede aplicar; se revierte toda su visita"""
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(str(errores))
+
+
+def _validar(serializer):
+    if not serializer.is_valid():
+        raise ErrorOperacion(serializer.errors)
+    return serializer.validated_data
+
+
+def _resultado(indice, operacion, estado, errores=None, **extra):
+    resultado = {
+        'indice': indice,
+        'id': operacion.get('id'),
+        'tipo': operacion.get('tipo'),
+        'visitaId': operacion.get('visita'),
+        'estado': estado,
+        'errores': errores or {},
+    }
+    resultado.update(extra)
+    return resultado
+
+
+class Sincronizacion:
+    """Aplica una cola de operaciones de un técnico"""
+
+    def __init__(self, usuario, operaciones):
+        self.usuario = usuario
+        self.operaciones = operaciones
+        self.resultados = [None] * len(operaciones)
+        self.ids_ejecuciones = {}
+        self._por_id = {}
+        self._por_local = {}
+
+    # ------------------------------------------------------------------
+    # Precarga
+    # ------------------------------------------------------------------
+
+    def _cargar(self, validas):
+        """Visitas y ejecuciones referenciadas: una query para cada tabla"""
+        visita_ids = {op['visita'] for _, op in validas}
+        visitas = Visita.objects.in_bulk(visita_ids)
+
+        ejecucion_ids = {op['ejecucion'] for _, op in validas if 'ejecucion' in op}
+        ids_locales = {op['ejecucion_local'] for _, op in validas if 'ejecucion_local' in op}
+        ids_locales.update(
+            op['datos']['id_local'] for _, op in validas
+            if op['tipo'] == 'crear_ejecucion' and isinstance(op['datos'].get('id_local'), str))
+
+        if ejecucion_ids or ids_locales:
+            for ejecucion in Ejecucion.objects.filter(
+                    Q(pk__in=ejecucion_ids)
+                    | Q(visita_id__in=visita_ids, id_local__in=ids_locales)):
+                self._por_id[ejecucion.pk] = ejecucion
+                if ejecucion.id_local:
+                    self._por_local[(ejecucion.visita_id, ejecucion.id_local)] = ejecucion
+        return visitas
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def _iniciar(self, visita, operacion):
+        datos = _validar(VisitaSyncWorkflowSerializer(data=operacion['datos']))
+        if visita.estado in YA_INICIADA:
+            return YA_APLICADA, {}
+        visita.iniciar(
+            latitud=datos.get('latitud'), longitud=datos.get('longitud'),
+            observaciones=datos.get('observaciones'), fecha=datos.get('fecha'))
+        return APLICADA, {}
+
+    def _completar(self, visita, operacion):
+        datos = _validar(VisitaSyncWorkflowSerializer(data=operacion['datos']))
+        if visita.estado == _Estado.COMPLETADA:
+            return YA_APLICADA, {}
+        visita.completar(
+            observaciones=datos.get('observaciones'), latitud=datos.get('latitud'),
+            longitud=datos.get('longitud'), fecha=datos.get('fecha'))
+        return APLICADA, {}
+
+    def _cancelar(self, visita, operacion):
+        datos = _validar(VisitaSyncCancelarSerializer(data=operacion['datos']))
+        if visita.estado == _Estado.CANCELADA:
+            return YA_APLICADA, {}
+        visita.cancelar(datos['motivo'])
+        return APLICADA, {}
+
+    def _crear_ejecucion(self, visita, operacion):
+        serializer = EjecucionSyncCreateSerializer(data=operacion['datos'])
+        datos = _validar(serializer)
+        existente = self._por_local.get((visita.pk, datos['id_local']))
+        if existente is not None:
+            return YA_APLICADA, self._ids(existente)
+        if visita.estado != _Estado.EN_PROGRESO:
+            raise ErrorOperacion({'visita': [
+                'Solo se pueden crear ejecuciones en visitas en progreso.']})
+
+        ejecucion = serializer.save(visita=visita)
+        self._por_id[ejecucion.pk] = ejecucion
+        self._por_local[(visita.pk, ejecucion.id_local)] = ejecucion
+        return APLICADA, self._ids(ejecucion)
+
+    def _actualizar_ejecucion(self, visita, operacion):
+        if 'ejecucion' in operacion:
+            ejecucion = self._por_id.get(operacion['ejecucion'])
+        else:
+            ejecucion = self._por_local.get((visita.pk, operacion['ejecucion_local']))
+        if ejecucion is None or ejecucion.visita_id != visita.pk:
+            raise ErrorOperacion({'ejecucion': ['La ejecución no existe en esta visita.']})
+
+        serializer = EjecucionUpdateSerializer(
+            ejecucion, data=operacion['datos'], partial=True)
+        _validar(serializer)
+        serializer.save()
+        return APLICADA, self._ids(ejecucion)
+
+    def _ids(self, ejecucion):
+        if ejecucion.id_local:
+            self.ids_ejecuciones[ejecucion.id_local] = ejecucion.pk
+        return {'idEjecucion': ejecucion.pk, 'idLocal': ejecucion.id_local}
+
+    # ------------------------------------------------------------------
+    # Visitas
+    # ------------------------------------------------------------------
+
+    def _aplicar(self, visita, operacion):
+        metodo = getattr(self, f"_{operacion['tipo']}")
+        try:
+            return metodo(visita, operacion)
+        except ValidationError as e:
+            raise ErrorOperacion({'non_field_errors': e.messages})
+        except TransicionConflicto as e:
+            raise ErrorOperacion({'estado': [str(e)]})
+        except Visita.DoesNotExist:
+            raise ErrorOperacion({'visita': ['La visita no existe.']})
+        except IntegrityError:
+            # Otra sincronización concurrente registró el mismo id_local
+            raise ErrorOperacion({'id_local': [
+                'La ejecución ya fue registrada por otra sincronización.']})
+
+    def _aplicar_visita(self, visita, operaciones):
+        """Todas las operaciones de una visita en una transacción"""
+        aplicadas = []
+        try:
+            with transaction.atomic():
+                for indice, operacion in operaciones:
+                    estado, extra = self._aplicar(visita, operacion)
+                    self.resultados[indice] = _resultado(
+                        indice, operacion, estado, **extra)
+                    aplicadas.append(indice)
+        except ErrorOperacion as e:
+            fallida = operaciones[len(aplicadas)]
+            self.resultados[fallida[0]] = _resultado(
+                fallida[0], fallida[1], ERROR, e.errores)
+            # Lo escrito en esta transacción se revirtió (lo que ya estaba
+            # aplicado de una sincronización anterior sigue vigente)
+            anteriores = [self.resultados[indice] for indice in aplicadas]
+            creadas = {
+                r['idLocal'] for r in anteriores
+                if r['tipo'] == 'crear_ejecucion' and r['estado'] == APLICADA
+            }
+            for resultado in anteriores:
+                if resultado['estado'] == APLICADA:
+                    resultado['estado'] = REVERTIDA
+                if resultado.get('idLocal') in creadas:
+                    resultado.pop('idEjecucion')
+            for id_local in creadas:
+                self.ids_ejecuciones.pop(id_local, None)
+            for indice, operacion in operaciones[len(aplicadas) + 1:]:
+                self.resultados[indice] = _resultado(indice, operacion, OMITIDA)
+
+    def _rechazar_visita(self, operaciones, errores):
+        for indice, operacion in operaciones:
+            self.resultados[indice] = _resultado(indice, operacion, ERROR, errores)
+
+    def ejecutar(self):
+        """Aplica la cola y retorna la lista de resultados (mismo orden)"""
+        validas = []
+        for indice, operacion in enumerate(self.operaciones):
+            serializer = OperacionSyncSerializer(data=operacion)
+            if serializer.is_valid():
+                validas.append((indice, serializer.validated_data))
+            else:
+                self.resultados[indice] = _resultado(
+                    indice, operacion if isinstance(operacion, dict) else {},
+                    ERROR, serializer.errors)
+
+        visitas = self._cargar(validas)
+
+        # Orden de la cola dentro de cada visita; visitas en orden de aparición
+        grupos = OrderedDict()
+        for indice, operacion in validas:
+            grupos.setdefault(operacion['visita'], []).append((indice, operacion))
+
+        for visita_id, operaciones in grupos.items():
+            visita = visitas.get(visita_id)
+            if visita is None:
+                self._rechazar_visita(operaciones, {'visita': ['La visita no existe.']})
+            elif visita.tecnico_id != self.usuario.id:
+                self._rechazar_visita(operaciones, {'visita': [
+                    'Solo el técnico asignado puede sincronizar esta visita.']})
+            else:
+                self._aplicar_visita(visita, operaciones)
+
+        return self.resultados
@@ -0,0 +1,227 @@
+"""
+SKYNET - Stream de eventos de visitas (Server-Sent Events sobre ASGI)
+GET /api/visitas/eventos/ mantiene la conexión abierta y envía un evento
+``visita.estado`` por cada transición de las visitas del supervisor
+(administradores: todas). Se atiende en la capa ASGI, antes de Django: una
+conexión abierta no ocupa un hilo ni pasa por middlewares.
+
+EventSource no permite headers: el cliente pide un ticket de corta vida
+(POST /api/visitas/eventos/ticket/) y conecta con ``?ticket=``; también se
+acepta ``Authorization: Bearer``. El access token nunca va en la URL. Al
+conectar se envía el evento ``conectado`` con el cursor actual del feed de
+cambios; tras una reconexión el cliente recupera con
+``/api/visitas/cambios/?since=`` lo que ocurrió mientras estuvo
+desconectado.
+
+La sesión se vuelve a verificar en cada heartbeat: si el access token se
+revoca, la cuenta se desactiva o el usuario pierde el rol, y al llegar la
+expiración del token, se envía ``desconectado`` con el motivo y se cierra
+el stream (el cliente pide un ticket nuevo con su token vigente).
+
+Requiere servir ``core.asgi:application`` (p. ej. gunicorn con workers de
+uvicorn, ver render.yaml); bajo WSGI la ruta no existe.
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import AuthenticationFailed
+
+from apps.usuarios.authentication import autenticar_sesion, verificar_sesion
+from .cambios import cursor_actual
+from .eventos import broker_eventos
+
+RUTA_EVENTOS = '/api/visitas/eventos'
+
+# Comentario SSE periódico: mantiene viva la conexión en proxies y
+# detecta clientes desconectados. En cada uno se vuelve a verificar la
+# sesión (revocación, cuenta activa, rol)
+INTERVALO_HEARTBEAT = 15
+
+# Espera sugerida al navegador antes de reconectar (ms)
+REINTENTO_MS = 5000
+
+
+def formatear_evento(datos, evento=None):
+    """Bloque SSE (``event:``/``data:``) codificado"""
+    lineas = []
+    if evento:
+        lineas.append(f'event: {evento}')
+    lineas.append('data: ' + json.dumps(datos, ensure_ascii=False, default=str))
+    return ('\n'.join(lineas) + '\n\n').encode()
+
+
+def _credenciales(scope):
+    """(token, ticket): header Authorization o ``?ticket=``"""
+    for nombre, valor in scope.get('headers', []):
+        if nombre == b'authorization':
+            partes = valor.decode('latin-1').split()
+            if len(partes) == 2 and partes[0].lower() == 'bearer':
+                return partes[1], None
+    valores = parse_qs(scope.get('query_string', b'').decode()).get('ticket')
+    return None, valores[0] if valores else None
+
+
+def _puede_recibir(usuario):
+    return usuario.es_administrador or usuario.es_supervisor
+
+
+def _conectar(token, ticket):
+    """
+    (usuario, jti, exp, cursor) del stream; usuario None si no puede
+    recibir eventos. Autenticación y queries síncronas fuera del loop.
+    """
+    try:
+        usuario, jti, exp = autenticar_sesion(token=token, ticket=ticket)
+        if not _puede_recibir(usuario):
+            return None, None, None, None
+        return usuario, jti, exp, cursor_actual()
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+def _motivo_cierre(usuario_id, jti):
+    """Motivo para cerrar el stream, None si la sesión sigue vigente"""
+    try:
+        if not _puede_recibir(verificar_sesion(usuario_id, jti)):
+            return 'El usuario ya no puede recibir eventos.'
+        return None
+    except AuthenticationFailed as e:
+        return str(e.detail)
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+def _encabezados_cors(scope):
+    """El stream no pasa por corsheaders: se replica su lista de orígenes"""
+    for nombre, valor in scope.get('headers', []):
+        if nombre == b'origin':
+            origen = valor.decode('latin-1')
+            if origen in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+                return [(b'access-control-allow-origin', valor), (b'vary', b'Origin')]
+    return []
+
+
+async def _responder_error(send, codigo, mensaje, error, cors):
+    cuerpo = json.dumps({
+        'success': False,
+        'data': None,
+        'message': mensaje,
+        'errors': [error],
+    }).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': codigo,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(cuerpo)).encode()),
+        ] + cors,
+    })
+    await send({'type': 'http.response.body', 'body': cuerpo})
+
+
+async def _esperar_desconexion(receive, suscripcion):
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'http.disconnect':
+            suscripcion.cerrar()
+            return
+
+
+async def stream_eventos(scope, receive, send):
+    """Atiende una conexión del stream de eventos"""
+    cors = _encabezados_cors(scope)
+    token, ticket = _credenciales(scope)
+    if not (token or ticket):
+        await _responder_error(
+            send, 401, 'Autenticación requerida',
+            'Proporcione un ticket (?ticket=) o el access token (Authorization)',
+            cors)
+        return
+    try:
+        usuario, jti, exp, cursor = await sync_to_async(
+            _conectar, thread_sensitive=True)(token, ticket)
+    except AuthenticationFailed as e:
+        await _responder_error(send, 401, 'Autenticación fallida', str(e.detail), cors)
+        return
+    if usuario is None:
+        await _responder_error(
+            send, 403, 'No tienes permisos para recibir eventos',
+            'Solo administradores y supervisores', cors)
+        return
+
+    supervisor_id = None if usuario.es_administrador else usuario.id
+    suscripcion = broker_eventos.suscribir(supervisor_id)
+    desconexion = asyncio.ensure_future(_esperar_desconexion(receive, suscripcion))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # Sin buffering en nginx: cada evento sale al instante
+                (b'x-accel-buffering', b'no'),
+            ] + cors,
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {REINTENTO_MS}\n\n'.encode() + formatear_evento(
+                {'cursor': cursor}, 'conectado'),
+            'more_body': True,
+        })
+        motivo_cierre = sync_to_async(_motivo_cierre, thread_sensitive=True)
+        verificar_en = time.time() + INTERVALO_HEARTBEAT
+        while True:
+            # También con eventos seguidos: la sesión se verifica en cada
+            # intervalo y el stream no sobrevive a la expiración del token
+            if time.time() >= min(verificar_en, exp):
+                if exp <= time.time():
+                    motivo = 'El token ha expirado.'
+                else:
+                    motivo = await motivo_cierre(usuario.id, jti)
+                if motivo:
+                    await send({'type': 'http.response.body',
+                                'body': formatear_evento({'motivo': motivo}, 'desconectado'),
+                                'more_body': True})
+                    break
+                await send({'type': 'http.response.body', 'body': b': ping\n\n',
+                            'more_body': True})
+                verificar_en = time.time() + INTERVALO_HEARTBEAT
+            try:
+                evento = await suscripcion.siguiente(
+                    max(0, min(verificar_en, exp) - time.time()))
+            except asyncio.TimeoutError:
+                continue
+            if evento is None:
+                break
+            await send({'type': 'http.response.body',
+                        'body': formatear_evento(evento, evento['tipo']),
+                        'more_body': True})
+        if not desconexion.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # El cliente cerró la conexión durante un envío
+        pass
+    finally:
+        desconexion.cancel()
+        broker_eventos.cancelar(suscripcion)
+
+
+class EventosVisitasASGIMiddleware:
+    """Atiende el stream de eventos antes de la aplicación ASGI de Django"""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] == 'http' and scope.get('method') == 'GET'
+                and scope.get('path', '').rstrip('/') == RUTA_EVENTOS):
+            await stream_eventos(scope, receive, send)
+            return
+        await self.application(scope, receive, send)
@@ -0,0 +1,1293 @@
+import asyncio
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.clientes.models import Cliente
+from apps.usuarios.models import Usuario
+from apps.usuarios.revocacion import registro_revocaciones
+from apps.usuarios.tokens import emitir_ticket_stream, emitir_tokens, revocar_access
+from core.handlers import StreamingASGIHandler
+from apps.utils.fechas import rango_fechas
+from .cambios import cursor_actual, purgar_cambios
+from .eventos import (
+    TIPO_TRANSICION, BackendFeed, BackendLocal, BrokerEventos, Suscripcion,
+    broker_eventos
+)
+from .models import (
+    ESTADOS_ACTIVOS, Cambio, Ejecucion, PuntoRecorrido, PurgaCambios,
+    TransicionConflicto, Visita
+)
+from .recorrido import MAX_PUNTOS_LOTE, simplificar
+from .serializers import VISITA_PROYECCION, VisitaSerializer
+from .sincronizacion import Sincronizacion
+from .sse import stream_eventos
+
+
+class VisitasTestMixin:
+    """
+    Datos base para las pruebas del módulo de visitas
+    """
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email='admin@skynet.com', nombre='Admin', apellido='Sistema',
+            password='admin12345', rol=Usuario.RolChoices.ADMINISTRADOR)
+        self.supervisor = Usuario.objects.create_user(
+            email='supervisor@skynet.com', nombre='Maria', apellido='Garcia',
+            password='super12345', rol=Usuario.RolChoices.SUPERVISOR)
+        self.tecnico = Usuario.objects.create_user(
+            email='tecnico@skynet.com', nombre='Juan', apellido='Perez',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO)
+        self.cliente = Cliente.objects.create(
+            nombre='Empresa ABC', contacto='Ana Lopez', telefono='12345678',
+            email='contacto@empresa.com', direccion='Zona 10, Guatemala City')
+        self.client = APIClient()
+
+    def crear_visitas(self, cantidad, ejecuciones=0, **kwargs):
+        base = timezone.now() + timedelta(days=1)
+        visitas = []
+        for i in range(cantidad):
+            datos = {
+                'cliente': self.cliente,
+                'tecnico': self.tecnico,
+                'supervisor': self.supervisor,
+                'fecha_programada': base + timedelta(hours=i),
+                'tipo_visita': Visita.TipoVisitaChoices.MANTENIMIENTO,
+                'descripcion': f'Mantenimiento {i}',
+            }
+            datos.update(kwargs)
+            visita = Visita.objects.create(**datos)
+            for j in range(ejecuciones):
+                Ejecucion.objects.create(
+                    visita=visita, descripcion=f'Tarea {j}',
+                    tiempo_inicio=timezone.now())
+            visitas.append(visita)
+        return visitas
+
+
+class VisitasListQueryBudgetTest(VisitasTestMixin, TestCase):
+    """
+    El listado de visitas debe ejecutar un número fijo de queries
+    """
+
+    def test_queries_constantes_sin_importar_tamano_de_pagina(self):
+        self.crear_visitas(15, ejecuciones=3)
+        self.client.force_authenticate(self.admin)
+
+        # visitas + clientes/usuarios (JOIN) y prefetch de ejecuciones
+        for page_size in (1, 5, 15):
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    '/api/visitas/', {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['data']), page_size)
+
+        data = response.json()['data']
+        self.assertEqual(len(data[0]['ejecuciones']), 3)
+        self.assertEqual(data[0]['tecnico']['id'], self.tecnico.id)
+
+    def test_usuarios_anidados_se_serializan_una_vez(self):
+        self.crear_visitas(4)
+        queryset = VisitaSerializer.setup_eager_loading(Visita.objects.all())
+        data = VisitaSerializer(queryset, many=True).data
+
+        self.assertIs(data[0]['tecnico'], data[3]['tecnico'])
+        self.assertIs(data[0]['cliente'], data[3]['cliente'])
+        self.assertEqual(data[0]['supervisor']['id'], self.supervisor.id)
+
+
+class VisitasRangoFechasTest(VisitasTestMixin, TestCase):
+    """
+    fecha_desde/fecha_hasta son días locales convertidos a [inicio, fin)
+    """
+
+    def test_rango_semiabierto_con_zona_horaria(self):
+        inicio, fin = rango_fechas('2024-03-01', '2024-03-02')
+        # America/Guatemala es UTC-6
+        self.assertEqual(inicio, datetime(2024, 3, 1, 6, tzinfo=dt_timezone.utc))
+        self.assertEqual(fin, datetime(2024, 3, 3, 6, tzinfo=dt_timezone.utc))
+        self.assertTrue(timezone.is_aware(inicio))
+
+    def test_extremos_opcionales(self):
+        self.assertEqual(rango_fechas(), (None, None))
+        inicio, fin = rango_fechas(hasta=date(2024, 3, 1))
+        self.assertIsNone(inicio)
+        self.assertEqual(fin, datetime(2024, 3, 2, 6, tzinfo=dt_timezone.utc))
+
+    def test_limites_del_dia_local(self):
+        tz = timezone.get_current_timezone()
+        dentro, borde, fuera = self.crear_visitas(3)
+        # 23:59 local del 1 de marzo (05:59 UTC del 2) cuenta como día 1
+        Visita.objects.filter(pk=dentro.pk).update(
+            fecha_programada=timezone.make_aware(datetime(2024, 3, 1, 23, 59), tz))
+        Visita.objects.filter(pk=borde.pk).update(
+            fecha_programada=timezone.make_aware(datetime(2024, 3, 1, 0, 0), tz))
+        Visita.objects.filter(pk=fuera.pk).update(
+            fecha_programada=timezone.make_aware(datetime(2024, 3, 2, 0, 0), tz))
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            '/api/visitas/', {'fecha_desde': '2024-03-01', 'fecha_hasta': '2024-03-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(v['idVisita'] for v in response.json()['data']),
+            [dentro.pk, borde.pk])
+
+    def test_fechas_invalidas(self):
+        self.client.force_authenticate(self.admin)
+        for params in ({'fecha_desde': '2024-13-01'}, {'fecha_hasta': 'ayer'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/visitas/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Fecha inválida', response.json()['errors'][0])
+
+
+class VisitasProyeccionTest(VisitasTestMixin, TestCase):
+    """
+    ?fields= y ?view=compact devuelven solo las claves pedidas
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def test_fields(self):
+        visita, = self.crear_visitas(1)
+        response = self.client.get(
+            '/api/visitas/', {'fields': 'idVisita,estado,tecnicoNombre,supervisorNombre'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [{
+            'idVisita': visita.id,
+            'estado': visita.estado,
+            'tecnicoNombre': 'Juan Perez',
+            'supervisorNombre': 'Maria Garcia',
+        }])
+
+    def test_sin_supervisor_es_null(self):
+        self.crear_visitas(1, supervisor=None)
+        response = self.client.get('/api/visitas/', {'fields': 'supervisorNombre'})
+        self.assertEqual(response.json()['data'], [{'supervisorNombre': None}])
+
+    def test_view_compact(self):
+        self.crear_visitas(1)
+        response = self.client.get('/api/visitas/', {'view': 'compact'})
+        self.assertEqual(
+            list(response.json()['data'][0]), VISITA_PROYECCION.compactos)
+
+    def test_formatos_iguales_al_serializer(self):
+        visita, = self.crear_visitas(1)
+        completa = self.client.get('/api/visitas/').json()['data'][0]
+        compacta = self.client.get(
+            '/api/visitas/', {'fields': 'fechaProgramada,fechaCreacion'}).json()['data'][0]
+        self.assertEqual(compacta['fechaProgramada'], completa['fechaProgramada'])
+        self.assertEqual(compacta['fechaCreacion'], completa['fechaCreacion'])
+
+    def test_campo_desconocido(self):
+        response = self.client.get('/api/visitas/', {'fields': 'idVisita,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['errors'][0])
+
+
+class VisitasKeysetCursorTest(VisitasTestMixin, TestCase):
+    """
+    El cursor del listado se valida contra el ordenamiento: un cursor
+    manipulado es un 400, nunca un error de la base de datos
+    """
+
+    def cursor(self, valores):
+        return base64.urlsafe_b64encode(
+            json.dumps(valores).encode()).decode().rstrip('=')
+
+    def assertCursorInvalido(self, cursor):
+        response = self.client.get('/api/visitas/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_recorre_todas_las_paginas(self):
+        visitas = self.crear_visitas(5)
+        self.client.force_authenticate(self.admin)
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/visitas/', params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(v['idVisita'] for v in response.json()['data'])
+            cursor = response.json()['pagination']['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, [v.id for v in reversed(visitas)])
+
+    def test_cursores_invalidos(self):
+        self.client.force_authenticate(self.admin)
+        fecha = {'dt': timezone.now().isoformat()}
+        for cursor in (
+            'no-es-base64!',
+            self.cursor({'a': 1}),
+            self.cursor([fecha]),                      # aridad
+            self.cursor([fecha, 1, 2]),
+            self.cursor([fecha, 'abc']),               # id no entero
+            self.cursor([fecha, None]),
+            self.cursor([fecha, [1]]),
+            self.cursor(['no-es-fecha', 1]),
+            self.cursor([12345, 1]),
+            self.cursor([{'x': 1}, 1]),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertCursorInvalido(cursor)
+
+
+class VisitasExportTest(VisitasTestMixin, TestCase):
+    """
+    Exportación en streaming: NDJSON, CSV y prefetch manual de ejecuciones
+    """
+
+    def exportar(self, **params):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/visitas/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        visitas = self.crear_visitas(3)
+        lineas = self.exportar(fields='idVisita,supervisorNombre').splitlines()
+        self.assertEqual([json.loads(linea) for linea in lineas], [
+            {'idVisita': v.id, 'supervisorNombre': 'Maria Garcia'}
+            for v in reversed(visitas)
+        ])
+
+    def test_csv_una_fila_por_ejecucion(self):
+        con_tareas, sin_tareas = self.crear_visitas(2)
+        Ejecucion.objects.create(
+            visita=con_tareas, descripcion='Tarea extra', tiempo_inicio=timezone.now())
+        Ejecucion.objects.filter(visita=sin_tareas).delete()
+        filas = list(csv.DictReader(io.StringIO(self.exportar(
+            formato='csv', fields='idVisita', ejecuciones='true'))))
+        self.assertEqual(
+            [(f['idVisita'], f['ejecucion.descripcion']) for f in filas],
+            [(str(sin_tareas.id), ''), (str(con_tareas.id), 'Tarea extra')])
+        self.assertNotIn('ejecucion.visitaId', filas[0])
+
+    def test_ejecuciones_una_query_por_lote(self):
+        self.crear_visitas(5, ejecuciones=2)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            '/api/visitas/export/', {'ejecuciones': 'true', 'fields': 'idVisita'})
+        # visitas + ejecuciones del único lote
+        with self.assertNumQueries(2):
+            lineas = b''.join(response.streaming_content).decode().splitlines()
+        visitas = [json.loads(linea) for linea in lineas]
+        self.assertEqual(len(visitas), 5)
+        for visita in visitas:
+            self.assertEqual(
+                {e['visitaId'] for e in visita['ejecuciones']}, {visita['idVisita']})
+            self.assertEqual(len(visita['ejecuciones']), 2)
+
+    def test_formato_no_soportado(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/visitas/export/', {'formato': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class VisitasExportASGITest(VisitasTestMixin, TransactionTestCase):
+    """
+    Bajo ASGI el iterador de la exportación consulta la base de datos fuera
+    del event loop (sin SynchronousOnlyOperation)
+    """
+
+    def test_export_bajo_asgi(self):
+        visitas = self.crear_visitas(3, ejecuciones=1)
+        token = emitir_tokens(self.admin)['access']
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/visitas/export/',
+            'raw_path': b'/api/visitas/export/',
+            'query_string': b'ejecuciones=true&fields=idVisita',
+            'headers': [(b'host', b'testserver'),
+                        (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+        }
+        mensajes = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(mensaje):
+            mensajes.append(mensaje)
+
+        async_to_sync(StreamingASGIHandler())(scope, receive, send)
+
+        self.assertEqual(mensajes[0]['status'], 200)
+        cuerpo = b''.join(m.get('body', b'') for m in mensajes[1:]).decode()
+        self.assertEqual(
+            [json.loads(linea)['idVisita'] for linea in cuerpo.splitlines()],
+            [v.id for v in reversed(visitas)])
+
+
+class VisitasBulkCreateTest(VisitasTestMixin, TestCase):
+    """
+    Programación en lote: validación por elemento, conflictos de agenda
+    y modo parcial
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.supervisor)
+
+    def item(self, dias=1, **kwargs):
+        datos = {
+            'cliente': self.cliente.id,
+            'tecnico': self.tecnico.id,
+            'supervisor': self.supervisor.id,
+            'fecha_programada': (timezone.now() + timedelta(days=dias)).isoformat(),
+            'tipo_visita': Visita.TipoVisitaChoices.MANTENIMIENTO,
+            'descripcion': 'Mantenimiento',
+        }
+        datos.update(kwargs)
+        return datos
+
+    def enviar(self, items, **extra):
+        return self.client.post(
+            '/api/visitas/bulk-create/', {'visitas': items, **extra}, format='json')
+
+    def test_crea_el_lote(self):
+        response = self.enviar([self.item(1), self.item(2), self.item(3)])
+        self.assertEqual(response.status_code, 201)
+        creadas = response.json()['data']['creadas']
+        self.assertEqual([c['indice'] for c in creadas], [0, 1, 2])
+        self.assertEqual(
+            set(Visita.objects.values_list('id', flat=True)),
+            {c['idVisita'] for c in creadas})
+
+    def test_todo_o_nada(self):
+        response = self.enviar([self.item(1), self.item(2, tecnico=self.supervisor.id)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['indice'], 1)
+        self.assertFalse(Visita.objects.exists())
+
+    def test_conflictos_de_agenda(self):
+        self.crear_visitas(1, fecha_programada=timezone.now() + timedelta(days=5))
+        response = self.enviar(
+            [self.item(1), self.item(1), self.item(5)], permitir_parcial=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data']['total_creadas'], 1)
+        self.assertEqual([e['indice'] for e in response.json()['errors']], [1, 2])
+
+    def test_permitir_parcial_como_texto(self):
+        items = [self.item(1), self.item(2, cliente=999)]
+        response = self.enviar(items, permitir_parcial='false')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Visita.objects.exists())
+
+        response = self.enviar(items, permitir_parcial='true')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data']['total_creadas'], 1)
+
+    def test_permitir_parcial_invalido(self):
+        response = self.enviar([self.item(1)], permitir_parcial='quizas')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('permitir_parcial', response.json()['errors'][0])
+        self.assertFalse(Visita.objects.exists())
+
+    def test_tecnico_sin_permisos(self):
+        self.client.force_authenticate(self.tecnico)
+        self.assertEqual(self.enviar([self.item(1)]).status_code, 403)
+
+
+class VisitasIndicesExplainTest(VisitasTestMixin, TestCase):
+    """
+    Verifica con EXPLAIN que el planificador usa los índices compuestos
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # Con tablas de prueba pequeñas PostgreSQL prefiere seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan)
+
+    def test_listado_general(self):
+        self.assertUsaIndice(
+            Visita.objects.order_by('-fecha_programada', 'id')[:21],
+            'visitas_fecha_idx')
+
+    def test_agenda_tecnico(self):
+        self.assertUsaIndice(
+            Visita.objects.filter(tecnico=self.tecnico)
+            .order_by('-fecha_programada', 'id')[:21],
+            'visitas_tecnico_fecha_idx')
+
+    def test_alcance_supervisor(self):
+        self.assertUsaIndice(
+            Visita.objects.filter(supervisor=self.supervisor)
+            .order_by('-fecha_programada', 'id')[:21],
+            'visitas_supervisor_fecha_idx')
+
+    def test_filtro_estado(self):
+        self.assertUsaIndice(
+            Visita.objects.filter(estado=Visita.EstadoVisitaChoices.PROGRAMADA)
+            .order_by('-fecha_programada', 'id')[:21],
+            'visitas_estado_fecha_idx')
+
+    def test_ejecuciones_por_visita(self):
+        self.assertUsaIndice(
+            Ejecucion.objects.filter(visita_id__in=[1, 2])
+            .order_by('visita_id', 'tiempo_inicio'),
+            'ejecuciones_visita_tiempo_idx')
+
+    def test_visitas_activas_del_tecnico(self):
+        if connection.vendor != 'postgresql':
+            # SQLite solo usa índices parciales con literales en el WHERE
+            self.skipTest('Índice parcial verificado solo en PostgreSQL')
+        self.assertUsaIndice(
+            Visita.objects.filter(
+                tecnico=self.tecnico,
+                estado__in=ESTADOS_ACTIVOS,
+                fecha_programada__gte=timezone.now()),
+            'visitas_tecnico_activas_idx')
+
+
+class VisitasTransicionesTest(VisitasTestMixin, TestCase):
+    """
+    Transiciones del workflow como un único UPDATE condicionado al estado
+    leído: 409 si otra request ganó, 404 si la visita ya no existe
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.visita = self.crear_visitas(1)[0]
+
+    def test_un_solo_update(self):
+        visita = Visita.objects.get(pk=self.visita.pk)
+        # Un UPDATE de la visita y el INSERT del feed de cambios
+        for transicion in (lambda: visita.iniciar(latitud=14.6349, longitud=-90.5069),
+                           lambda: visita.completar(observaciones='Listo')):
+            with CaptureQueriesContext(connection) as consultas:
+                transicion()
+            self.assertEqual(
+                [q['sql'].split()[0] for q in consultas], ['UPDATE', 'INSERT'])
+        visita.refresh_from_db()
+        self.assertEqual(visita.estado, Visita.EstadoVisitaChoices.COMPLETADA)
+        self.assertEqual(visita.observaciones, 'Listo')
+        self.assertIsNotNone(visita.fecha_inicio)
+        self.assertGreater(visita.fecha_actualizacion, self.visita.fecha_actualizacion)
+
+    def test_instancia_vieja_contra_fila_ya_transicionada(self):
+        vieja = Visita.objects.get(pk=self.visita.pk)
+        Visita.objects.get(pk=self.visita.pk).cancelar('Cliente ausente')
+
+        with self.assertRaises(TransicionConflicto) as contexto:
+            vieja.iniciar()
+        self.assertEqual(contexto.exception.estado_esperado, Visita.EstadoVisitaChoices.PROGRAMADA)
+        self.assertEqual(contexto.exception.estado_actual, Visita.EstadoVisitaChoices.CANCELADA)
+        fila = Visita.objects.get(pk=self.visita.pk)
+        self.assertEqual(fila.estado, Visita.EstadoVisitaChoices.CANCELADA)
+        self.assertIsNone(fila.fecha_inicio)
+        self.assertEqual(vieja.estado, Visita.EstadoVisitaChoices.PROGRAMADA)
+
+    def test_eliminada_mientras_tanto(self):
+        vieja = Visita.objects.get(pk=self.visita.pk)
+        Visita.objects.filter(pk=self.visita.pk).delete()
+        with self.assertRaises(Visita.DoesNotExist):
+            vieja.iniciar()
+
+    def test_origen_invalido_no_escribe(self):
+        visita = Visita.objects.get(pk=self.visita.pk)
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            visita.completar()
+
+    def post_con_instancia_vieja(self, accion, vieja, usuario, **datos):
+        self.client.force_authenticate(usuario)
+        with mock.patch('apps.visitas.views._visita_workflow', return_value=vieja):
+            return self.client.post(
+                f'/api/visitas/{self.visita.pk}/{accion}/', datos, format='json')
+
+    def test_vista_responde_409(self):
+        vieja = Visita.objects.get(pk=self.visita.pk)
+        Visita.objects.get(pk=self.visita.pk).iniciar()
+        for accion, usuario, datos in (
+                ('iniciar', self.tecnico, {}),
+                ('cancelar', self.supervisor, {'motivo': 'Duplicada'})):
+            with self.subTest(accion=accion):
+                response = self.post_con_instancia_vieja(accion, vieja, usuario, **datos)
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(
+                    response.json()['data'], {'estado': Visita.EstadoVisitaChoices.EN_PROGRESO})
+        self.assertEqual(
+            Visita.objects.get(pk=self.visita.pk).estado, Visita.EstadoVisitaChoices.EN_PROGRESO)
+
+    def test_vista_responde_404_si_se_elimino(self):
+        vieja = Visita.objects.get(pk=self.visita.pk)
+        Visita.objects.filter(pk=self.visita.pk).delete()
+        response = self.post_con_instancia_vieja('iniciar', vieja, self.tecnico)
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(self.tecnico)
+        response = self.client.post(f'/api/visitas/{self.visita.pk}/iniciar/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_workflow_por_api(self):
+        self.client.force_authenticate(self.tecnico)
+        url = f'/api/visitas/{self.visita.pk}/'
+        self.assertEqual(self.client.post(url + 'completar/').status_code, 400)
+        response = self.client.post(url + 'iniciar/', {
+            'latitud': '14.6349', 'longitud': '-90.5069'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['estado'], Visita.EstadoVisitaChoices.EN_PROGRESO)
+        response = self.client.post(url + 'completar/', {'observaciones': 'Listo'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['estado'], Visita.EstadoVisitaChoices.COMPLETADA)
+
+
+class VisitasSyncTest(VisitasTestMixin, TestCase):
+    """
+    Cola offline: todo o nada por visita, reenvíos idempotentes e
+    idsEjecuciones solo con las ejecuciones que quedaron guardadas
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.visita, self.otra = self.crear_visitas(2)
+        self.client.force_authenticate(self.tecnico)
+
+    def op(self, tipo, visita=None, **kwargs):
+        operacion = {
+            'id': f'op-{tipo}-{len(kwargs)}', 'tipo': tipo,
+            'visita': (visita or self.visita).pk}
+        operacion.update(kwargs)
+        return operacion
+
+    def sync(self, operaciones):
+        response = self.client.post(
+            '/api/visitas/sync/', {'operaciones': operaciones}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def estados(self, respuesta):
+        return [r['estado'] for r in respuesta['data']['resultados']]
+
+    def cola(self):
+        ahora = timezone.now()
+        return [
+            self.op('iniciar', datos={'fecha': (ahora - timedelta(hours=2)).isoformat()}),
+            self.op('crear_ejecucion', datos={
+                'id_local': 'tmp-1', 'descripcion': 'Revisión',
+                'tiempo_inicio': (ahora - timedelta(hours=1)).isoformat()}),
+            self.op('actualizar_ejecucion', ejecucion_local='tmp-1', datos={
+                'completada': True, 'tiempo_fin': ahora.isoformat()}),
+            self.op('completar', datos={'observaciones': 'Listo'}),
+        ]
+
+    def test_aplica_la_cola(self):
+        respuesta = self.sync(self.cola())
+        self.assertTrue(respuesta['success'])
+        self.assertEqual(self.estados(respuesta), ['aplicada'] * 4)
+        ejecucion = Ejecucion.objects.get(visita=self.visita)
+        self.assertTrue(ejecucion.completada)
+        self.assertEqual(respuesta['data']['idsEjecuciones'], {'tmp-1': ejecucion.pk})
+        self.visita.refresh_from_db()
+        self.assertEqual(self.visita.estado, Visita.EstadoVisitaChoices.COMPLETADA)
+        self.assertEqual(self.visita.observaciones, 'Listo')
+
+    def test_reenvio_idempotente(self):
+        cola = self.cola()
+        primera = self.sync(cola)
+        segunda = self.sync(cola)
+        self.assertEqual(
+            self.estados(segunda), ['ya_aplicada', 'ya_aplicada', 'aplicada', 'ya_aplicada'])
+        self.assertEqual(Ejecucion.objects.filter(visita=self.visita).count(), 1)
+        self.assertEqual(
+            segunda['data']['idsEjecuciones'], primera['data']['idsEjecuciones'])
+
+    def test_revertida_y_omitida(self):
+        futura = (timezone.now() + timedelta(hours=1)).isoformat()
+        respuesta = self.sync([
+            self.op('iniciar'),
+            self.op('crear_ejecucion', datos={
+                'id_local': 'tmp-1', 'descripcion': 'Revisión',
+                'tiempo_inicio': timezone.now().isoformat()}),
+            self.op('iniciar', visita=self.otra),
+            self.op('completar', datos={'fecha': futura}),
+            self.op('cancelar', datos={'motivo': 'Sin acceso'}),
+        ])
+        self.assertFalse(respuesta['success'])
+        self.assertEqual(
+            self.estados(respuesta),
+            ['revertida', 'revertida', 'aplicada', 'error', 'omitida'])
+        self.assertIn('fecha', respuesta['data']['resultados'][3]['errores'])
+        self.assertNotIn('idEjecucion', respuesta['data']['resultados'][1])
+        self.assertEqual(respuesta['data']['idsEjecuciones'], {})
+        self.assertEqual([e['indice'] for e in respuesta['errors']], [3])
+
+        # Nada de la visita fallida quedó guardado; la otra sí
+        self.visita.refresh_from_db()
+        self.otra.refresh_from_db()
+        self.assertEqual(self.visita.estado, Visita.EstadoVisitaChoices.PROGRAMADA)
+        self.assertFalse(Ejecucion.objects.exists())
+        self.assertEqual(self.otra.estado, Visita.EstadoVisitaChoices.EN_PROGRESO)
+
+    def test_ids_ejecuciones_conserva_las_de_sincronizaciones_previas(self):
+        crear = [
+            self.op('iniciar'),
+            self.op('crear_ejecucion', datos={
+                'id_local': 'tmp-1', 'descripcion': 'Revisión',
+                'tiempo_inicio': timezone.now().isoformat()}),
+        ]
+        self.sync(crear)
+        previa = Ejecucion.objects.get(id_local='tmp-1')
+        respuesta = self.sync(crear[1:] + [
+            self.op('crear_ejecucion', datos={
+                'id_local': 'tmp-2', 'descripcion': 'Limpieza',
+                'tiempo_inicio': timezone.now().isoformat()}),
+            self.op('completar', datos={
+                'fecha': (timezone.now() + timedelta(hours=1)).isoformat()}),
+        ])
+        self.assertEqual(self.estados(respuesta), ['ya_aplicada', 'revertida', 'error'])
+        self.assertEqual(respuesta['data']['idsEjecuciones'], {'tmp-1': previa.pk})
+        self.assertEqual(respuesta['data']['resultados'][0]['idEjecucion'], previa.pk)
+        self.assertFalse(Ejecucion.objects.filter(id_local='tmp-2').exists())
+
+    def test_id_local_registrado_por_otra_sincronizacion(self):
+        Visita.objects.get(pk=self.visita.pk).iniciar()
+        cargar = Sincronizacion._cargar
+
+        def cargar_y_competir(sincronizacion, validas):
+            # Otra sincronización inserta el mismo id_local tras la precarga
+            visitas = cargar(sincronizacion, validas)
+            Ejecucion.objects.create(
+                visita=self.visita, id_local='tmp-1', descripcion='Revisión',
+                tiempo_inicio=timezone.now())
+            return visitas
+
+        with mock.patch.object(Sincronizacion, '_cargar', cargar_y_competir):
+            respuesta = self.sync([self.op('crear_ejecucion', datos={
+                'id_local': 'tmp-1', 'descripcion': 'Revisión',
+                'tiempo_inicio': timezone.now().isoformat()})])
+        resultado = respuesta['data']['resultados'][0]
+        self.assertEqual(resultado['estado'], 'error')
+        self.assertIn('id_local', resultado['errores'])
+        self.assertEqual(Ejecucion.objects.filter(visita=self.visita).count(), 1)
+
+    def test_operaciones_rechazadas(self):
+        ajena = self.crear_visitas(1, tecnico=Usuario.objects.create_user(
+            email='otro@skynet.com', nombre='Luis', apellido='Mejia',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO))[0]
+        respuesta = self.sync([
+            self.op('volar'),
+            {'tipo': 'iniciar', 'visita': self.visita.pk},
+            self.op('iniciar', visita=ajena),
+            {'id': 'x', 'tipo': 'iniciar', 'visita': 999999},
+            'no es un objeto',
+        ])
+        self.assertEqual(self.estados(respuesta), ['error'] * 5)
+        self.assertIn('tipo', respuesta['data']['resultados'][0]['errores'])
+        self.assertIn('id', respuesta['data']['resultados'][1]['errores'])
+        self.assertIn('visita', respuesta['data']['resultados'][2]['errores'])
+        self.assertIn('visita', respuesta['data']['resultados'][3]['errores'])
+
+    def test_cuerpo_que_no_es_objeto(self):
+        self.client.force_authenticate(self.supervisor)
+        for url in ('/api/visitas/sync/', '/api/visitas/bulk-create/', '/api/visitas/recorrido/'):
+            for cuerpo in ([{'visita': self.visita.pk}], 'texto', None):
+                with self.subTest(url=url, cuerpo=cuerpo):
+                    response = self.client.post(url, cuerpo, format='json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertFalse(response.json()['success'])
+
+
+class RecorridoSimplificarTest(TestCase):
+    """
+    Ramer-Douglas-Peucker sobre puntos (fecha, lat_e6, lng_e6, precision)
+    """
+
+    def puntos(self, coordenadas):
+        inicio = timezone.now()
+        return [
+            (inicio + timedelta(seconds=i), int(lat * 1e6), int(lng * 1e6), 5)
+            for i, (lat, lng) in enumerate(coordenadas)
+        ]
+
+    def test_linea_recta_conserva_los_extremos(self):
+        puntos = self.puntos([(14.6, -90.5 + i * 0.0001) for i in range(50)])
+        self.assertEqual(simplificar(puntos), [puntos[0], puntos[-1]])
+
+    def test_conserva_los_giros(self):
+        # Forma de L: 20 puntos al este y 20 al norte (~11 m por paso)
+        este = [(14.6, -90.5 + i * 0.0001) for i in range(20)]
+        norte = [(14.6 + i * 0.0001, -90.5 + 19 * 0.0001) for i in range(1, 21)]
+        puntos = self.puntos(este + norte)
+        self.assertEqual(simplificar(puntos), [puntos[0], puntos[19], puntos[-1]])
+
+    def test_ida_y_vuelta(self):
+        # Extremos iguales: se conserva el punto más lejano
+        ida = [(14.6, -90.5 + i * 0.0001) for i in range(10)]
+        puntos = self.puntos(ida + ida[-2::-1])
+        self.assertEqual(simplificar(puntos), [puntos[0], puntos[9], puntos[-1]])
+
+    def test_ruido_bajo_la_tolerancia(self):
+        puntos = self.puntos([
+            (14.6 + (0.00002 if i % 2 else 0), -90.5 + i * 0.0001) for i in range(30)])
+        self.assertEqual(len(simplificar(puntos, tolerancia_m=10)), 2)
+        self.assertEqual(simplificar(puntos, tolerancia_m=0, max_puntos=None), puntos)
+
+    def test_max_puntos(self):
+        puntos = self.puntos([
+            (14.6 + (0.001 if i % 2 else 0), -90.5 + i * 0.001) for i in range(100)])
+        resultado = simplificar(puntos, tolerancia_m=0, max_puntos=10)
+        self.assertEqual(len(resultado), 10)
+        self.assertEqual((resultado[0], resultado[-1]), (puntos[0], puntos[-1]))
+
+    def test_pocos_puntos(self):
+        self.assertEqual(simplificar([]), [])
+        puntos = self.puntos([(14.6, -90.5), (14.7, -90.4)])
+        self.assertEqual(simplificar(puntos), puntos)
+
+
+class VisitasRecorridoTest(VisitasTestMixin, TestCase):
+    """
+    Ingesta por lotes de puntos GPS y lectura del recorrido
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.visita, self.programada = self.crear_visitas(2)
+        Visita.objects.get(pk=self.visita.pk).iniciar()
+        self.client.force_authenticate(self.tecnico)
+        self.inicio = timezone.now() - timedelta(minutes=30)
+
+    def punto(self, segundos, latitud=14.6349, longitud=-90.5069, **kwargs):
+        datos = {
+            'visita': self.visita.pk,
+            'fecha': (self.inicio + timedelta(seconds=segundos)).isoformat(),
+            'latitud': latitud, 'longitud': longitud, 'precision': 4.6,
+        }
+        datos.update(kwargs)
+        return datos
+
+    def enviar(self, puntos):
+        response = self.client.post(
+            '/api/visitas/recorrido/', {'puntos': puntos}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['data']
+
+    def test_validacion_por_punto(self):
+        otra = self.crear_visitas(1, tecnico=Usuario.objects.create_user(
+            email='otro@skynet.com', nombre='Luis', apellido='Mejia',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO))[0]
+        futura = (timezone.now() + timedelta(hours=1)).isoformat()
+        data = self.enviar([
+            self.punto(0),
+            self.punto(1, latitud=91),
+            self.punto(2, longitud='oeste'),
+            self.punto(3, fecha=futura),
+            self.punto(4, fecha='ayer'),
+            self.punto(5, precision=-1),
+            self.punto(6, visita='1'),
+            'no es un objeto',
+            self.punto(8, visita=999999),
+            self.punto(9, visita=otra.pk),
+            self.punto(10, visita=self.programada.pk),
+            self.punto(11, latitud='14.6350', precision=None),
+        ])
+        self.assertEqual((data['recibidos'], data['aceptados']), (12, 2))
+        errores = {r['indice']: r['error'] for r in data['rechazados']}
+        self.assertEqual(sorted(errores), list(range(1, 11)))
+        self.assertIn('latitud', errores[1])
+        self.assertIn('futura', errores[3])
+        self.assertIn('no existe', errores[8])
+        self.assertIn('asignada', errores[9])
+        self.assertIn('en progreso', errores[10])
+
+        punto = PuntoRecorrido.objects.order_by('fecha').last()
+        self.assertEqual((punto.latitud_e6, punto.precision), (14635000, None))
+
+    def test_fecha_inexistente_y_precision_infinita(self):
+        # 1e400 llega como inf desde el JSONParser
+        cuerpo = json.dumps({'puntos': [
+            self.punto(0), self.punto(1, fecha='2024-02-30T10:00:00'),
+            self.punto(2, precision='PRECISION')]}).replace('"PRECISION"', '1e400')
+        response = self.client.post(
+            '/api/visitas/recorrido/', cuerpo, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()['data']
+        self.assertEqual(data['aceptados'], 1)
+        errores = {r['indice']: r['error'] for r in data['rechazados']}
+        self.assertIn('fecha', errores[1])
+        self.assertIn('precision', errores[2])
+
+    def test_reenvio_ignora_los_duplicados(self):
+        lote = [self.punto(i, longitud=-90.5069 + i * 0.0001) for i in range(5)]
+        self.enviar(lote)
+        self.enviar(lote + [self.punto(5)])
+        self.assertEqual(PuntoRecorrido.objects.filter(visita=self.visita).count(), 6)
+
+    def test_lote_vacio_o_excesivo(self):
+        for puntos in ([], [self.punto(0)] * (MAX_PUNTOS_LOTE + 1)):
+            response = self.client.post(
+                '/api/visitas/recorrido/', {'puntos': puntos}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_lectura_simplificada(self):
+        self.enviar([self.punto(i, longitud=-90.5069 + i * 0.0001) for i in range(30)])
+        url = f'/api/visitas/{self.visita.pk}/recorrido/'
+
+        data = self.client.get(url).json()['data']
+        self.assertEqual(data['totalPuntos'], 30)
+        self.assertEqual(len(data['puntos']), 2)
+        self.assertEqual(data['puntos'][0]['latitud'], 14.6349)
+        self.assertEqual(data['puntos'][0]['precision'], 5)
+
+        self.assertEqual(len(self.client.get(url, {'tolerancia': 0}).json()['data']['puntos']), 30)
+        data = self.client.get(url, {
+            'tolerancia': 0, 'max_puntos': 5,
+            'desde': (self.inicio + timedelta(seconds=10)).isoformat(),
+        }).json()['data']
+        self.assertEqual((data['totalPuntos'], len(data['puntos'])), (20, 5))
+
+    def test_lectura_parametros_y_permisos(self):
+        url = f'/api/visitas/{self.visita.pk}/recorrido/'
+        for params in ({'desde': 'ayer'}, {'hasta': '2024-02-30T10:00:00'},
+                       {'tolerancia': '-1'}, {'max_puntos': '1'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+        self.client.force_authenticate(Usuario.objects.create_user(
+            email='otro@skynet.com', nombre='Luis', apellido='Mejia',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.supervisor)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get('/api/visitas/999999/recorrido/').status_code, 404)
+
+
+class VisitasCambiosTest(VisitasTestMixin, TestCase):
+    """
+    Feed de cambios (?since=): registro al confirmar, lápidas, alcance por
+    rol ante reasignaciones y cursor expirado
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Sin margen de lectura: los cambios recién confirmados son visibles
+        margen = mock.patch('apps.visitas.cambios.MARGEN_LECTURA', timedelta(0))
+        margen.start()
+        self.addCleanup(margen.stop)
+        self.otro_tecnico = Usuario.objects.create_user(
+            email='otro@skynet.com', nombre='Luis', apellido='Mejia',
+            password='tecni12345', rol=Usuario.RolChoices.TECNICO)
+        self.cursor = cursor_actual()
+
+    def feed(self, usuario, since=None, **params):
+        self.client.force_authenticate(usuario)
+        response = self.client.get('/api/visitas/cambios/', {
+            'since': self.cursor if since is None else since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def cambios(self, usuario, **params):
+        return {
+            (c['entidad'], c['id']): c for c in self.feed(usuario, **params)['cambios']}
+
+    def test_cursor_actual(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_visitas(1)
+        self.client.force_authenticate(self.admin)
+        data = self.client.get('/api/visitas/cambios/').json()['data']
+        self.assertEqual(data, {'cursor': cursor_actual(), 'hayMas': False, 'cambios': []})
+        self.assertGreater(data['cursor'], self.cursor)
+
+    def test_feed_y_paginacion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = self.crear_visitas(1, ejecuciones=2)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.descripcion = 'Actualizada'
+            visita.save()
+
+        data = self.feed(self.tecnico)
+        self.assertFalse(data['hayMas'])
+        ultimos = {(c['entidad'], c['id']): c for c in data['cambios']}
+        self.assertEqual(len(data['cambios']), 3)
+        self.assertEqual(
+            ultimos[('visita', visita.pk)]['datos']['descripcion'], 'Actualizada')
+        self.assertEqual(self.feed(self.tecnico, since=data['cursor'])['cambios'], [])
+
+        primera = self.feed(self.admin, limite=1)
+        self.assertTrue(primera['hayMas'])
+        self.assertEqual(len(primera['cambios']), 1)
+
+    def test_hueco_inicial_no_expira_el_cursor(self):
+        visitas = self.crear_visitas(3)
+        # Ids consumidos por transacciones revertidas: no son una purga
+        Cambio.objects.filter(objeto_id__in=[v.pk for v in visitas[:2]]).delete()
+        cambios = self.cambios(self.tecnico)
+        self.assertEqual(list(cambios), [('visita', visitas[2].pk)])
+
+    def test_rollback_no_registra(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.crear_visitas(1)
+                raise RuntimeError('falla antes del commit')
+        self.assertFalse(Cambio.objects.filter(id__gt=self.cursor).exists())
+
+    def test_lapidas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = self.crear_visitas(1, ejecuciones=1)[0]
+        claves = (('visita', visita.pk), ('ejecucion', visita.ejecuciones.get().pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.delete()
+        cambios = self.cambios(self.tecnico)
+        for clave in claves:
+            self.assertEqual(cambios[clave]['operacion'], 'eliminado')
+            self.assertIsNone(cambios[clave]['datos'])
+
+        # Un guardado cuya fila ya no existe también llega como baja
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente = Cliente.objects.create(
+                nombre='Temporal', contacto='Ana Lopez', telefono='12345678',
+                email='temporal@empresa.com', direccion='Zona 1, Guatemala City')
+        Cliente.objects.filter(pk=cliente.pk).delete()
+        self.assertEqual(
+            self.cambios(self.tecnico)[('cliente', cliente.pk)]['operacion'], 'eliminado')
+
+    def test_reasignacion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = self.crear_visitas(1, ejecuciones=1)[0]
+        ejecucion = visita.ejecuciones.get()
+        self.cursor = cursor_actual()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = Visita.objects.get(pk=visita.pk)
+            visita.tecnico = self.otro_tecnico
+            visita.save()
+
+        anterior = self.cambios(self.tecnico)
+        self.assertEqual(list(anterior), [('visita', visita.pk)])
+        self.assertEqual(anterior[('visita', visita.pk)]['operacion'], 'eliminado')
+
+        nuevo = self.cambios(self.otro_tecnico)
+        self.assertEqual(nuevo[('visita', visita.pk)]['operacion'], 'guardado')
+        self.assertEqual(nuevo[('ejecucion', ejecucion.pk)]['operacion'], 'guardado')
+
+        # El supervisor no cambió: sigue viéndola
+        supervisor = self.cambios(self.supervisor)
+        self.assertEqual(supervisor[('visita', visita.pk)]['operacion'], 'guardado')
+
+    def test_alcance_por_rol(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            propia = self.crear_visitas(1)[0]
+            ajena = self.crear_visitas(1, tecnico=self.otro_tecnico, supervisor=None)[0]
+            self.cliente.telefono = '87654321'
+            self.cliente.save()
+        self.assertEqual(
+            set(self.cambios(self.tecnico)),
+            {('visita', propia.pk), ('cliente', self.cliente.pk)})
+        self.assertEqual(
+            set(self.cambios(self.admin)),
+            {('visita', propia.pk), ('visita', ajena.pk), ('cliente', self.cliente.pk)})
+
+    def test_cursor_expirado(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_visitas(2)
+        purgar_cambios(timezone.now() + timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_visitas(1)
+        self.client.force_authenticate(self.tecnico)
+        response = self.client.get('/api/visitas/cambios/', {'since': self.cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertFalse(response.json()['success'])
+
+    def test_purga_por_prefijo(self):
+        self.crear_visitas(2)
+        vigente = cursor_actual()
+        total = Cambio.objects.count()
+        self.assertEqual(purgar_cambios(timezone.now() + timedelta(seconds=1)), total)
+        self.assertEqual(PurgaCambios.objects.get().hasta_id, vigente)
+        self.assertEqual(purgar_cambios(timezone.now() + timedelta(seconds=1)), 0)
+        self.assertEqual(PurgaCambios.objects.get().hasta_id, vigente)
+        # Quien ya tenía todo lo purgado sigue leyendo
+        self.assertEqual(self.feed(self.tecnico, since=vigente)['cambios'], [])
+
+    def test_parametros_invalidos(self):
+        self.client.force_authenticate(self.tecnico)
+        for params in ({'since': 'x'}, {'since': -1}, {'since': 0, 'limite': 0},
+                       {'since': 0, 'limite': 5000}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/visitas/cambios/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+class VisitasCambiosAtomicidadTest(VisitasTestMixin, TransactionTestCase):
+    """
+    Sin transacción abierta (autocommit), save() y las transiciones
+    confirman la fila y su cambio del feed juntos
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.visita = self.crear_visitas(1)[0]
+
+    def sin_feed(self):
+        return mock.patch.object(
+            Cambio.objects, 'bulk_create', side_effect=DatabaseError('sin feed'))
+
+    def test_save_sin_feed_no_confirma(self):
+        self.visita.descripcion = 'No debe quedar'
+        with self.sin_feed(), self.assertRaises(DatabaseError):
+            self.visita.save()
+        self.assertNotEqual(
+            Visita.objects.get(pk=self.visita.pk).descripcion, 'No debe quedar')
+
+        with self.sin_feed(), self.assertRaises(DatabaseError):
+            self.cliente.save()
+        cursor = cursor_actual()
+        self.cliente.save()
+        self.assertEqual(Cambio.objects.filter(id__gt=cursor).count(), 1)
+
+    def test_transicion_sin_feed_no_confirma(self):
+        with self.sin_feed(), self.assertRaises(DatabaseError):
+            Visita.objects.get(pk=self.visita.pk).iniciar()
+        self.assertEqual(
+            Visita.objects.get(pk=self.visita.pk).estado,
+            Visita.EstadoVisitaChoices.PROGRAMADA)
+
+
+class EventosBrokerTest(TestCase):
+    """
+    Reparto de eventos por supervisor, cierre por desborde y backends
+    """
+
+    def evento(self, supervisor_id):
+        return {'tipo': TIPO_TRANSICION, 'visitaId': 1, 'supervisorId': supervisor_id}
+
+    def test_reparte_por_supervisor(self):
+        broker = BrokerEventos()
+        broker.configurar(BackendLocal())
+
+        async def escenario():
+            todas = broker.suscribir(None)
+            propia = broker.suscribir(1)
+            ajena = broker.suscribir(2)
+            broker.distribuir(self.evento(1))
+            # Las entregas se agendan en el loop de cada suscripción
+            await asyncio.sleep(0)
+            return [s.cola.qsize() for s in (todas, propia, ajena)]
+
+        self.assertEqual(async_to_sync(escenario)(), [1, 1, 0])
+
+    def test_cancelar(self):
+        broker = BrokerEventos()
+        broker.configurar(BackendLocal())
+
+        async def escenario():
+            suscripcion = broker.suscribir(1)
+            total = broker.total_suscripciones
+            broker.cancelar(suscripcion)
+            broker.distribuir(self.evento(1))
+            await asyncio.sleep(0)
+            return total, broker.total_suscripciones, suscripcion.cola.qsize()
+
+        self.assertEqual(async_to_sync(escenario)(), (1, 0, 0))
+
+    def test_desborde_cierra_la_suscripcion(self):
+        async def escenario():
+            suscripcion = Suscripcion(maximo=2)
+            for _ in range(3):
+                suscripcion.entregar(self.evento(1))
+            return suscripcion.cerrada, await suscripcion.siguiente(1)
+
+        self.assertEqual(async_to_sync(escenario)(), (True, None))
+
+    def test_backend_local(self):
+        broker_eventos.configurar(BackendLocal())
+        self.addCleanup(broker_eventos.configurar, None)
+
+        async def escenario():
+            suscripcion = broker_eventos.suscribir(None)
+            try:
+                broker_eventos.publicar(self.evento(1))
+                return await suscripcion.siguiente(1)
+            finally:
+                broker_eventos.cancelar(suscripcion)
+
+        self.assertEqual(async_to_sync(escenario)(), self.evento(1))
+
+
+class EventosFeedTest(VisitasTestMixin, TestCase):
+    """
+    BackendFeed: solo transiciones, y nunca por una visita vista por
+    primera vez
+    """
+
+    def setUp(self):
+        super().setUp()
+        margen = mock.patch('apps.visitas.eventos.MARGEN_LECTURA', timedelta(0))
+        margen.start()
+        self.addCleanup(margen.stop)
+        self.backend = BackendFeed()
+        self.cursor = cursor_actual()
+
+    def leer(self):
+        self.cursor, eventos = self.backend._leer(self.cursor)
+        return eventos
+
+    def test_primera_vez_solo_registra(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = self.crear_visitas(1)[0]
+        self.assertEqual(self.leer(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.descripcion = 'Sin cambio de estado'
+            visita.save()
+        self.assertEqual(self.leer(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.iniciar()
+        eventos = self.leer()
+        self.assertEqual(len(eventos), 1)
+        self.assertEqual(eventos[0]['visitaId'], visita.id)
+        self.assertEqual(eventos[0]['estadoAnterior'], Visita.EstadoVisitaChoices.PROGRAMADA)
+        self.assertEqual(eventos[0]['estado'], Visita.EstadoVisitaChoices.EN_PROGRESO)
+        self.assertEqual(eventos[0]['supervisorId'], self.supervisor.id)
+
+    def test_transicion_de_visita_no_vista(self):
+        # Visita anterior al proceso: su primera lectura no se anuncia
+        visita = self.crear_visitas(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.iniciar()
+        self.assertEqual(self.leer(), [])
+        self.assertEqual(
+            self.backend._estados[visita.id], Visita.EstadoVisitaChoices.EN_PROGRESO)
+
+
+class EventosTicketTest(VisitasTestMixin, TestCase):
+
+    def pedir_ticket(self, usuario):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {emitir_tokens(usuario)["access"]}')
+        return self.client.post('/api/visitas/eventos/ticket/')
+
+    def test_emite_ticket(self):
+        for usuario in (self.admin, self.supervisor):
+            with self.subTest(usuario=usuario.email):
+                response = self.pedir_ticket(usuario)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()['data']
+                self.assertEqual(data['expiraEn'], 60)
+                self.assertTrue(data['ticket'])
+
+    def test_tecnico_sin_permisos(self):
+        response = self.pedir_ticket(self.tecnico)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.json()['success'])
+
+    def test_requiere_autenticacion(self):
+        self.assertIn(
+            self.client.post('/api/visitas/eventos/ticket/').status_code, (401, 403))
+
+    def test_ticket_no_autentica_la_api(self):
+        ticket = self.pedir_ticket(self.admin).json()['data']['ticket']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ticket}')
+        self.assertIn(self.client.get('/api/visitas/').status_code, (401, 403))
+
+
+class EventosStreamTest(VisitasTestMixin, TransactionTestCase):
+    """
+    Stream SSE: autenticación (ticket o header), permisos y cierre cuando
+    la sesión se revoca, la cuenta se desactiva o el token expira
+    """
+
+    def setUp(self):
+        super().setUp()
+        registro_revocaciones.reiniciar()
+        self.addCleanup(registro_revocaciones.reiniciar)
+
+    def stream(self, query_string=b'', headers=(), al_conectar=None):
+        """(status, cuerpo) del stream; ``al_conectar`` corre tras ``conectado``"""
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/visitas/eventos/',
+            'query_string': query_string, 'headers': list(headers),
+        }
+        mensajes = []
+
+        async def receive():
+            await asyncio.sleep(3600)
+
+        async def send(mensaje):
+            mensajes.append(mensaje)
+            if b'event: conectado' in mensaje.get('body', b'') and al_conectar:
+                await sync_to_async(al_conectar)()
+
+        async_to_sync(stream_eventos)(scope, receive, send)
+        cuerpo = b''.join(m.get('body', b'') for m in mensajes[1:]).decode()
+        return mensajes[0]['status'], cuerpo
+
+    def ticket(self, usuario):
+        access = emitir_tokens(usuario)['access']
+        return access, f'ticket={emitir_ticket_stream(access)}'.encode()
+
+    def test_sin_credenciales(self):
+        status, cuerpo = self.stream()
+        self.assertEqual(status, 401)
+        self.assertEqual(json.loads(cuerpo)['message'], 'Autenticación requerida')
+
+    def test_access_token_en_la_url_no_se_acepta(self):
+        access = emitir_tokens(self.admin)['access']
+        self.assertEqual(self.stream(f'token={access}'.encode())[0], 401)
+        # Tampoco como ticket
+        self.assertEqual(self.stream(f'ticket={access}'.encode())[0], 401)
+
+    def test_tecnico_sin_permisos(self):
+        _, query = self.ticket(self.tecnico)
+        self.assertEqual(self.stream(query)[0], 403)
+        access = emitir_tokens(self.tecnico)['access']
+        headers = [(b'authorization', f'Bearer {access}'.encode())]
+        self.assertEqual(self.stream(headers=headers)[0], 403)
+
+    @mock.patch('apps.visitas.sse.INTERVALO_HEARTBEAT', 0.05)
+    def test_cierra_al_revocar_el_token(self):
+        access, query = self.ticket(self.supervisor)
+        status, cuerpo = self.stream(query, al_conectar=lambda: revocar_access(access))
+
+        self.assertEqual(status, 200)
+        self.assertIn('event: conectado', cuerpo)
+        self.assertIn('event: desconectado', cuerpo)
+        self.assertIn('El token ha sido revocado.', cuerpo)
+
+    @mock.patch('apps.visitas.sse.INTERVALO_HEARTBEAT', 0.05)
+    def test_cierra_al_desactivar_la_cuenta(self):
+        _, query = self.ticket(self.supervisor)
+
+        def desactivar():
+            self.supervisor.activo = False
+            self.supervisor.save()
+
+        status, cuerpo = self.stream(query, al_conectar=desactivar)
+        self.assertEqual(status, 200)
+        self.assertIn('event: desconectado', cuerpo)
+
+    def test_cierra_al_expirar_el_token(self):
+        with self.settings(JWT_ACCESS_TOKEN_LIFETIME=timedelta(seconds=1)):
+            access = emitir_tokens(self.admin)['access']
+        headers = [(b'authorization', f'Bearer {access}'.encode())]
+
+        status, cuerpo = self.stream(headers=headers)
+        self.assertEqual(status, 200)
+        self.assertIn('event: desconectado', cuerpo)
+        self.assertIn('El token ha expirado.', cuerpo)
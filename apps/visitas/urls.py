@@ -6,7 +6,9 @@ from django.urls import path
 from .views import (
     # CRUD de visitas
     visitas_list_view,
+    visitas_export_view,
     visitas_create_view,
+    visitas_bulk_create_view,
     visitas_detail_view,
     visitas_update_view,
     visitas_delete_view,
@@ -14,6 +16,14 @@ from .views import (
     visitas_iniciar_view,
     visitas_completar_view,
     visitas_cancelar_view,
+    visitas_sync_view,
+    # Feed de cambios
+    cambios_view,
+    # Stream de eventos
+    eventos_ticket_view,
+    # Recorrido GPS
+    visitas_recorrido_create_view,
+    visitas_recorrido_view,
     # Ejecuciones
     visitas_ejecuciones_list_view,
     visitas_ejecuciones_create_view,
@@ -26,6 +36,12 @@ urlpatterns = [
     # CRUD de visitas - siguiendo la especificación del frontend
     path('', visitas_list_view, name='visitas_list'),
     path('create/', visitas_create_view, name='visitas_create'),
+    path('bulk-create/', visitas_bulk_create_view, name='visitas_bulk_create'),
+    path('export/', visitas_export_view, name='visitas_export'),
+    path('sync/', visitas_sync_view, name='visitas_sync'),
+    path('cambios/', cambios_view, name='visitas_cambios'),
+    path('eventos/ticket/', eventos_ticket_view, name='visitas_eventos_ticket'),
+    path('recorrido/', visitas_recorrido_create_view, name='visitas_recorrido_create'),
     path('<int:pk>/', visitas_detail_view, name='visitas_detail'),
     path('<int:pk>/update/', visitas_update_view, name='visitas_update'),
     path('<int:pk>/delete/', visitas_delete_view, name='visitas_delete'),
@@ -34,6 +50,7 @@ urlpatterns = [
     path('<int:pk>/iniciar/', visitas_iniciar_view, name='visitas_iniciar'),
     path('<int:pk>/completar/', visitas_completar_view, name='visitas_completar'),
     path('<int:pk>/cancelar/', visitas_cancelar_view, name='visitas_cancelar'),
+    path('<int:pk>/recorrido/', visitas_recorrido_view, name='visitas_recorrido'),
     
     # Ejecuciones de visitas
     path('<int:pk>/ejecuciones/', visitas_ejecuciones_list_view, name='visitas_ejecuciones_list'),
@@ -2,15 +2,46 @@
 SKYNET - Vistas del módulo de visitas
 """
 
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Visita, Ejecucion
+from apps.utils.pagination import KeysetPaginator, CursorInvalido
+from apps.utils.projection import CampoProyeccionInvalido
+from apps.usuarios.tokens import VIGENCIA_TICKET_STREAM, emitir_ticket_stream
+from .export import (
+    FORMATOS_EXPORTACION,
+    iterar_visitas,
+    generar_csv,
+    generar_ndjson
+)
+from .filters import visitas_visibles_para, filtrar_visitas
+from .programacion import MAX_VISITAS_POR_LOTE, crear_visitas_en_lote
+from .sincronizacion import ERROR, MAX_OPERACIONES_SYNC, Sincronizacion
+from .cambios import (
+    LIMITE_CAMBIOS,
+    MAX_LIMITE_CAMBIOS,
+    CursorExpirado,
+    cursor_actual,
+    leer_cambios,
+    serializar_cambios
+)
+from .recorrido import (
+    MAX_PUNTOS_LOTE,
+    MAX_PUNTOS_RECORRIDO,
+    TOLERANCIA_METROS,
+    obtener_recorrido,
+    registrar_puntos
+)
+from .models import TransicionConflicto, Visita, Ejecucion
 from .serializers import (
+    VISITA_PROYECCION,
     VisitaSerializer,
     VisitaCreateSerializer,
     VisitaUpdateSerializer,
@@ -21,6 +52,11 @@ from .serializers import (
 )
 
 
+# Orden estable del listado: el id desempata visitas con la misma fecha
+VISITAS_LIST_ORDERING = ['-fecha_programada', 'id']
+VISITAS_LIST_FIELDS = [campo.lstrip('-') for campo in VISITAS_LIST_ORDERING]
+
+
 # ==============================================================================
 # CRUD DE VISITAS
 # ==============================================================================
@@ -71,6 +107,31 @@ from .serializers import (
             type=openapi.TYPE_STRING,
             format=openapi.FORMAT_DATE
         ),
+        openapi.Parameter(
+            'cursor',
+            openapi.IN_QUERY,
+            description="Cursor opaco de la página siguiente (pagination.next_cursor)",
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'page_size',
+            openapi.IN_QUERY,
+            description="Cantidad de visitas por página (máximo 100)",
+            type=openapi.TYPE_INTEGER
+        ),
+        openapi.Parameter(
+            'view',
+            openapi.IN_QUERY,
+            description="Vista compacta para grids (sin objetos anidados)",
+            type=openapi.TYPE_STRING,
+            enum=['compact']
+        ),
+        openapi.Parameter(
+            'fields',
+            openapi.IN_QUERY,
+            description="Campos a devolver separados por coma (ej. idVisita,fechaProgramada,estado)",
+            type=openapi.TYPE_STRING
+        ),
     ],
     responses={
         200: openapi.Response(
@@ -98,7 +159,12 @@ from .serializers import (
                         }
                     ],
                     "message": "Visitas obtenidas exitosamente",
-                    "errors": []
+                    "errors": [],
+                    "pagination": {
+                        "next_cursor": "WyIyMDI1LTEwLTI1VDEwOjAwOjAwWiIsMV0",
+                        "has_more": True,
+                        "page_size": 20
+                    }
                 }
             }
         )
@@ -111,58 +177,153 @@ def visitas_list_view(request):
     """
     Vista para listar visitas con filtros
     """
-    # Obtener queryset base
-    queryset = Visita.objects.select_related(
-        'cliente', 'tecnico', 'supervisor').all()
+    # Modo compacto: proyección en SQL sin objetos anidados
+    try:
+        campos = VISITA_PROYECCION.claves_solicitadas(request.GET)
+    except CampoProyeccionInvalido as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en los campos solicitados',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Filtrar por rol del usuario
-    if request.user.es_tecnico:
-        # Los técnicos solo ven sus propias visitas
-        queryset = queryset.filter(tecnico=request.user)
-    elif request.user.es_supervisor:
-        # Los supervisores ven visitas que supervisan o técnicos bajo su supervisión
-        queryset = queryset.filter(supervisor=request.user)
-    # Los administradores ven todas las visitas
+    # Obtener queryset base filtrado por rol del usuario
+    queryset = visitas_visibles_para(request.user, Visita.objects.all())
 
     # Aplicar filtros
-    estado = request.GET.get('estado')
-    if estado:
-        queryset = queryset.filter(estado=estado)
-
-    tipo_visita = request.GET.get('tipo_visita')
-    if tipo_visita:
-        queryset = queryset.filter(tipo_visita=tipo_visita)
-
-    tecnico_id = request.GET.get('tecnico_id')
-    if tecnico_id:
-        queryset = queryset.filter(tecnico_id=tecnico_id)
-
-    cliente_id = request.GET.get('cliente_id')
-    if cliente_id:
-        queryset = queryset.filter(cliente_id=cliente_id)
-
-    fecha_desde = request.GET.get('fecha_desde')
-    if fecha_desde:
-        queryset = queryset.filter(fecha_programada__date__gte=fecha_desde)
+    try:
+        queryset = filtrar_visitas(queryset, request.GET)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en los filtros',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    fecha_hasta = request.GET.get('fecha_hasta')
-    if fecha_hasta:
-        queryset = queryset.filter(fecha_programada__date__lte=fecha_hasta)
+    if campos is None:
+        queryset = VisitaSerializer.setup_eager_loading(queryset)
+    else:
+        queryset = VISITA_PROYECCION.values(
+            queryset, campos, internos=VISITAS_LIST_FIELDS)
 
-    # Ordenar por fecha programada
-    queryset = queryset.order_by('-fecha_programada')
+    # Paginación keyset por fecha programada (sin COUNT ni OFFSET)
+    paginator = KeysetPaginator(VISITAS_LIST_ORDERING)
+    try:
+        visitas, siguiente = paginator.paginate_queryset(queryset, request)
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la paginación',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     # Serializar datos
-    serializer = VisitaSerializer(queryset, many=True)
+    if campos is None:
+        data = VisitaSerializer(visitas, many=True).data
+    else:
+        data = VISITA_PROYECCION.representar(visitas, campos)
 
     return Response({
         'success': True,
-        'data': serializer.data,
+        'data': data,
         'message': 'Visitas obtenidas exitosamente',
-        'errors': []
+        'errors': [],
+        'pagination': paginator.get_pagination_data(siguiente)
     }, status=status.HTTP_200_OK)
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Exportar visitas en streaming (NDJSON o CSV). Acepta los mismos "
+        "filtros que el listado y respeta el alcance por rol."
+    ),
+    operation_summary="Exportar Visitas",
+    manual_parameters=[
+        openapi.Parameter(
+            'formato',
+            openapi.IN_QUERY,
+            description="Formato de salida",
+            type=openapi.TYPE_STRING,
+            enum=['ndjson', 'csv'],
+            default='ndjson'
+        ),
+        openapi.Parameter(
+            'ejecuciones',
+            openapi.IN_QUERY,
+            description="Incluir las ejecuciones de cada visita",
+            type=openapi.TYPE_BOOLEAN
+        ),
+        openapi.Parameter(
+            'fields',
+            openapi.IN_QUERY,
+            description="Columnas a exportar separadas por coma",
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter('estado', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        openapi.Parameter('tipo_visita', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        openapi.Parameter('tecnico_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        openapi.Parameter('cliente_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        openapi.Parameter('fecha_desde', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          format=openapi.FORMAT_DATE),
+        openapi.Parameter('fecha_hasta', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          format=openapi.FORMAT_DATE),
+    ],
+    responses={
+        200: openapi.Response(description="Archivo NDJSON/CSV en streaming"),
+        400: openapi.Response(description="Parámetros inválidos")
+    },
+    tags=['Visitas']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def visitas_export_view(request):
+    """
+    Vista para exportar visitas en streaming
+    """
+    formato = request.GET.get('formato', 'ndjson').lower()
+    if formato not in FORMATOS_EXPORTACION:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Formato no soportado',
+            'errors': [f"Formatos disponibles: {', '.join(FORMATOS_EXPORTACION)}"]
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    incluir_ejecuciones = request.GET.get(
+        'ejecuciones', 'false').lower() == 'true'
+
+    try:
+        campos = VISITA_PROYECCION.claves_solicitadas(
+            request.GET) or list(VISITA_PROYECCION.campos)
+        queryset = filtrar_visitas(
+            visitas_visibles_para(request.user, Visita.objects.all()),
+            request.GET
+        ).order_by(*VISITAS_LIST_ORDERING)
+    except (CampoProyeccionInvalido, ValueError) as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en los filtros',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    visitas = iterar_visitas(queryset, campos, incluir_ejecuciones)
+    if formato == 'csv':
+        contenido = generar_csv(visitas, campos, incluir_ejecuciones)
+    else:
+        contenido = generar_ndjson(visitas)
+
+    response = StreamingHttpResponse(
+        contenido, content_type=FORMATOS_EXPORTACION[formato])
+    nombre = f"visitas-{timezone.localdate():%Y%m%d}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
 @swagger_auto_schema(
     method='post',
     operation_description="Crear una nueva visita en el sistema",
@@ -267,6 +428,138 @@ def visitas_create_view(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Programar varias visitas en una sola solicitud. Valida técnicos, "
+        "supervisores, clientes y conflictos de agenda para todo el lote. "
+        "Por defecto es todo o nada; con permitir_parcial se insertan las "
+        "visitas válidas y se reportan los errores por elemento."
+    ),
+    operation_summary="Crear Visitas en Lote",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['visitas'],
+        properties={
+            'visitas': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                description='Visitas con el mismo formato que Crear Visita'
+            ),
+            'permitir_parcial': openapi.Schema(
+                type=openapi.TYPE_BOOLEAN,
+                description='Insertar las visitas válidas aunque otras fallen'
+            ),
+        }
+    ),
+    responses={
+        201: openapi.Response(
+            description="Visitas creadas",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {
+                        "total_creadas": 1,
+                        "creadas": [{"indice": 0, "idVisita": 10}]
+                    },
+                    "message": "Visitas creadas exitosamente",
+                    "errors": []
+                }
+            }
+        ),
+        400: openapi.Response(
+            description="Errores por elemento",
+            examples={
+                "application/json": {
+                    "success": False,
+                    "data": None,
+                    "message": "Error en la validación del lote",
+                    "errors": [
+                        {
+                            "indice": 1,
+                            "errores": {"tecnico": ["El técnico ya tiene visitas programadas para 2025-10-25."]}
+                        }
+                    ]
+                }
+            }
+        ),
+        403: openapi.Response(description="Sin permisos")
+    },
+    tags=['Visitas']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def visitas_bulk_create_view(request):
+    """
+    Vista para crear visitas en lote
+    """
+    # Verificar permisos (administradores y supervisores pueden crear visitas)
+    if not (request.user.es_administrador or request.user.es_supervisor):
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'No tienes permisos para crear visitas',
+            'errors': ['Solo administradores y supervisores pueden crear visitas']
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    # Un cuerpo JSON que no es un objeto (p. ej. una lista) no trae 'visitas'
+    datos = request.data if isinstance(request.data, dict) else {}
+    items = datos.get('visitas')
+    if not isinstance(items, list) or not items:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del lote',
+            'errors': ['Debe proporcionar una lista de visitas']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(items) > MAX_VISITAS_POR_LOTE:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del lote',
+            'errors': [f'El lote no puede tener más de {MAX_VISITAS_POR_LOTE} visitas']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        permitir_parcial = serializers.BooleanField().to_internal_value(
+            datos.get('permitir_parcial', False))
+    except serializers.ValidationError as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del lote',
+            'errors': [f'permitir_parcial: {e.detail[0]}']
+        }, status=status.HTTP_400_BAD_REQUEST)
+    creadas, errores = crear_visitas_en_lote(items, permitir_parcial)
+
+    errores_lista = [
+        {'indice': indice, 'errores': errores[indice]}
+        for indice in sorted(errores)
+    ]
+
+    if not creadas:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del lote',
+            'errors': errores_lista
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'data': {
+            'total_creadas': len(creadas),
+            'creadas': [
+                {'indice': indice, 'idVisita': visita.pk}
+                for indice, visita in creadas
+            ]
+        },
+        'message': 'Visitas creadas exitosamente',
+        'errors': errores_lista
+    }, status=status.HTTP_201_CREATED)
+
+
 @swagger_auto_schema(
     method='get',
     operation_description="Obtener detalles de una visita específica",
@@ -284,8 +577,8 @@ def visitas_detail_view(request, pk):
     Vista para obtener detalles de una visita
     """
     try:
-        visita = Visita.objects.select_related(
-            'cliente', 'tecnico', 'supervisor').prefetch_related('ejecuciones').get(pk=pk)
+        visita = VisitaSerializer.setup_eager_loading(
+            Visita.objects.all()).get(pk=pk)
     except Visita.DoesNotExist:
         return Response({
             'success': False,
@@ -430,6 +723,31 @@ def visitas_delete_view(request, pk):
 # WORKFLOW DE VISITAS
 # ==============================================================================
 
+def _visita_workflow(pk):
+    """Visita con las relaciones que incluye la respuesta del workflow"""
+    return Visita.objects.select_related(
+        'cliente', 'tecnico', 'supervisor'
+    ).prefetch_related('ejecuciones').get(pk=pk)
+
+
+def _visita_no_encontrada_response():
+    return Response({
+        'success': False,
+        'data': None,
+        'message': 'Visita no encontrada',
+        'errors': ['La visita no existe']
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+def _conflicto_response(mensaje, error):
+    """409: otra request cambió el estado de la visita primero"""
+    return Response({
+        'success': False,
+        'data': {'estado': error.estado_actual},
+        'message': mensaje,
+        'errors': [str(error)]
+    }, status=status.HTTP_409_CONFLICT)
+
 @swagger_auto_schema(
     method='post',
     operation_description="Iniciar una visita programada",
@@ -438,7 +756,8 @@ def visitas_delete_view(request, pk):
     responses={
         200: openapi.Response(description="Visita iniciada exitosamente"),
         400: openapi.Response(description="Error en el workflow"),
-        404: openapi.Response(description="Visita no encontrada")
+        404: openapi.Response(description="Visita no encontrada"),
+        409: openapi.Response(description="Otra operación cambió el estado de la visita")
     },
     tags=['Workflow Visitas']
 )
@@ -449,17 +768,12 @@ def visitas_iniciar_view(request, pk):
     Vista para iniciar una visita programada
     """
     try:
-        visita = Visita.objects.get(pk=pk)
+        visita = _visita_workflow(pk)
     except Visita.DoesNotExist:
-        return Response({
-            'success': False,
-            'data': None,
-            'message': 'Visita no encontrada',
-            'errors': ['La visita no existe']
-        }, status=status.HTTP_404_NOT_FOUND)
+        return _visita_no_encontrada_response()
 
     # Verificar que solo el técnico asignado puede iniciar
-    if visita.tecnico != request.user:
+    if visita.tecnico_id != request.user.id:
         return Response({
             'success': False,
             'data': None,
@@ -467,27 +781,19 @@ def visitas_iniciar_view(request, pk):
             'errors': ['Solo el técnico asignado puede iniciar la visita']
         }, status=status.HTTP_403_FORBIDDEN)
 
-    try:
-        # Actualizar coordenadas si se proporcionan
-        serializer = VisitaWorkflowSerializer(data=request.data)
-        if serializer.is_valid():
-            data = serializer.validated_data
-            if data.get('latitud') and data.get('longitud'):
-                visita.latitud = data['latitud']
-                visita.longitud = data['longitud']
-            if data.get('observaciones'):
-                visita.observaciones = data['observaciones']
-
-        visita.iniciar()
-        response_serializer = VisitaSerializer(visita)
-
-        return Response({
-            'success': True,
-            'data': response_serializer.data,
-            'message': 'Visita iniciada exitosamente',
-            'errors': []
-        }, status=status.HTTP_200_OK)
+    # Coordenadas y observaciones opcionales (se escriben en el mismo UPDATE)
+    cambios = {}
+    serializer = VisitaWorkflowSerializer(data=request.data)
+    if serializer.is_valid():
+        data = serializer.validated_data
+        if data.get('latitud') and data.get('longitud'):
+            cambios['latitud'] = data['latitud']
+            cambios['longitud'] = data['longitud']
+        if data.get('observaciones'):
+            cambios['observaciones'] = data['observaciones']
 
+    try:
+        visita.iniciar(**cambios)
     except ValidationError as e:
         return Response({
             'success': False,
@@ -495,6 +801,19 @@ def visitas_iniciar_view(request, pk):
             'message': 'Error al iniciar la visita',
             'errors': [str(e)]
         }, status=status.HTTP_400_BAD_REQUEST)
+    except TransicionConflicto as e:
+        return _conflicto_response('La visita fue modificada por otra operación', e)
+    except Visita.DoesNotExist:
+        return _visita_no_encontrada_response()
+
+    response_serializer = VisitaSerializer(visita)
+
+    return Response({
+        'success': True,
+        'data': response_serializer.data,
+        'message': 'Visita iniciada exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
 
 
 @swagger_auto_schema(
@@ -504,7 +823,8 @@ def visitas_iniciar_view(request, pk):
     request_body=VisitaWorkflowSerializer,
     responses={
         200: openapi.Response(description="Visita completada exitosamente"),
-        400: openapi.Response(description="Error en el workflow")
+        400: openapi.Response(description="Error en el workflow"),
+        409: openapi.Response(description="Otra operación cambió el estado de la visita")
     },
     tags=['Workflow Visitas']
 )
@@ -515,17 +835,12 @@ def visitas_completar_view(request, pk):
     Vista para completar una visita en progreso
     """
     try:
-        visita = Visita.objects.get(pk=pk)
+        visita = _visita_workflow(pk)
     except Visita.DoesNotExist:
-        return Response({
-            'success': False,
-            'data': None,
-            'message': 'Visita no encontrada',
-            'errors': ['La visita no existe']
-        }, status=status.HTTP_404_NOT_FOUND)
+        return _visita_no_encontrada_response()
 
     # Verificar que solo el técnico asignado puede completar
-    if visita.tecnico != request.user:
+    if visita.tecnico_id != request.user.id:
         return Response({
             'success': False,
             'data': None,
@@ -533,28 +848,18 @@ def visitas_completar_view(request, pk):
             'errors': ['Solo el técnico asignado puede completar la visita']
         }, status=status.HTTP_403_FORBIDDEN)
 
-    try:
-        serializer = VisitaWorkflowSerializer(data=request.data)
-        if serializer.is_valid():
-            data = serializer.validated_data
-            observaciones = data.get('observaciones')
-
-            # Actualizar coordenadas finales si se proporcionan
-            if data.get('latitud') and data.get('longitud'):
-                visita.latitud = data['latitud']
-                visita.longitud = data['longitud']
-                visita.save()
-
-        visita.completar(observaciones)
-        response_serializer = VisitaSerializer(visita)
-
-        return Response({
-            'success': True,
-            'data': response_serializer.data,
-            'message': 'Visita completada exitosamente',
-            'errors': []
-        }, status=status.HTTP_200_OK)
+    # Observaciones y coordenadas finales opcionales (mismo UPDATE)
+    cambios = {}
+    serializer = VisitaWorkflowSerializer(data=request.data)
+    if serializer.is_valid():
+        data = serializer.validated_data
+        cambios['observaciones'] = data.get('observaciones')
+        if data.get('latitud') and data.get('longitud'):
+            cambios['latitud'] = data['latitud']
+            cambios['longitud'] = data['longitud']
 
+    try:
+        visita.completar(**cambios)
     except ValidationError as e:
         return Response({
             'success': False,
@@ -562,6 +867,19 @@ def visitas_completar_view(request, pk):
             'message': 'Error al completar la visita',
             'errors': [str(e)]
         }, status=status.HTTP_400_BAD_REQUEST)
+    except TransicionConflicto as e:
+        return _conflicto_response('La visita fue modificada por otra operación', e)
+    except Visita.DoesNotExist:
+        return _visita_no_encontrada_response()
+
+    response_serializer = VisitaSerializer(visita)
+
+    return Response({
+        'success': True,
+        'data': response_serializer.data,
+        'message': 'Visita completada exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
 
 
 @swagger_auto_schema(
@@ -580,7 +898,8 @@ def visitas_completar_view(request, pk):
     ),
     responses={
         200: openapi.Response(description="Visita cancelada exitosamente"),
-        400: openapi.Response(description="Error en el workflow")
+        400: openapi.Response(description="Error en el workflow"),
+        409: openapi.Response(description="Otra operación cambió el estado de la visita")
     },
     tags=['Workflow Visitas']
 )
@@ -591,17 +910,12 @@ def visitas_cancelar_view(request, pk):
     Vista para cancelar una visita
     """
     try:
-        visita = Visita.objects.get(pk=pk)
+        visita = _visita_workflow(pk)
     except Visita.DoesNotExist:
-        return Response({
-            'success': False,
-            'data': None,
-            'message': 'Visita no encontrada',
-            'errors': ['La visita no existe']
-        }, status=status.HTTP_404_NOT_FOUND)
+        return _visita_no_encontrada_response()
 
     # Verificar permisos (técnico asignado o supervisor)
-    if not (visita.tecnico == request.user or request.user.es_administrador or request.user.es_supervisor):
+    if not (visita.tecnico_id == request.user.id or request.user.es_administrador or request.user.es_supervisor):
         return Response({
             'success': False,
             'data': None,
@@ -620,23 +934,481 @@ def visitas_cancelar_view(request, pk):
 
     try:
         visita.cancelar(motivo)
-        response_serializer = VisitaSerializer(visita)
+    except ValidationError as e:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error al cancelar la visita',
+            'errors': [str(e)]
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except TransicionConflicto as e:
+        return _conflicto_response('La visita fue modificada por otra operación', e)
+    except Visita.DoesNotExist:
+        return _visita_no_encontrada_response()
+
+    response_serializer = VisitaSerializer(visita)
 
+    return Response({
+        'success': True,
+        'data': response_serializer.data,
+        'message': 'Visita cancelada exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# SINCRONIZACIÓN OFFLINE
+# ==============================================================================
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Aplica la cola de operaciones registradas sin conexión por la app "
+        "móvil (iniciar, completar, cancelar, crear_ejecucion, "
+        "actualizar_ejecucion) en orden. Cada visita se procesa en su propia "
+        "transacción: si una operación falla, las demás de esa visita se "
+        "revierten. Los reenvíos son idempotentes (estado 'ya_aplicada')."
+    ),
+    operation_summary="Sincronizar Operaciones Offline",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['operaciones'],
+        properties={
+            'operaciones': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description=f'Operaciones en orden (máximo {MAX_OPERACIONES_SYNC})',
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'id': openapi.Schema(type=openapi.TYPE_STRING, description='Id de la operación en el dispositivo'),
+                        'tipo': openapi.Schema(type=openapi.TYPE_STRING, enum=[
+                            'iniciar', 'completar', 'cancelar',
+                            'crear_ejecucion', 'actualizar_ejecucion']),
+                        'visita': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'ejecucion': openapi.Schema(type=openapi.TYPE_INTEGER, description='Id del servidor (actualizar_ejecucion)'),
+                        'ejecucion_local': openapi.Schema(type=openapi.TYPE_STRING, description='id_local de una ejecución creada offline'),
+                        'datos': openapi.Schema(type=openapi.TYPE_OBJECT, description='Campos de la operación (fecha, latitud, longitud, observaciones, motivo, id_local, descripcion, tiempo_inicio, tiempo_fin, completada, evidencia_foto)'),
+                    }
+                )
+            ),
+        }
+    ),
+    responses={
+        200: openapi.Response(
+            description="Resultado por operación",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {
+                        "resultados": [
+                            {"indice": 0, "id": "op-1", "tipo": "iniciar", "visitaId": 5,
+                             "estado": "aplicada", "errores": {}},
+                            {"indice": 1, "id": "op-2", "tipo": "crear_ejecucion", "visitaId": 5,
+                             "estado": "aplicada", "errores": {},
+                             "idEjecucion": 31, "idLocal": "tmp-1"}
+                        ],
+                        "idsEjecuciones": {"tmp-1": 31}
+                    },
+                    "message": "Sincronización completada",
+                    "errors": []
+                }
+            }
+        ),
+        400: openapi.Response(description="Solicitud inválida")
+    },
+    tags=['Workflow Visitas']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def visitas_sync_view(request):
+    """
+    Vista para sincronizar la cola offline de un técnico
+    """
+    datos = request.data if isinstance(request.data, dict) else {}
+    operaciones = datos.get('operaciones')
+    if not isinstance(operaciones, list) or not operaciones:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación de la sincronización',
+            'errors': ['Debe proporcionar una lista de operaciones']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(operaciones) > MAX_OPERACIONES_SYNC:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación de la sincronización',
+            'errors': [f'No se pueden sincronizar más de {MAX_OPERACIONES_SYNC} operaciones']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    sincronizacion = Sincronizacion(request.user, operaciones)
+    resultados = sincronizacion.ejecutar()
+    errores = [r for r in resultados if r['estado'] == ERROR]
+
+    return Response({
+        'success': not errores,
+        'data': {
+            'resultados': resultados,
+            'idsEjecuciones': sincronizacion.ids_ejecuciones,
+        },
+        'message': (
+            'Sincronización completada' if not errores
+            else 'Sincronización completada con errores'
+        ),
+        'errors': errores
+    }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# FEED DE CAMBIOS
+# ==============================================================================
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Cambios de visitas, ejecuciones y clientes posteriores al cursor "
+        "`since`, filtrados por rol, para sincronizar sin volver a descargar "
+        "las listas. Cada objeto aparece una vez con su estado actual en "
+        "`datos` (operación `guardado`) o como lápida (`eliminado`; también "
+        "cuando una visita se reasigna a otro técnico o supervisor; sus "
+        "ejecuciones se descartan con ella). Sin `since` solo retorna el "
+        "cursor actual: descargar las listas y continuar desde ese cursor. "
+        "Con `hayMas` se repite la consulta con el `cursor` retornado. "
+        "410 si el cursor es anterior a los cambios conservados."
+    ),
+    operation_summary="Feed de Cambios",
+    manual_parameters=[
+        openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description='Último cursor recibido'),
+        openapi.Parameter('limite', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description=f'Cambios por página (por defecto {LIMITE_CAMBIOS}, máximo {MAX_LIMITE_CAMBIOS})'),
+    ],
+    responses={
+        200: openapi.Response(
+            description="Cambios posteriores al cursor",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {
+                        "cursor": 1042,
+                        "hayMas": False,
+                        "cambios": [
+                            {"secuencia": 1040, "entidad": "visita", "id": 12,
+                             "operacion": "guardado", "fecha": "2025-10-25T10:00:00Z",
+                             "datos": {"idVisita": 12, "estado": "EN_PROGRESO"}},
+                            {"secuencia": 1042, "entidad": "visita", "id": 9,
+                             "operacion": "eliminado", "fecha": "2025-10-25T10:01:00Z",
+                             "datos": None}
+                        ]
+                    },
+                    "message": "Cambios obtenidos exitosamente",
+                    "errors": []
+                }
+            }
+        ),
+        400: openapi.Response(description="Parámetros inválidos"),
+        410: openapi.Response(description="Cursor expirado: resincronizar las listas completas")
+    },
+    tags=['Visitas']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cambios_view(request):
+    """
+    Vista del feed de cambios para sincronización incremental
+    """
+    try:
+        desde = request.GET.get('since')
+        desde = int(desde) if desde not in (None, '') else None
+        limite = int(request.GET.get('limite') or LIMITE_CAMBIOS)
+        if (desde is not None and desde < 0) or not 1 <= limite <= MAX_LIMITE_CAMBIOS:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Parámetros inválidos',
+            'errors': [f'since debe ser un entero >= 0 y limite un entero entre 1 y {MAX_LIMITE_CAMBIOS}']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if desde is None:
         return Response({
             'success': True,
-            'data': response_serializer.data,
-            'message': 'Visita cancelada exitosamente',
+            'data': {'cursor': cursor_actual(), 'hayMas': False, 'cambios': []},
+            'message': 'Cursor actual del feed de cambios',
             'errors': []
         }, status=status.HTTP_200_OK)
 
-    except ValidationError as e:
+    try:
+        cambios, hay_mas = leer_cambios(request.user, desde, limite)
+    except CursorExpirado as e:
         return Response({
             'success': False,
             'data': None,
-            'message': 'Error al cancelar la visita',
+            'message': 'Cursor expirado',
             'errors': [str(e)]
+        }, status=status.HTTP_410_GONE)
+
+    return Response({
+        'success': True,
+        'data': {
+            'cursor': cambios[-1].id if cambios else desde,
+            'hayMas': hay_mas,
+            'cambios': serializar_cambios(request.user, cambios),
+        },
+        'message': 'Cambios obtenidos exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# STREAM DE EVENTOS
+# ==============================================================================
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Emite un ticket para abrir el stream de eventos de visitas "
+        "(`GET /api/visitas/eventos/?ticket=`). EventSource no permite "
+        "headers: el ticket evita poner el access token en la URL. Vence "
+        f"en {int(VIGENCIA_TICKET_STREAM.total_seconds())} segundos (solo "
+        "sirve para conectar); el stream se cierra con el evento "
+        "`desconectado` cuando la sesión del access token expira o se "
+        "revoca. Solo administradores y supervisores."
+    ),
+    operation_summary="Ticket del Stream de Eventos",
+    responses={
+        200: openapi.Response(
+            description="Ticket emitido",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {"ticket": "eyJhbGciOi...", "expiraEn": 60},
+                    "message": "Ticket emitido exitosamente",
+                    "errors": []
+                }
+            }
+        ),
+        403: openapi.Response(description="Sin permisos para recibir eventos")
+    },
+    tags=['Visitas']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def eventos_ticket_view(request):
+    """
+    Vista para emitir el ticket del stream de eventos
+    """
+    if not (request.user.es_administrador or request.user.es_supervisor):
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'No tienes permisos para recibir eventos',
+            'errors': ['Solo administradores y supervisores']
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        'success': True,
+        'data': {
+            # request.auth es el access token ya autenticado
+            'ticket': emitir_ticket_stream(request.auth),
+            'expiraEn': int(VIGENCIA_TICKET_STREAM.total_seconds()),
+        },
+        'message': 'Ticket emitido exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
+
+# ==============================================================================
+# RECORRIDO GPS
+# ==============================================================================
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Registra por lotes las posiciones GPS tomadas por la app durante "
+        "visitas en progreso (o recién completadas) del técnico. Los puntos "
+        "inválidos se reportan por índice sin rechazar el lote; reenviar "
+        "puntos ya registrados (misma visita y fecha) no los duplica."
+    ),
+    operation_summary="Registrar Puntos de Recorrido",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['puntos'],
+        properties={
+            'puntos': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description=f'Posiciones (máximo {MAX_PUNTOS_LOTE})',
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    required=['visita', 'fecha', 'latitud', 'longitud'],
+                    properties={
+                        'visita': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'fecha': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'latitud': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'longitud': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'precision': openapi.Schema(type=openapi.TYPE_NUMBER, description='Precisión en metros'),
+                    }
+                )
+            ),
+        }
+    ),
+    responses={
+        201: openapi.Response(
+            description="Puntos registrados",
+            examples={
+                "application/json": {
+                    "success": True,
+                    "data": {"recibidos": 3, "aceptados": 2, "rechazados": [
+                        {"indice": 2, "error": "latitud fuera de rango (±90)."}
+                    ]},
+                    "message": "Puntos de recorrido registrados",
+                    "errors": []
+                }
+            }
+        ),
+        400: openapi.Response(description="Solicitud inválida")
+    },
+    tags=['Workflow Visitas']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def visitas_recorrido_create_view(request):
+    """
+    Vista para registrar posiciones GPS de las visitas de un técnico
+    """
+    datos = request.data if isinstance(request.data, dict) else {}
+    puntos = datos.get('puntos')
+    if not isinstance(puntos, list) or not puntos:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del recorrido',
+            'errors': ['Debe proporcionar una lista de puntos']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(puntos) > MAX_PUNTOS_LOTE:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Error en la validación del recorrido',
+            'errors': [f'No se pueden registrar más de {MAX_PUNTOS_LOTE} puntos por solicitud']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    aceptados, rechazados = registrar_puntos(request.user, puntos)
+
+    return Response({
+        'success': True,
+        'data': {
+            'recibidos': len(puntos),
+            'aceptados': aceptados,
+            'rechazados': rechazados,
+        },
+        'message': 'Puntos de recorrido registrados',
+        'errors': []
+    }, status=status.HTTP_201_CREATED)
+
+
+def _parametros_recorrido(params):
+    """(desde, hasta, tolerancia, max_puntos) de la query string"""
+    errores = []
+    fechas = []
+    for nombre in ('desde', 'hasta'):
+        valor = params.get(nombre)
+        fecha = None
+        if valor:
+            try:
+                fecha = parse_datetime(valor)
+            except ValueError:
+                # Bien formada pero inexistente (p. ej. 2024-02-30)
+                fecha = None
+            if fecha is None:
+                errores.append(f'{nombre} debe ser un datetime ISO 8601')
+            elif timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+        fechas.append(fecha)
+
+    tolerancia = TOLERANCIA_METROS
+    if params.get('tolerancia'):
+        try:
+            tolerancia = float(params['tolerancia'])
+            if not 0 <= tolerancia <= 1000:
+                raise ValueError
+        except ValueError:
+            errores.append('tolerancia debe ser un número entre 0 y 1000 (metros)')
+
+    max_puntos = MAX_PUNTOS_RECORRIDO
+    if params.get('max_puntos'):
+        try:
+            max_puntos = int(params['max_puntos'])
+            if not 2 <= max_puntos <= MAX_PUNTOS_LOTE:
+                raise ValueError
+        except ValueError:
+            errores.append(f'max_puntos debe ser un entero entre 2 y {MAX_PUNTOS_LOTE}')
+
+    return fechas[0], fechas[1], tolerancia, max_puntos, errores
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Recorrido GPS de una visita en orden cronológico, simplificado: se "
+        "omiten los puntos a menos de `tolerancia` metros de la línea entre "
+        "sus vecinos y se limita a `max_puntos`."
+    ),
+    operation_summary="Obtener Recorrido de Visita",
+    manual_parameters=[
+        openapi.Parameter('desde', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        openapi.Parameter('hasta', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        openapi.Parameter('tolerancia', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                          description=f'Metros (por defecto {TOLERANCIA_METROS:g}; 0 = sin simplificar)'),
+        openapi.Parameter('max_puntos', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description=f'Por defecto {MAX_PUNTOS_RECORRIDO}'),
+    ],
+    responses={
+        200: openapi.Response(description="Recorrido de la visita"),
+        400: openapi.Response(description="Parámetros inválidos"),
+        404: openapi.Response(description="Visita no encontrada")
+    },
+    tags=['Visitas']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def visitas_recorrido_view(request, pk):
+    """
+    Vista para obtener el recorrido GPS de una visita
+    """
+    try:
+        visita = Visita.objects.only('id', 'tecnico_id').get(pk=pk)
+    except Visita.DoesNotExist:
+        return _visita_no_encontrada_response()
+
+    # Verificar permisos
+    if request.user.es_tecnico and visita.tecnico_id != request.user.id:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'No tienes permisos para ver este recorrido',
+            'errors': ['Solo puedes ver el recorrido de tus propias visitas']
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    desde, hasta, tolerancia, max_puntos, errores = _parametros_recorrido(request.GET)
+    if errores:
+        return Response({
+            'success': False,
+            'data': None,
+            'message': 'Parámetros inválidos',
+            'errors': errores
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    return Response({
+        'success': True,
+        'data': obtener_recorrido(visita, desde, hasta, tolerancia, max_puntos),
+        'message': 'Recorrido obtenido exitosamente',
+        'errors': []
+    }, status=status.HTTP_200_OK)
+
 
 # ==============================================================================
 # EJECUCIONES DE VISITAS
@@ -17,7 +17,8 @@ mkdir -p staticfiles
 mkdir -p media
 
 # Ejecutar migraciones de Django
-python manage.py migrate --noinput
+# --fake-initial: clientes y visitas pudieron crearse antes con --run-syncdb
+python manage.py migrate --noinput --fake-initial
 
 # Recopilar archivos estáticos
 python manage.py collectstatic --noinput --clear
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from core.handlers import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.health import HealthCheckASGIMiddleware  # noqa: E402
+from apps.visitas.sse import EventosVisitasASGIMiddleware  # noqa: E402
+from apps.usuarios.passwords import verificador_passwords  # noqa: E402
+
+# /healthz y /readyz y el stream de eventos de visitas se responden antes
+# de Django (sin middlewares ni DRF)
+application = HealthCheckASGIMiddleware(
+    EventosVisitasASGIMiddleware(django_application))
+
+# Hash de referencia del login calculado al iniciar el worker
+verificador_passwords.preparar()
@@ -0,0 +1,68 @@
+"""
+SKYNET - Handler ASGI de Django con respuestas en streaming seguras
+Django 3.2 recorre el iterador de un StreamingHttpResponse dentro del event
+loop: un generador que consulta la base de datos (p. ej. la exportación de
+visitas, que lee con un cursor del servidor) falla con
+SynchronousOnlyOperation. Este handler lo recorre en el mismo hilo
+síncrono donde corrió la vista, por lotes de partes para no pagar un
+cambio de hilo por fila.
+"""
+
+from itertools import islice
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+# Partes del iterador leídas por cada salto al hilo síncrono
+PARTES_POR_LOTE = 256
+
+
+def _siguientes(iterador):
+    return list(islice(iterador, PARTES_POR_LOTE))
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGIHandler que no ejecuta el iterador del streaming en el loop"""
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        # El hilo de la vista: conserva su conexión (y cursor) a la base
+        siguientes = sync_to_async(_siguientes, thread_sensitive=True)
+        iterador = iter(response)
+        while True:
+            partes = await siguientes(iterador)
+            if not partes:
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': b''.join(partes),
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """Equivalente a django.core.asgi.get_asgi_application()"""
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
@@ -0,0 +1,181 @@
+"""
+SKYNET - Endpoints de salud para el balanceador (/healthz y /readyz)
+Se atienden en la capa WSGI/ASGI, antes de Django: sin middlewares, sin
+DRF, sin autenticación y sin logs de request.
+"""
+
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+RUTA_LIVENESS = '/healthz'
+RUTA_READINESS = '/readyz'
+
+
+def _respuesta(listo, data, mensaje, errores):
+    cuerpo = json.dumps({
+        'success': listo,
+        'data': data,
+        'message': mensaje,
+        'errors': errores,
+    }).encode()
+    return (200 if listo else 503), cuerpo
+
+
+class ProbeReadiness:
+    """
+    Verifica base de datos, migraciones y caché. El resultado se reutiliza
+    durante READYZ_CACHE_SECONDS para que probes frecuentes (o varios
+    balanceadores) no abran una conexión por request. Las migraciones
+    aplicadas se recuerdan para siempre en el proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resultado = None
+        self._vence = 0
+        self._migraciones_ok = False
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'READYZ_CACHE_SECONDS', 5)
+
+    def _verificar_db(self):
+        connection = connections[DEFAULT_DB_ALIAS]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            if not self._migraciones_ok:
+                executor = MigrationExecutor(connection)
+                pendientes = executor.migration_plan(
+                    executor.loader.graph.leaf_nodes())
+                if pendientes:
+                    raise RuntimeError(
+                        f'{len(pendientes)} migraciones pendientes')
+                self._migraciones_ok = True
+        finally:
+            # Fuera del ciclo de request nadie más cierra la conexión
+            connection.close_if_unusable_or_obsolete()
+
+    def _verificar_cache(self):
+        cache = caches['default']
+        cache.set('skynet:readyz', 1, 10)
+        if cache.get('skynet:readyz') != 1:
+            raise RuntimeError('La caché no devolvió el valor escrito')
+
+    def _evaluar(self):
+        checks = {}
+        errores = []
+        for nombre, verificar in (('database', self._verificar_db),
+                                  ('cache', self._verificar_cache)):
+            inicio = time.perf_counter()
+            try:
+                verificar()
+                checks[nombre] = 'ok'
+            except Exception as e:
+                checks[nombre] = 'error'
+                errores.append(f'{nombre}: {e}')
+            checks[f'{nombre}_ms'] = round(
+                (time.perf_counter() - inicio) * 1000, 2)
+        checks['migraciones'] = 'ok' if self._migraciones_ok else 'pendiente'
+        return not errores, checks, errores
+
+    def estado(self):
+        """
+        Retorna (listo, checks, errores), reutilizando el último resultado
+        mientras no venza. Si otro hilo está evaluando se usa el anterior.
+        """
+        ahora = time.monotonic()
+        if self._resultado is not None and ahora < self._vence:
+            return self._resultado
+        if not self._lock.acquire(blocking=self._resultado is None):
+            return self._resultado
+        try:
+            if self._resultado is None or time.monotonic() >= self._vence:
+                self._resultado = self._evaluar()
+                self._vence = time.monotonic() + self.ttl
+            return self._resultado
+        finally:
+            self._lock.release()
+
+
+probe_readiness = ProbeReadiness()
+
+
+def responder(ruta):
+    """
+    Retorna (status, cuerpo) para una ruta de salud, o None si la ruta
+    no es de salud y debe seguir a Django.
+    """
+    ruta = ruta.rstrip('/') or '/'
+    if ruta == RUTA_LIVENESS:
+        return _respuesta(True, {'status': 'ok'}, 'Servicio activo', [])
+    if ruta == RUTA_READINESS:
+        listo, checks, errores = probe_readiness.estado()
+        mensaje = 'Servicio listo' if listo else 'Servicio no disponible'
+        return _respuesta(listo, checks, mensaje, errores)
+    return None
+
+
+_ENCABEZADOS = [
+    ('Content-Type', 'application/json'),
+    ('Cache-Control', 'no-store'),
+]
+
+
+class HealthCheckWSGIMiddleware:
+    """Responde /healthz y /readyz antes de la aplicación WSGI de Django"""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            respuesta = responder(environ.get('PATH_INFO', ''))
+            if respuesta is not None:
+                codigo, cuerpo = respuesta
+                estado = '200 OK' if codigo == 200 else '503 Service Unavailable'
+                start_response(estado, _ENCABEZADOS + [
+                    ('Content-Length', str(len(cuerpo)))])
+                return [] if environ['REQUEST_METHOD'] == 'HEAD' else [cuerpo]
+        return self.application(environ, start_response)
+
+
+class HealthCheckASGIMiddleware:
+    """Responde /healthz y /readyz antes de la aplicación ASGI de Django"""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope.get('method') in ('GET', 'HEAD'):
+            if scope.get('path', '').rstrip('/') == RUTA_READINESS:
+                # La probe usa el ORM (síncrono): se ejecuta en un hilo
+                respuesta = await sync_to_async(
+                    responder, thread_sensitive=True)(scope['path'])
+            else:
+                respuesta = responder(scope.get('path', ''))
+            if respuesta is not None:
+                codigo, cuerpo = respuesta
+                await send({
+                    'type': 'http.response.start',
+                    'status': codigo,
+                    'headers': [
+                        (nombre.lower().encode(), valor.encode())
+                        for nombre, valor in _ENCABEZADOS + [
+                            ('Content-Length', str(len(cuerpo)))]
+                    ],
+                })
+                await send({
+                    'type': 'http.response.body',
+                    'body': b'' if scope['method'] == 'HEAD' else cuerpo,
+                })
+                return
+        await self.application(scope, receive, send)
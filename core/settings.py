@@ -110,6 +110,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Segundos que /readyz reutiliza el resultado de sus verificaciones
+READYZ_CACHE_SECONDS = config('READYZ_CACHE_SECONDS', default=5, cast=int)
+
 
 # ==============================================================================
 # DATABASE CONFIGURATION
@@ -155,6 +158,26 @@ else:
     }
     print("🗄️ Usando SQLite para desarrollo local")
 
+# ==============================================================================
+# CACHE CONFIGURATION
+# ==============================================================================
+
+# LocMem por defecto (por proceso). En producción con varios workers usar
+# un backend compartido, p. ej. CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='skynet-default'),
+    }
+}
+
+# Listas de técnicos/supervisores precalculadas por versión: segundos que
+# cada worker reutiliza su copia (con caché por proceso, también el máximo
+# que tarda en verse un cambio hecho en otro worker)
+ROSTER_CACHE_TTL = config('ROSTER_CACHE_TTL', default=300, cast=int)
+
 # ==============================================================================
 # CUSTOM USER MODEL
 # ==============================================================================
@@ -170,6 +193,32 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# ==============================================================================
+# PASSWORD HASHING
+# ==============================================================================
+
+# Argon2 primero; los demás solo verifican hashes existentes, que se
+# actualizan a Argon2 en el siguiente login exitoso
+PASSWORD_HASHERS = [
+    'apps.usuarios.hashers.SkynetArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Costos de Argon2id (memoria en KiB); cambiarlos rehashea en el login
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+
+# Pool de verificación de contraseñas por proceso (control de admisión).
+# Solo aporta con workers de hilos (gunicorn --worker-class gthread): con
+# workers síncronos cada proceso atiende un login a la vez
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+PASSWORD_HASH_MAX_PENDING = config(
+    'PASSWORD_HASH_MAX_PENDING', default=16, cast=int)
+PASSWORD_HASH_TIMEOUT = config('PASSWORD_HASH_TIMEOUT', default=10, cast=int)
+
 # ==============================================================================
 # PASSWORD VALIDATION
 # ==============================================================================
@@ -221,6 +270,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ==============================================================================
+# TESTING
+# ==============================================================================
+
+# Excluye las pruebas @tag('benchmark') salvo con --tag benchmark
+TEST_RUNNER = 'core.test_runner.SkynetTestRunner'
+
 # ==============================================================================
 # DJANGO REST FRAMEWORK CONFIGURATION
 # ==============================================================================
@@ -243,6 +299,17 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Proxies de confianza delante de la app (Render: 1). get_ident toma la
+    # IP que agregó el último proxy, no la que el cliente puso en
+    # X-Forwarded-For; con 0 se usa REMOTE_ADDR
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+    # Token buckets 'capacidad/periodo' (ver apps.utils.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='20/min'),
+        'login_email': config('THROTTLE_LOGIN_EMAIL', default='5/min'),
+        'refresh_ip': config('THROTTLE_REFRESH_IP', default='30/min'),
+        'usuarios_create_ip': config('THROTTLE_USUARIOS_CREATE_IP', default='10/hour'),
+    },
     # 'DEFAULT_FILTER_BACKENDS': [
     #     'django_filters.rest_framework.DjangoFilterBackend',
     #     'rest_framework.filters.SearchFilter',
@@ -263,6 +330,39 @@ JWT_REFRESH_TOKEN_LIFETIME = timedelta(days=config(
     'JWT_REFRESH_TOKEN_LIFETIME_DAYS', default=7, cast=int))
 JWT_ALGORITHM = 'HS256'
 
+# Caché de usuarios para JWTAuthentication (segundos; 0 desactiva la caché)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=30, cast=int)
+JWT_USER_CACHE_MAX_ENTRIES = config(
+    'JWT_USER_CACHE_MAX_ENTRIES', default=10000, cast=int)
+# Segundo nivel en la caché compartida de Django (requiere CACHE_BACKEND compartido)
+JWT_USER_CACHE_SHARED = config(
+    'JWT_USER_CACHE_SHARED', default=False, cast=bool)
+# Requests GET/HEAD/OPTIONS autenticadas solo con los claims del token (sin
+# query). Un cambio de rol o desactivación se refleja en otros workers al
+# renovar el token, salvo que el usuario ya esté en la caché local.
+JWT_CLAIMS_USER = config('JWT_CLAIMS_USER', default=False, cast=bool)
+
+# Revocación de tokens (filtro de Bloom por worker + tabla tokens_revocados)
+JWT_REVOCATION_SYNC_INTERVAL = config(
+    'JWT_REVOCATION_SYNC_INTERVAL', default=5, cast=int)
+JWT_REVOCATION_PRUNE_INTERVAL = config(
+    'JWT_REVOCATION_PRUNE_INTERVAL', default=3600, cast=int)
+JWT_REVOCATION_CAPACITY = config(
+    'JWT_REVOCATION_CAPACITY', default=100000, cast=int)
+JWT_REVOCATION_FALSE_POSITIVE_RATE = 0.01
+
+# Limitación de tasa: bucket local por worker y, con 'cache', otro
+# compartido en CACHES['default'] para un límite global
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMIT_BACKEND = config('RATE_LIMIT_BACKEND', default='local')
+RATE_LIMIT_MAX_KEYS = 50000
+
+# Stream de eventos de visitas (SSE, solo bajo ASGI). 'local' entrega las
+# transiciones dentro del proceso (un worker); 'feed' las lee del feed de
+# cambios cada EVENTOS_INTERVALO_FEED segundos (varios workers)
+EVENTOS_BACKEND = config('EVENTOS_BACKEND', default='local')
+EVENTOS_INTERVALO_FEED = config('EVENTOS_INTERVALO_FEED', default=2, cast=float)
+
 
 # ==============================================================================
 # CORS CONFIGURATION
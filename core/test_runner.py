@@ -0,0 +1,19 @@
+"""
+SKYNET - Runner de pruebas
+Las pruebas marcadas con @tag('benchmark') miden tiempos y tardan varios
+segundos: se excluyen por defecto y se ejecutan con
+``python manage.py test --tag benchmark``.
+"""
+
+from django.test.runner import DiscoverRunner
+
+TAGS_EXCLUIDOS_POR_DEFECTO = {'benchmark'}
+
+
+class SkynetTestRunner(DiscoverRunner):
+
+    def __init__(self, tags=None, exclude_tags=None, **kwargs):
+        exclude_tags = set(exclude_tags or ())
+        if not tags:
+            exclude_tags |= TAGS_EXCLUIDOS_POR_DEFECTO
+        super().__init__(tags=tags, exclude_tags=exclude_tags, **kwargs)
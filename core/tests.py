@@ -0,0 +1,117 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+
+from .health import (
+    HealthCheckASGIMiddleware, HealthCheckWSGIMiddleware, probe_readiness
+)
+
+
+def _app_wsgi(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+async def _app_asgi(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'django'})
+
+
+class HealthTestMixin:
+    """
+    Llama a los middlewares de salud directamente, sin pasar por Django
+    """
+
+    def setUp(self):
+        probe_readiness._resultado = None
+        probe_readiness._vence = 0
+
+    def wsgi(self, ruta, metodo='GET'):
+        respuesta = {}
+
+        def start_response(estado, encabezados):
+            respuesta['status'] = int(estado.split()[0])
+            respuesta['headers'] = {n.lower(): v for n, v in encabezados}
+
+        cuerpo = b''.join(HealthCheckWSGIMiddleware(_app_wsgi)(
+            {'REQUEST_METHOD': metodo, 'PATH_INFO': ruta}, start_response))
+        return respuesta['status'], respuesta['headers'], cuerpo
+
+    def asgi(self, ruta, metodo='GET'):
+        mensajes = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(mensaje):
+            mensajes.append(mensaje)
+
+        scope = {'type': 'http', 'method': metodo, 'path': ruta}
+        async_to_sync(HealthCheckASGIMiddleware(_app_asgi))(scope, receive, send)
+        encabezados = {
+            nombre.decode(): valor.decode()
+            for nombre, valor in mensajes[0]['headers']
+        }
+        return mensajes[0]['status'], encabezados, mensajes[1]['body']
+
+    def servidores(self):
+        return (('wsgi', self.wsgi), ('asgi', self.asgi))
+
+
+class HealthCheckTest(HealthTestMixin, TestCase):
+
+    def test_liveness(self):
+        for nombre, llamar in self.servidores():
+            with self.subTest(servidor=nombre):
+                status, encabezados, cuerpo = llamar('/healthz')
+                self.assertEqual(status, 200)
+                self.assertEqual(encabezados['content-type'], 'application/json')
+                self.assertEqual(encabezados['cache-control'], 'no-store')
+                self.assertEqual(json.loads(cuerpo)['data'], {'status': 'ok'})
+
+    def test_readiness(self):
+        for nombre, llamar in self.servidores():
+            with self.subTest(servidor=nombre):
+                status, _, cuerpo = llamar('/readyz/')
+                self.assertEqual(status, 200)
+                data = json.loads(cuerpo)
+                self.assertTrue(data['success'])
+                self.assertEqual(data['data']['database'], 'ok')
+                self.assertEqual(data['data']['cache'], 'ok')
+                self.assertEqual(data['data']['migraciones'], 'ok')
+
+    def test_readiness_con_fallo(self):
+        for nombre, llamar in self.servidores():
+            with self.subTest(servidor=nombre):
+                probe_readiness._resultado = None
+                with mock.patch.object(
+                        probe_readiness, '_verificar_cache',
+                        side_effect=RuntimeError('sin conexión')):
+                    status, _, cuerpo = llamar('/readyz')
+                self.assertEqual(status, 503)
+                data = json.loads(cuerpo)
+                self.assertFalse(data['success'])
+                self.assertEqual(data['errors'], ['cache: sin conexión'])
+
+    @override_settings(READYZ_CACHE_SECONDS=60)
+    def test_readiness_reutiliza_el_resultado(self):
+        self.wsgi('/readyz')
+        with mock.patch.object(probe_readiness, '_evaluar') as evaluar:
+            for _, llamar in self.servidores():
+                self.assertEqual(llamar('/readyz')[0], 200)
+        evaluar.assert_not_called()
+
+    def test_head_sin_cuerpo(self):
+        for nombre, llamar in self.servidores():
+            with self.subTest(servidor=nombre):
+                status, _, cuerpo = llamar('/healthz', metodo='HEAD')
+                self.assertEqual(status, 200)
+                self.assertEqual(cuerpo, b'')
+
+    def test_otras_rutas_siguen_a_django(self):
+        for nombre, llamar in self.servidores():
+            with self.subTest(servidor=nombre):
+                self.assertEqual(llamar('/api/visitas/')[2], b'django')
+                self.assertEqual(llamar('/healthz', metodo='POST')[2], b'django')
@@ -13,4 +13,13 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_wsgi_application()
+django_application = get_wsgi_application()
+
+from core.health import HealthCheckWSGIMiddleware  # noqa: E402
+from apps.usuarios.passwords import verificador_passwords  # noqa: E402
+
+# /healthz y /readyz se responden antes de Django (sin middlewares ni DRF)
+application = HealthCheckWSGIMiddleware(django_application)
+
+# Hash de referencia del login calculado al iniciar el worker
+verificador_passwords.preparar()